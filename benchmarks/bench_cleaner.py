@@ -0,0 +1,116 @@
+"""
+Whitespace cleaning benchmark: time per MB and peak allocations of the
+legacy regex cleaner against utils.text_cleaner.
+
+Usage:
+    python -m benchmarks.bench_cleaner --size-mb 20 --output cleaner.json
+"""
+import argparse
+import gc
+import json
+import random
+import re
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from langchain_core.documents import Document
+
+from benchmarks.corpus import sentence
+from utils.text_cleaner import clean_documents_spaces
+
+
+def legacy_clean(documents: List[Document]) -> List[Document]:
+    """The cleaner before the rewrite: re.sub per page and a new Document each"""
+    return [
+        Document(page_content=re.sub(r'\s+', ' ', doc.page_content).strip(), metadata=doc.metadata)
+        for doc in documents
+    ]
+
+
+def pdf_like_pages(size_mb: float, page_chars: int = 3000, seed: int = 0) -> List[Document]:
+    """Pages with hard line wraps, paragraph gaps and stray tabs/double spaces, like PyPDF output"""
+    rng = random.Random(seed)
+    pages = []
+    total = 0
+    while total < size_mb * 1024 * 1024:
+        parts = []
+        length = 0
+        while length < page_chars:
+            part = sentence(rng) + rng.choice((" ", " ", "\n", "  ", " \t", "\n\n", " \n \n"))
+            parts.append(part)
+            length += len(part)
+        text = "".join(parts)
+        pages.append(Document(page_content=text, metadata={"source": "bench.pdf", "page": len(pages)}))
+        total += len(text.encode("utf-8"))
+    return pages
+
+
+def copy_pages(pages: List[Document]) -> List[Document]:
+    # In-place cần Document mới cho mỗi lần chạy
+    return [Document(page_content=doc.page_content, metadata=doc.metadata) for doc in pages]
+
+
+def measure(clean: Callable[[List[Document]], Any], pages: List[Document], size_mb: float, repeat: int) -> Dict[str, Any]:
+    best = None
+    for _ in range(repeat):
+        batch = copy_pages(pages)
+        gc.collect()
+        start = time.perf_counter()
+        clean(batch)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    batch = copy_pages(pages)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        clean(batch)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": best,
+        "ms_per_mb": best * 1000 / size_mb,
+        "mb_per_second": size_mb / best if best > 0 else None,
+        "peak_memory_bytes": peak,
+        "peak_bytes_per_input_byte": peak / (size_mb * 1024 * 1024)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Whitespace cleaning benchmark")
+    parser.add_argument("--size-mb", type=float, default=10, help="Size of the synthetic page corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per variant, the fastest is reported")
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    pages = pdf_like_pages(args.size_mb)
+    single_doc = [Document(page_content="".join(doc.page_content for doc in pages), metadata={"source": "bench.txt"})]
+    size_mb = sum(len(doc.page_content.encode("utf-8")) for doc in pages) / (1024 * 1024)
+
+    variants = {
+        "legacy_regex": legacy_clean,
+        "collapse": clean_documents_spaces,
+        "collapse_in_place": lambda docs: clean_documents_spaces(docs, in_place=True),
+        "preserve_paragraphs_in_place": lambda docs: clean_documents_spaces(docs, preserve_paragraphs=True, in_place=True),
+    }
+    results = []
+    for corpus, documents in (("pages", pages), ("single_document", single_doc)):
+        for name, clean in variants.items():
+            result = {"corpus": corpus, "variant": name} | measure(clean, documents, size_mb, args.repeat)
+            results.append(result)
+            print(f"{corpus:>16} {name:>30}: {result['ms_per_mb']:7.1f} ms/MB "
+                  f"{result['peak_memory_bytes'] / (1024 * 1024):8.1f} MB peak", file=sys.stderr)
+
+    output = json.dumps({"size_mb": size_mb, "pages": len(pages), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
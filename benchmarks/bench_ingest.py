@@ -0,0 +1,177 @@
+"""
+Offline ingest benchmark: load -> chunk -> embed -> store, per corpus.
+
+Runs the real DocumentLoaderManager, splitters and RAGPipeline against a
+deterministic fake embedder and an in-memory vector store, so no API key,
+network or Milvus server is needed. `--embedder hashing` measures the
+local HashingEmbedder instead of the fake Gemini backend.
+
+Usage:
+    python -m benchmarks.bench_ingest --scale small --output bench.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+from rag.pipeline.rag_pipeline import DocumentLoaderManager, RAGPipeline, chunk_for_source, prepare_chunks, text_size
+from rag.embedders import GeminiEmbedder, HashingEmbedder
+from benchmarks.corpus import SCALES, generate_corpus
+from benchmarks.fakes import FakeEmbedContent, InMemoryVectorStore
+
+# Stage trả về (số item, số byte) đã xử lý
+StageFn = Callable[[], Tuple[int, int]]
+
+
+def measure(stage_fn: StageFn, repeat: int = 1) -> Dict[str, Any]:
+    """
+    Time a stage, then run it once more under tracemalloc for peak memory.
+
+    Timing and memory are measured in separate runs because tracemalloc
+    slows allocation-heavy code down by a large factor.
+    """
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        items, size = stage_fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        stage_fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": best,
+        "items": items,
+        "bytes": size,
+        "items_per_second": items / best if best > 0 else None,
+        "mb_per_second": size / best / (1024 * 1024) if best > 0 else None,
+        "peak_memory_bytes": peak
+    }
+
+
+def bench_corpus(name: str, file_path: str, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Benchmark every stage of one corpus file"""
+    load_manager = DocumentLoaderManager()
+    if args.embedder == "hashing":
+        embedder = HashingEmbedder()
+    else:
+        embedder = GeminiEmbedder(embed_fn=FakeEmbedContent(latency=args.embed_latency), requests_per_minute=None)
+    documents = load_manager.load(file_path)
+    chunks = chunk_for_source(file_path, documents)
+    texts, metadatas = prepare_chunks(chunks)
+    embeddings = embedder.embed_documents(texts)
+
+    def load():
+        docs = load_manager.load(file_path)
+        return len(docs), sum(text_size(doc.page_content) for doc in docs)
+
+    def chunk():
+        result = chunk_for_source(file_path, documents)
+        return len(result), sum(text_size(doc.page_content) for doc in result)
+
+    def embed():
+        vectors = embedder.embed_documents(texts)
+        return len(vectors), sum(text_size(text) for text in texts)
+
+    def store():
+        ids = InMemoryVectorStore().add_documents(texts, embeddings, metadatas)
+        return len(ids), sum(text_size(text) for text in texts)
+
+    def pipeline(stream: bool):
+        def run():
+            rag = RAGPipeline(embedder=embedder, vector_store=InMemoryVectorStore())
+            if stream:
+                rag.process_document_stream(file_path)
+            else:
+                rag.process_document(file_path)
+            return rag.last_stats.chunks, os.path.getsize(file_path)
+        return run
+
+    stages = {
+        "load": load,
+        "chunk": chunk,
+        "embed": embed,
+        "store": store,
+        "pipeline": pipeline(stream=False),
+        "pipeline_stream": pipeline(stream=True),
+    }
+    results = []
+    for stage, stage_fn in stages.items():
+        result = {"corpus": name, "stage": stage} | measure(stage_fn, args.repeat)
+        results.append(result)
+        print(f"{name:>10} {stage:>16}: {result['seconds']:8.3f}s "
+              f"{result['items_per_second'] or 0:12.1f} items/s "
+              f"{result['peak_memory_bytes'] / (1024 * 1024):8.1f} MB peak", file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ingest benchmark for file2rag")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Corpus size")
+    parser.add_argument("--corpus", nargs="*", help="Only run these corpora (txt, pdf, docx, csv_long, csv_wide, xlsx)")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per stage, the fastest is reported")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Simulated seconds per embed request")
+    parser.add_argument("--embedder", choices=("fake", "hashing"), default="fake",
+                        help="Embedding backend: fake Gemini API or the local HashingEmbedder")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpus")
+    parser.add_argument("--data-dir", help="Keep the generated corpus here instead of a temp directory")
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    # Log của pipeline làm nhiễu kết quả đo
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir or tmp_dir
+        print(f"Generating {args.scale} corpus in {data_dir}...", file=sys.stderr)
+        files = generate_corpus(data_dir, args.scale, args.seed)
+
+        results = []
+        for name, file_path in files.items():
+            if args.corpus and name not in args.corpus:
+                continue
+            results.extend(bench_corpus(name, file_path, args))
+
+        report = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count()
+            },
+            "config": {
+                "scale": args.scale,
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "embed_latency": args.embed_latency,
+                "embedder": args.embedder,
+                "corpus_bytes": {name: os.path.getsize(path) for name, path in files.items()}
+            },
+            "results": results
+        }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
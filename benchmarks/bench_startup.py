@@ -0,0 +1,144 @@
+"""
+Startup benchmark: import time and time to first ingest of a fresh process.
+
+Every scenario runs in a new interpreter, so module caches of this process
+do not hide import costs. Besides wall time, each scenario reports which
+heavy optional backends (pandas, pypdf, pymilvus, ...) were imported;
+`--check` fails when a scenario imports a backend it does not need, which
+catches eager imports creeping back in.
+
+Usage:
+    python -m benchmarks.bench_startup --repeat 5 --check --output startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Backend chỉ nên được import khi thực sự dùng tới
+HEAVY_MODULES = [
+    "aiohttp", "docx2txt", "google.generativeai", "langchain_community", "openpyxl", "pandas", "pymilvus", "pypdf"
+]
+
+# Mỗi scenario: đoạn code chạy trong process mới, đo từ đầu process tới cuối đoạn code
+SCENARIOS = {
+    "import_pipeline": "import rag.pipeline.rag_pipeline",
+    "import_loaders": "import rag.loaders",
+    "pipeline_init": (
+        "from rag.pipeline.rag_pipeline import RAGPipeline\n"
+        "from benchmarks.fakes import InMemoryVectorStore\n"
+        "rag = RAGPipeline(embedder='hashing', vector_store=InMemoryVectorStore())"
+    ),
+    # Milvus và Gemini mặc định: không được kết nối / cấu hình trước lần dùng đầu tiên
+    "pipeline_init_defaults": (
+        "from rag.pipeline.rag_pipeline import RAGPipeline\n"
+        "rag = RAGPipeline()"
+    ),
+    "ingest_txt": (
+        "from rag.pipeline.rag_pipeline import RAGPipeline\n"
+        "from benchmarks.fakes import InMemoryVectorStore\n"
+        "rag = RAGPipeline(embedder='hashing', vector_store=InMemoryVectorStore())\n"
+        "rag.process_document(TXT_PATH)"
+    )
+}
+# Backend được phép import trong từng scenario khi chạy với --check
+ALLOWED_MODULES = {
+    "import_pipeline": set(),
+    "import_loaders": set(),
+    "pipeline_init": set(),
+    "pipeline_init_defaults": set(),
+    "ingest_txt": set()
+}
+
+_RUNNER = """
+import json, sys, time
+start = time.perf_counter()
+exec(compile(sys.argv[1], "<scenario>", "exec"), {"TXT_PATH": sys.argv[2]})
+elapsed = time.perf_counter() - start
+heavy = json.loads(sys.argv[3])
+print(json.dumps({"seconds": elapsed, "modules": [name for name in heavy if name in sys.modules]}))
+"""
+
+
+def run_scenario(code: str, txt_path: str, env: Dict[str, str]) -> Dict[str, Any]:
+    """Run one scenario in a new interpreter; the process wall time includes interpreter startup"""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", _RUNNER, code, txt_path, json.dumps(HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - start
+    return json.loads(completed.stdout.strip().splitlines()[-1]) | {"process_seconds": wall}
+
+
+def bench(name: str, code: str, txt_path: str, env: Dict[str, str], repeat: int) -> Dict[str, Any]:
+    runs = [run_scenario(code, txt_path, env) for _ in range(repeat)]
+    return {
+        "scenario": name,
+        "seconds": statistics.median(run["seconds"] for run in runs),
+        "process_seconds": statistics.median(run["process_seconds"] for run in runs),
+        "modules": runs[0]["modules"],
+        "unexpected_modules": sorted(set(runs[0]["modules"]) - ALLOWED_MODULES.get(name, set()))
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import time / startup benchmark for file2rag")
+    parser.add_argument("--scenario", nargs="*", help=f"Only run these scenarios ({', '.join(SCENARIOS)})")
+    parser.add_argument("--repeat", type=int, default=3, help="Processes per scenario, the median is reported")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if a scenario imports an unneeded backend")
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    # Giá trị giả: pipeline_init_defaults chỉ hợp lệ nếu không có kết nối nào được mở
+    env = os.environ | {
+        "PYTHONPATH": ROOT,
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "startup-benchmark"),
+        "MILVUS_URI": "http://127.0.0.1:1",
+        "USER_AGENT": "file2rag-bench"
+    }
+
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        txt_path = os.path.join(tmp_dir, "startup.txt")
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write("File2RAG startup benchmark. " * 200)
+
+        baseline = bench("python", "pass", txt_path, env, args.repeat)
+        print(f"{'python':>24}: {baseline['process_seconds'] * 1000:7.1f} ms process", file=sys.stderr)
+        for name, code in SCENARIOS.items():
+            if args.scenario and name not in args.scenario:
+                continue
+            result = bench(name, code, txt_path, env, args.repeat)
+            results.append(result)
+            print(f"{name:>24}: {result['seconds'] * 1000:7.1f} ms in process, "
+                  f"{result['process_seconds'] * 1000:7.1f} ms process, backends {result['modules']}", file=sys.stderr)
+
+    report = {
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "interpreter_seconds": baseline["process_seconds"],
+        "results": results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    unexpected = {result["scenario"]: result["unexpected_modules"] for result in results if result["unexpected_modules"]}
+    if args.check and unexpected:
+        print(f"Unexpected backend imports: {unexpected}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
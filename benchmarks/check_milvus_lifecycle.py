@@ -0,0 +1,124 @@
+"""
+Index lifecycle check against a real Milvus: bulk_load, rebuild_index,
+compact, release and load.
+
+Runs on Milvus Lite (a local file, `pip install milvus-lite`) by default, or
+on a standalone server with `--uri http://localhost:19530`. A throwaway
+collection is created and dropped at the end. Exits with status 1 if a
+step does not leave the collection in the expected state.
+
+Usage:
+    python -m benchmarks.check_milvus_lifecycle --uri ./milvus_check.db --rows 2000
+"""
+import argparse
+import logging
+import sys
+import time
+import uuid
+from typing import List
+
+from benchmarks.fakes import fake_vector
+from rag.vector_stores.index_config import IndexConfig
+from rag.vector_stores.milvus_vector_store import MilvusVectorStore
+
+DIMENSION = 64  # Vector nhỏ: chỉ kiểm tra trạng thái collection, không đo tốc độ
+
+logger = logging.getLogger("check_milvus_lifecycle")
+
+
+class Interrupted(Exception):
+    pass
+
+
+def index_type(store: MilvusVectorStore) -> str:
+    """Index type built on the collection, or "" if none"""
+    if not store.collection.has_index():
+        return ""
+    return IndexConfig.from_index_params(store.collection.indexes[0].params).index_type
+
+
+def insert(store: MilvusVectorStore, start: int, count: int, source: str) -> List[int]:
+    texts = [f"lifecycle chunk {i}" for i in range(start, start + count)]
+    metadatas = [{"source": source, "chunk_index": i} for i in range(start, start + count)]
+    return store.add_documents(texts, [fake_vector(text, DIMENSION) for text in texts], metadatas, flush=False)
+
+
+def top_hit(store: MilvusVectorStore, i: int) -> str:
+    hits = store.search([fake_vector(f"lifecycle chunk {i}", DIMENSION)], top_k=1)[0]
+    return hits[0]["content"] if hits else ""
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check the index lifecycle of MilvusVectorStore against Milvus")
+    parser.add_argument("--uri", default="./milvus_check.db", help="Milvus Lite file or server URI")
+    parser.add_argument("--rows", type=int, default=2000, help="Rows inserted by each bulk load")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    failures = []
+
+    def check(condition: bool, message: str):
+        logger.info(f"{'✅' if condition else '❌'} {message}")
+        if not condition:
+            failures.append(message)
+
+    store = MilvusVectorStore(f"lifecycle_{uuid.uuid4().hex[:8]}", dimension=DIMENSION, uri=args.uri,
+                              index=IndexConfig.flat())
+    start = time.monotonic()
+    try:
+        store.connect()
+        check(index_type(store) == "FLAT", "new collection has its configured index")
+
+        # bulk_load thành công: index build một lần sau khi insert xong, collection được load
+        with store.bulk_load(IndexConfig.ivf_flat(nlist=16)):
+            check(index_type(store) == "", "index dropped inside bulk_load")
+            insert(store, 0, args.rows, "a.txt")
+        check(index_type(store) == "IVF_FLAT", "bulk_load built the requested index on exit")
+        check(store.collection.num_entities == args.rows, f"{args.rows} rows flushed by bulk_load")
+        check(top_hit(store, 7) == "lifecycle chunk 7", "collection searchable after bulk_load")
+
+        # bulk_load bị lỗi: không build index, row đã insert vẫn còn
+        try:
+            with store.bulk_load():
+                insert(store, args.rows, 100, "b.txt")
+                raise Interrupted()
+        except Interrupted:
+            pass
+        check(index_type(store) == "", "interrupted bulk_load left the index unbuilt")
+        store.flush()
+        check(store.collection.num_entities == args.rows + 100, "rows of the interrupted bulk_load kept")
+        store.load()
+        check(index_type(store) != "", "load() built the missing index")
+        check(top_hit(store, args.rows + 5) == f"lifecycle chunk {args.rows + 5}", "searchable after load()")
+
+        # rebuild_index: đổi loại index, collection đang load được load lại
+        store.rebuild_index(IndexConfig.flat())
+        check(index_type(store) == "FLAT", "rebuild_index switched the index type")
+        check(top_hit(store, 3) == "lifecycle chunk 3", "collection loaded again after rebuild_index")
+
+        # compact sau khi xóa: row đã xóa không còn được trả về
+        deleted = store.find_chunk_ids(["b.txt"], range(args.rows, args.rows + 100))
+        check(len(deleted) == 100, "find_chunk_ids found the rows of a source")
+        found = store.find_chunks(["b.txt"], [args.rows + 5])
+        check([row["content"] for row in found] == [f"lifecycle chunk {args.rows + 5}"], "find_chunks returned the content")
+        store.delete(deleted)
+        store.compact()
+        check(store.find_chunk_ids(["b.txt"], range(args.rows, args.rows + 100)) == [], "deleted rows gone after compact")
+
+        # release / load: search tự load lại collection đã release
+        store.release()
+        check(not store._loaded, "collection released")
+        check(top_hit(store, 11) == "lifecycle chunk 11", "search loaded the released collection")
+        store.load()
+        check(top_hit(store, 12) == "lifecycle chunk 12", "searchable after explicit load")
+    finally:
+        if store._collection is not None:
+            store.release()
+            store.collection.drop()
+
+    logger.info(f"{len(failures)} failed checks in {time.monotonic() - start:.1f}s against {args.uri}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
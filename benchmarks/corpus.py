@@ -0,0 +1,184 @@
+"""Synthetic, seeded corpora for the ingest benchmarks (no network, no extra dependencies)"""
+import csv
+import os
+import random
+import zipfile
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+# Từ vựng pha trộn tiếng Anh và tiếng Việt để gần với dữ liệu thật
+WORDS = (
+    "the of and to in is for on with as by this that from data report system "
+    "document customer revenue quarter policy employee process service product "
+    "hệ thống dữ liệu báo cáo khách hàng doanh thu quý chính sách nhân viên "
+    "quy trình dịch vụ sản phẩm tài liệu kết quả phân tích"
+).split()
+
+# Kích thước corpus theo scale
+SCALES = {
+    "small": {"txt_mb": 1, "pdf_pages": 20, "docx_paragraphs": 500, "csv_rows": 5_000, "csv_wide_cols": 50, "xlsx_rows": 2_000},
+    "medium": {"txt_mb": 10, "pdf_pages": 200, "docx_paragraphs": 5_000, "csv_rows": 50_000, "csv_wide_cols": 200, "xlsx_rows": 20_000},
+    "large": {"txt_mb": 100, "pdf_pages": 2_000, "docx_paragraphs": 50_000, "csv_rows": 500_000, "csv_wide_cols": 500, "xlsx_rows": 200_000},
+}
+
+
+def sentence(rng: random.Random, min_words: int = 6, max_words: int = 20) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def paragraph(rng: random.Random, sentences: int = 5) -> str:
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+
+def write_txt(path: str, size_mb: float, seed: int = 0):
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            block = paragraph(rng, rng.randint(3, 8)) + "\n\n"
+            f.write(block)
+            written += len(block.encode("utf-8"))
+
+
+def _pdf_escape(text: str) -> str:
+    # Font chuẩn của PDF chỉ có Latin-1, bỏ dấu để giữ file hợp lệ
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 45, seed: int = 0):
+    """Write a multi-page text PDF by hand (Helvetica, one content stream per page)"""
+    rng = random.Random(seed)
+    objects: List[bytes] = []
+
+    def add(obj: bytes) -> int:
+        objects.append(obj)
+        return len(objects)
+
+    catalog_id = add(b"")  # Điền sau khi biết id của Pages
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for _ in range(pages):
+        lines = [_pdf_escape(sentence(rng, 8, 14)) for _ in range(lines_per_page)]
+        text_ops = " T* ".join(f"({line}) Tj" for line in lines)
+        stream = f"BT /F1 10 Tf 14 TL 40 800 Td {text_ops} ET".encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for i, obj in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % i + obj + b"\nendobj\n")
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                % (len(objects) + 1, catalog_id, xref_offset))
+
+
+def write_docx(path: str, paragraphs: int, seed: int = 0):
+    """Write a minimal DOCX package with one <w:p> per paragraph"""
+    rng = random.Random(seed)
+    body = "".join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(paragraph(rng, rng.randint(2, 6)))}</w:t></w:r></w:p>'
+        for _ in range(paragraphs)
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{body}</w:body></w:document>"
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        "</Types>"
+    )
+    rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="word/document.xml"/></Relationships>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", content_types)
+        archive.writestr("_rels/.rels", rels)
+        archive.writestr("word/document.xml", document)
+
+
+def _row(rng: random.Random, i: int, columns: int) -> list:
+    row = [i, f"KH{i:07d}", rng.choice(WORDS), round(rng.uniform(0, 1_000_000), 2), rng.randint(0, 500)]
+    while len(row) < columns:
+        row.append(rng.choice((rng.choice(WORDS), rng.randint(0, 10_000), round(rng.random(), 4), "")))
+    return row[:columns]
+
+
+def _header(columns: int) -> list:
+    base = ["id", "customer_code", "category", "amount", "quantity"]
+    return (base + [f"field_{i}" for i in range(len(base), columns)])[:columns]
+
+
+def write_csv(path: str, rows: int, columns: int, seed: int = 0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(_header(columns))
+        for i in range(rows):
+            writer.writerow(_row(rng, i, columns))
+
+
+def write_xlsx(path: str, rows: int, columns: int, sheets: int = 2, seed: int = 0):
+    import openpyxl
+
+    rng = random.Random(seed)
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet_idx in range(sheets):
+        sheet = workbook.create_sheet(f"Sheet{sheet_idx + 1}")
+        sheet.append(_header(columns))
+        for i in range(rows // sheets):
+            sheet.append(_row(rng, i, columns))
+    workbook.save(path)
+
+
+def generate_corpus(directory: str, scale: str = "small", seed: int = 0) -> Dict[str, str]:
+    """
+    Generate every corpus file for a scale into `directory`.
+
+    Returns:
+        {corpus name: file path}
+    """
+    sizes = SCALES[scale]
+    os.makedirs(directory, exist_ok=True)
+    files = {
+        "txt": os.path.join(directory, "large.txt"),
+        "pdf": os.path.join(directory, "multi_page.pdf"),
+        "docx": os.path.join(directory, "document.docx"),
+        "csv_long": os.path.join(directory, "long.csv"),
+        "csv_wide": os.path.join(directory, "wide.csv"),
+        "xlsx": os.path.join(directory, "sheet.xlsx"),
+    }
+    write_txt(files["txt"], sizes["txt_mb"], seed)
+    write_pdf(files["pdf"], sizes["pdf_pages"], seed=seed)
+    write_docx(files["docx"], sizes["docx_paragraphs"], seed)
+    write_csv(files["csv_long"], sizes["csv_rows"], 8, seed)
+    write_csv(files["csv_wide"], sizes["csv_rows"] // 10, sizes["csv_wide_cols"], seed)
+    write_xlsx(files["xlsx"], sizes["xlsx_rows"], 10, seed=seed)
+    return files
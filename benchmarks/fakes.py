@@ -0,0 +1,114 @@
+"""Deterministic offline stand-ins for the Gemini API and Milvus"""
+import hashlib
+import threading
+import time
+from typing import Any, Dict, List, Union
+import numpy as np
+
+DIMENSION = 768
+
+
+def fake_vector(text: str, dimension: int = DIMENSION) -> List[float]:
+    """Deterministic pseudo-embedding of a text, values in [-0.5, 0.5]"""
+    values = []
+    counter = 0
+    while len(values) < dimension:
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=64, salt=counter.to_bytes(16, "little")).digest()
+        values.extend(b / 255 - 0.5 for b in digest)
+        counter += 1
+    return values[:dimension]
+
+
+class FakeEmbedContent:
+    def __init__(self, dimension: int = DIMENSION, latency: float = 0.0):
+        """
+        Drop-in for genai.embed_content (GeminiEmbedder's embed_fn).
+
+        Args:
+            dimension: Vector dimension
+            latency: Seconds to sleep per request, to mimic network round trips
+        """
+        self.dimension = dimension
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, model: str, content: Union[str, List[str]], task_type: str) -> Dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(content, str):
+            return {"embedding": fake_vector(content, self.dimension)}
+        return {"embedding": [fake_vector(text, self.dimension) for text in content]}
+
+
+class InMemoryVectorStore:
+    def __init__(self, dimension: int = DIMENSION):
+        """In-process replacement for MilvusVectorStore keeping rows in a dict"""
+        self.dimension = dimension
+        self.rows: Dict[int, Dict[str, Any]] = {}
+        self.flushes = 0
+        self.searches = 0
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def add_documents(self, texts, embeddings, metadatas, flush: bool = True) -> List[int]:
+        ids = []
+        with self._lock:
+            for text, embedding, metadata in zip(texts, embeddings, metadatas):
+                self.rows[self._next_id] = {
+                    "embedding": embedding,
+                    "content": text[:65535],
+                    "source": metadata.get("source", ""),
+                    "page": metadata.get("page", 0),
+                    "content_type": metadata.get("content_type", "text"),
+                    "chunk_index": metadata.get("chunk_index", 0)
+                }
+                ids.append(self._next_id)
+                self._next_id += 1
+        if flush:
+            self.flush()
+        return ids
+
+    def delete(self, ids: List[int]):
+        with self._lock:
+            for pk in ids:
+                self.rows.pop(pk, None)
+
+    def find_chunk_ids(self, sources, chunk_indices) -> List[int]:
+        sources, chunk_indices = set(sources), set(chunk_indices)
+        with self._lock:
+            return [pk for pk, row in self.rows.items()
+                    if row["source"] in sources and row["chunk_index"] in chunk_indices]
+
+    def find_chunks(self, sources, chunk_indices) -> List[Dict[str, Any]]:
+        sources, chunk_indices = set(sources), set(chunk_indices)
+        with self._lock:
+            return [{"id": pk, "source": row["source"], "chunk_index": row["chunk_index"], "content": row["content"]}
+                    for pk, row in self.rows.items()
+                    if row["source"] in sources and row["chunk_index"] in chunk_indices]
+
+    def search(self, query_embeddings, top_k: int = 5, expr=None, nprobe=None, ef=None,
+               output_fields=None) -> List[List[Dict[str, Any]]]:
+        """Exact COSINE search; filter expressions are not evaluated"""
+        if expr is not None:
+            raise NotImplementedError("InMemoryVectorStore.search does not evaluate filter expressions")
+        output_fields = output_fields or ["content", "source", "page", "content_type", "chunk_index"]
+        with self._lock:
+            self.searches += 1
+            rows = list(self.rows.items())
+        if not rows:
+            return [[] for _ in query_embeddings]
+        vectors = np.asarray([row["embedding"] for _, row in rows], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        results = []
+        for query in np.asarray(query_embeddings, dtype=np.float32):
+            scores = vectors @ (query / max(np.linalg.norm(query), 1e-12))
+            order = np.argsort(-scores, kind="stable")[:top_k]
+            results.append([{"id": rows[i][0], "score": float(scores[i])}
+                             | {field: rows[i][1][field] for field in output_fields} for i in order])
+        return results
+
+    def flush(self):
+        self.flushes += 1
@@ -1,3 +1,28 @@
-from .gemini_embedder import GeminiEmbedder
+from importlib import import_module
 
-__all__ = ["GeminiEmbedder"]
\ No newline at end of file
+# Tên được export và module chứa nó, import khi dùng lần đầu
+_EXPORTS = {
+    "BaseEmbedder": ".base",
+    "get_embedder": ".base",
+    "GeminiEmbedder": ".gemini_embedder",
+    "HashingEmbedder": ".hashing_embedder",
+    "CachedEmbedder": ".embedding_cache",
+    "EmbeddingCache": ".embedding_cache",
+    "AdaptiveConcurrency": ".rate_limit",
+    "EmbeddingError": ".rate_limit",
+    "TokenBucket": ".rate_limit"
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value  # Các lần sau không qua __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
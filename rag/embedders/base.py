@@ -0,0 +1,54 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+import numpy as np
+
+
+class BaseEmbedder(ABC):
+    """
+    Interface of the embedding backends used by RAGPipeline.
+
+    Subclasses set `model_name` (part of the embedding cache key, so two
+    backends never share vectors) and implement embed_documents, embed_query
+    and get_dimension. Vectors are float32 NumPy arrays. `max_input_tokens` is the longest text the backend
+    embeds without truncation (None if unlimited); it caps the pipeline's
+    token budget.
+    """
+    model_name: str
+    max_input_tokens: Optional[int] = None
+
+    @abstractmethod
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """Embed texts for storage: float32 array of shape (len(texts), dimension)"""
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed several queries for retrieval (one embed_query call each unless overridden)"""
+        if not queries:
+            return np.zeros((0, self.get_dimension()), dtype=np.float32)
+        return np.stack([self.embed_query(query) for query in queries])
+
+    @abstractmethod
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a query for retrieval"""
+
+    @abstractmethod
+    def get_dimension(self) -> int:
+        """Get embedding dimension"""
+
+
+def get_embedder(name: str, **kwargs) -> BaseEmbedder:
+    """
+    Create an embedding backend by name.
+
+    Args:
+        name: "gemini" (Gemini API) or "hashing" (local CPU, see HashingEmbedder)
+        **kwargs: Arguments of the backend constructor
+    """
+    match name.lower():
+        case "gemini":
+            from .gemini_embedder import GeminiEmbedder
+            return GeminiEmbedder(**kwargs)
+        case "hashing" | "local":
+            from .hashing_embedder import HashingEmbedder
+            return HashingEmbedder(**kwargs)
+        case _:
+            raise ValueError(f"Unknown embedder backend: {name}")
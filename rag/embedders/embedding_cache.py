@@ -0,0 +1,240 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from utils.metrics import count
+from .base import BaseEmbedder
+from .rate_limit import EmbeddingError
+
+# Cấu hình cho embedding cache
+CACHE_PATH = ".cache/embeddings.sqlite"
+MAX_CACHE_BYTES = 512 * 1024 * 1024  # Dung lượng vector tối đa trước khi evict (512 MB)
+SQLITE_BATCH_SIZE = 500  # Số key trên mỗi câu lệnh SELECT ... IN (...)
+ACCESS_FLUSH_SIZE = 1000  # Số lần đọc trúng được gom lại trước khi ghi last_access xuống SQLite
+
+
+def embedding_key(model_name: str, task_type: str, text: str) -> str:
+    """Content-addressed cache key for one (model, task type, text) triple"""
+    digest = hashlib.sha256()
+    for part in (model_name, task_type, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = MAX_CACHE_BYTES):
+        """
+        On-disk embedding cache backed by SQLite.
+
+        Vectors are stored as float32 blobs. When the stored vectors exceed
+        `max_bytes`, the least recently used entries are evicted. The total
+        size is read once when the cache is opened and kept up to date in
+        memory; access times of hits are buffered and written in batches
+        (at the latest before an eviction and on close).
+
+        Args:
+            path: SQLite database file
+            max_bytes: Size budget for stored vectors
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        self._accessed: Dict[str, float] = {}  # key -> last_access chưa ghi xuống SQLite
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Look up vectors by key, updating hit/miss counters and LRU order"""
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), SQLITE_BATCH_SIZE):
+                batch = keys[start:start + SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    # Đọc trực tiếp blob float32, không tạo list float
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                self._accessed.update((key, now) for key in found)
+                if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                    with self._conn:
+                        self._flush_accessed()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        count("cache_hits", len(found))
+        count("cache_misses", len(keys) - len(found))
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, np.ndarray]]):
+        """Store vectors and evict least recently used entries if over budget"""
+        now = time.time()
+        rows = []
+        for key, vector in items:
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((key, blob, len(blob), now))
+        if not rows:
+            return
+
+        with self._lock:
+            # Kích thước cũ của các key bị ghi đè, để tổng trong bộ nhớ không cần SUM trên cả bảng
+            new_sizes = {key: size for key, _, size, _ in rows}
+            replaced = 0
+            keys = list(new_sizes)
+            for start in range(0, len(keys), SQLITE_BATCH_SIZE):
+                batch = keys[start:start + SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                replaced += self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchone()[0]
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, size, last_access) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                for key in new_sizes:
+                    self._accessed.pop(key, None)
+                self._total_bytes += sum(new_sizes.values()) - replaced
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+
+    def _flush_accessed(self):
+        """Write the buffered access times of cache hits (inside the caller's transaction)"""
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(now, key) for key, now in self._accessed.items()]
+            )
+            self._accessed = {}
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits max_bytes"""
+        # Thứ tự LRU cần thời điểm đọc mới nhất
+        self._flush_accessed()
+        excess = self._total_bytes - self.max_bytes
+        cursor = self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_access ASC")
+        evicted = []
+        for key, size in cursor:
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+            self._total_bytes -= size
+        cursor.close()
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "bytes": self._total_bytes
+            }
+
+    def close(self):
+        with self._lock:
+            with self._conn:
+                self._flush_accessed()
+            self._conn.close()
+
+
+class CachedEmbedder(BaseEmbedder):
+    def __init__(self, embedder, cache: EmbeddingCache):
+        """
+        Wrap an embedder so that only cache misses are sent to it.
+
+        Args:
+            embedder: Embedder exposing embed_documents/embed_query/get_dimension
+                and a `model_name` attribute
+            cache: Cache used to store vectors
+        """
+        self.embedder = embedder
+        self.cache = cache
+        self.model_name = embedder.model_name
+        self.max_input_tokens = getattr(embedder, "max_input_tokens", None)
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed documents, reusing cached vectors for repeated texts
+
+        Raises:
+            EmbeddingError: Same as the wrapped embedder, with indices
+                relative to `texts`. Vectors that were embedded are cached.
+        """
+        return self._embed_cached(texts, "retrieval_document", self.embedder.embed_documents)
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed several queries for retrieval, using the cache"""
+        return self._embed_cached(queries, "retrieval_query", self.embedder.embed_queries)
+
+    def _embed_cached(self, texts: List[str], task_type: str, embed_fn) -> np.ndarray:
+        """Look texts up in the cache and embed the misses with `embed_fn`"""
+        keys = [embedding_key(self.model_name, task_type, text) for text in texts]
+        found = self.cache.get_many(set(keys))
+
+        # Mỗi text bị miss chỉ embed một lần, kể cả khi lặp lại trong batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        error = None
+        if missing:
+            try:
+                new_embeddings = embed_fn(list(missing.values()))
+            except EmbeddingError as e:
+                error = e
+                new_embeddings = e.embeddings
+            new_items = {key: vector for key, vector in zip(missing.keys(), new_embeddings) if vector is not None}
+            self.cache.put_many(new_items.items())
+            found.update(new_items)
+
+        if error is not None:
+            embeddings = [found.get(key) for key in keys]
+            failed_indices = [i for i, vector in enumerate(embeddings) if vector is None]
+            raise EmbeddingError(str(error), embeddings, failed_indices) from error
+        if not keys:
+            return np.zeros((0, self.get_dimension()), dtype=np.float32)
+        # Một mảng float32 liền mạch (n, dimension)
+        return np.stack([found[key] for key in keys])
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed query for retrieval, using the cache"""
+        key = embedding_key(self.model_name, "retrieval_query", query)
+        found = self.cache.get_many([key])
+        if key in found:
+            return found[key]
+
+        embedding = self.embedder.embed_query(query)
+        self.cache.put_many([(key, embedding)])
+        return embedding
+
+    def get_dimension(self) -> int:
+        """Get embedding dimension"""
+        return self.embedder.get_dimension()
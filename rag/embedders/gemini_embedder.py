@@ -1,50 +1,236 @@
-import google.generativeai as genai
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import contextvars
+import logging
 import os
+import threading
+import time
+import numpy as np
 from dotenv import load_dotenv
+from utils.metrics import count, observe_embed_request
+from .base import BaseEmbedder
+from .rate_limit import (
+    AdaptiveConcurrency, EmbeddingError, TokenBucket, backoff_delay, BACKOFF_BASE, BACKOFF_MAX, MAX_RETRIES
+)
 
 load_dotenv()
 
-class GeminiEmbedder:
-    def __init__(self):
-        """Initialize Gemini embedder with text-embedding-004"""
-        api_key=os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
-        genai.configure(api_key=api_key)
+logger = logging.getLogger(__name__)
+
+# Cấu hình batching cho embed_documents
+BATCH_SIZE = 100  # Số text trên mỗi request (giới hạn của batchEmbedContents)
+MAX_CONCURRENCY = 4  # Số request được chạy song song tối đa
+REQUESTS_PER_MINUTE = 1500  # Quota request/phút của text-embedding-004
+MAX_INPUT_TOKENS = 2048  # Số token tối đa của một text, phần dư bị cắt bỏ
+
+# HTTP status được coi là lỗi tạm thời và được retry
+RATE_LIMIT_CODES = {429}
+TRANSIENT_CODES = {408, 500, 502, 503, 504}
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status of a google.api_core error (None for other exceptions)"""
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return error_status(error) in RATE_LIMIT_CODES
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, transient 5xx, timeouts and connection errors"""
+    status = error_status(error)
+    if status is not None:
+        return status in RATE_LIMIT_CODES or status in TRANSIENT_CODES
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class GeminiEmbedder(BaseEmbedder):
+    def __init__(self,
+                 batch_size: int = BATCH_SIZE,
+                 max_concurrency: int = MAX_CONCURRENCY,
+                 embed_fn: Optional[Callable] = None,
+                 requests_per_minute: Optional[float] = REQUESTS_PER_MINUTE,
+                 max_retries: int = MAX_RETRIES,
+                 backoff_base: float = BACKOFF_BASE,
+                 backoff_max: float = BACKOFF_MAX):
+        """
+        Initialize Gemini embedder with text-embedding-004. The API client is
+        imported and configured on the first request.
+
+        Args:
+            batch_size: Number of texts sent in a single embed request
+            max_concurrency: Maximum number of embed requests in flight
+            embed_fn: Replacement for `genai.embed_content` with the same
+                signature (e.g. a local fake backend). When given, no API key
+                is required.
+            requests_per_minute: Client-side rate limit shared by all
+                requests of this embedder (None disables it)
+            max_retries: Retries of a request failing with a rate-limit,
+                transient server or connection error
+            backoff_base: Maximum delay of the first retry in seconds; the
+                delay doubles on every retry, with full jitter
+            backoff_max: Upper bound of the retry delay in seconds
+
+        Concurrency starts at `max_concurrency`, is halved on every 429 and
+        grows back by one after a run of successful requests.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if max_retries < 0:
+            raise ValueError("max_retries must not be negative")
+
+        self.api_key = None
+        if embed_fn is None:
+            self.api_key = os.getenv("GEMINI_API_KEY")
+            if not self.api_key:
+                raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+        # None: google-generativeai được import và cấu hình ở request đầu tiên
+        self.embed_fn = embed_fn
+        self._configure_lock = threading.Lock()
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = TokenBucket.per_minute(requests_per_minute) if requests_per_minute else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
         self.model_name = "models/text-embedding-004"
         self.dimension = 768  # text-embedding-004 dimension
-    
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Embed multiple documents for storage"""
-        embeddings = []
-        for text in texts:
+        self.max_input_tokens = MAX_INPUT_TOKENS
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed multiple documents for storage.
+
+        Texts are grouped into batches of `batch_size` and up to
+        `max_concurrency` batches are embedded at the same time.
+        The returned float32 array of shape (len(texts), dimension) keeps
+        the order of `texts`.
+
+        Raises:
+            EmbeddingError: Some batches failed after all retries. The error
+                carries the embeddings of the other texts and the indices of
+                the failed ones.
+        """
+        return self._embed_texts(texts, "retrieval_document")
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed several queries for retrieval, batched like embed_documents
+
+        Raises:
+            EmbeddingError: Same as embed_documents
+        """
+        return self._embed_texts(queries, "retrieval_query")
+
+    def _embed_texts(self, texts: List[str], task_type: str) -> np.ndarray:
+        """Embed texts in concurrent batches, raising EmbeddingError on failed batches"""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+        if len(batches) <= 1 or self.max_concurrency == 1:
+            results = [self._embed_batch_safe(batch, task_type) for batch in batches]
+        else:
+            # Mỗi batch chạy trong một bản copy của context để metrics đi theo request
+            contexts = [contextvars.copy_context() for _ in batches]
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                # executor.map trả kết quả theo đúng thứ tự batch
+                results = list(executor.map(
+                    lambda context, batch: context.run(self._embed_batch_safe, batch, task_type), contexts, batches
+                ))
+
+        errors = [error for _, error in results if error is not None]
+        if errors:
+            embeddings = []
+            failed_indices = []
+            for batch, (batch_embeddings, error) in zip(batches, results):
+                if error is not None:
+                    failed_indices.extend(range(len(embeddings), len(embeddings) + len(batch)))
+                    embeddings.extend([None] * len(batch))
+                else:
+                    embeddings.extend(batch_embeddings)
+            raise EmbeddingError(
+                f"Failed to embed {len(failed_indices)} of {len(texts)} texts: {str(errors[-1])}",
+                embeddings, failed_indices
+            )
+        if not results:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.concatenate([batch_embeddings for batch_embeddings, _ in results])
+
+    def _embed_batch_safe(self, texts: List[str], task_type: str) -> Tuple[Optional[np.ndarray], Optional[Exception]]:
+        """Embed one batch, returning (embeddings, None) or (None, error)"""
+        try:
+            return self._embed_batch(texts, task_type), None
+        except Exception as e:
+            logger.error(f"Error embedding batch of {len(texts)} texts: {str(e)}")
+            return None, e
+
+    def _embed_batch(self, texts: List[str], task_type: str = "retrieval_document") -> np.ndarray:
+        """Embed one batch of texts with a single request, as a float32 array"""
+        result = self._call_with_retry(content=texts, task_type=task_type)
+        return np.asarray(result['embedding'], dtype=np.float32)
+
+    def _call_with_retry(self, content, task_type: str) -> Dict[str, Any]:
+        """
+        Call embed_fn under the rate limiter and concurrency limit, retrying
+        rate-limit and transient errors with exponential backoff.
+        """
+        embed_fn = self._get_embed_fn()
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            start = time.perf_counter()
             try:
-                result = genai.embed_content(
-                    model=self.model_name,
-                    content=text,
-                    task_type="retrieval_document"
-                )
-                embeddings.append(result['embedding'])
+                try:
+                    with self.concurrency:
+                        result = embed_fn(model=self.model_name, content=content, task_type=task_type)
+                finally:
+                    # Chỉ đo request, không tính thời gian backoff trước lần retry
+                    observe_embed_request(time.perf_counter() - start)
+                self.concurrency.on_success()
+                return result
             except Exception as e:
-                print(f"Error embedding document: {str(e)}")
-                # Fallback với zero vector
-                embeddings.append([0.0] * self.dimension)
-        return embeddings
-    
-    def embed_query(self, query: str) -> List[float]:
-        """Embed query for retrieval"""
+                if is_rate_limited(e):
+                    self.concurrency.on_rate_limited()
+                    count("embed_rate_limited")
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                logger.warning(f"Embed request failed ({str(e)}), retry {attempt + 1}/{self.max_retries} "
+                               f"in {delay:.1f}s")
+                count("embed_retries")
+                attempt += 1
+            time.sleep(delay)
+
+    def _get_embed_fn(self) -> Callable:
+        """embed_fn, importing and configuring google-generativeai on first use"""
+        if self.embed_fn is None:
+            with self._configure_lock:
+                if self.embed_fn is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self.embed_fn = genai.embed_content
+        return self.embed_fn
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed query for retrieval
+
+        Raises:
+            EmbeddingError: The query could not be embedded after retries
+        """
         try:
-            result = genai.embed_content(
-                model=self.model_name,
-                content=query,
-                task_type="retrieval_query"
-            )
-            return result['embedding']
+            result = self._call_with_retry(content=query, task_type="retrieval_query")
+            return np.asarray(result['embedding'], dtype=np.float32)
         except Exception as e:
-            print(f"Error embedding query: {str(e)}")
-            return [0.0] * self.dimension
-    
+            logger.error(f"Error embedding query: {str(e)}")
+            raise EmbeddingError(f"Failed to embed query: {str(e)}", [None], [0]) from e
+
     def get_dimension(self) -> int:
         """Get embedding dimension"""
-        return self.dimension
\ No newline at end of file
+        return self.dimension
@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+import numpy as np
+from .base import BaseEmbedder
+
+# Cấu hình mặc định của hashing embedder
+DIMENSION = 1024  # Số bucket (chiều vector)
+NGRAM_RANGE = (3, 5)  # Độ dài n-gram ký tự, tính cả khoảng trắng quanh từ
+BATCH_SIZE = 256  # Số text được vector hóa trong một lần tính numpy
+NUM_THREADS = 1  # Số thread xử lý các batch song song
+
+# Hằng số của hash n-gram (FNV-1a 64-bit) và bước trộn bit (splitmix64)
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+_MIX = np.uint64(0xBF58476D1CE4E5B9)
+
+
+class HashingEmbedder(BaseEmbedder):
+    def __init__(self,
+                 dimension: int = DIMENSION,
+                 ngram_range: Tuple[int, int] = NGRAM_RANGE,
+                 batch_size: int = BATCH_SIZE,
+                 num_threads: int = NUM_THREADS,
+                 normalize: bool = True):
+        """
+        Local CPU embedder hashing character n-grams into a fixed-size vector.
+
+        A deterministic baseline that needs no network, API key or model
+        download: ingest and tests run offline and at CPU speed. Texts are
+        lowercased, whitespace is collapsed, and every character n-gram is
+        hashed to a bucket with a +/-1 sign (feature hashing). Counts are
+        log-scaled and vectors L2-normalized, so cosine similarity measures
+        n-gram overlap; it captures lexical, not semantic, similarity.
+
+        Args:
+            dimension: Vector dimension (number of hash buckets)
+            ngram_range: Smallest and largest n-gram length
+            batch_size: Texts vectorized together in one NumPy pass
+            num_threads: Threads embedding batches in parallel
+            normalize: L2-normalize vectors
+        """
+        if dimension < 1:
+            raise ValueError("dimension must be at least 1")
+        if not 1 <= ngram_range[0] <= ngram_range[1]:
+            raise ValueError(f"Invalid ngram_range: {ngram_range}")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if num_threads < 1:
+            raise ValueError("num_threads must be at least 1")
+
+        self.dimension = dimension
+        self.ngram_range = tuple(ngram_range)
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.normalize = normalize
+        # Tham số nằm trong model_name để cache không trộn vector của các cấu hình khác nhau
+        self.model_name = f"local/hashing-{dimension}-{ngram_range[0]}-{ngram_range[1]}"
+        self.max_input_tokens = None
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts in batches of `batch_size`, on `num_threads` threads.
+
+        Returns:
+            float32 array of shape (len(texts), dimension)
+        """
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1 or self.num_threads == 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            # NumPy nhả GIL trong các phép tính trên mảng lớn
+            with ThreadPoolExecutor(max_workers=min(self.num_threads, len(batches))) as executor:
+                results = list(executor.map(self._embed_batch, batches))
+        if not results:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.concatenate(results)
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed several queries; same vectors as embed_documents"""
+        return self.embed_documents(queries)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed query for retrieval"""
+        return self._embed_batch([query])[0]
+
+    def get_dimension(self) -> int:
+        """Get embedding dimension"""
+        return self.dimension
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Vectorize a batch at once: all texts are hashed as one code point array"""
+        # Mỗi text được bao bởi khoảng trắng để n-gram đầu/cuối từ được đánh dấu,
+        # các text được nối bằng "\x00" và n-gram chứa "\x00" bị bỏ
+        docs = [" " + " ".join(text.lower().split()) + " " for text in texts]
+        codes = np.frombuffer("\x00".join(docs).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        lengths = np.array([len(doc) + 1 for doc in docs])
+        doc_ids = np.repeat(np.arange(len(docs)), lengths)[:len(codes)]
+        separators = np.concatenate(([0], np.cumsum(codes == 0)))
+
+        counts = np.zeros(len(docs) * self.dimension)
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            num_ngrams = len(codes) - n + 1
+            if num_ngrams <= 0:
+                break
+            hashes = np.full(num_ngrams, _FNV_OFFSET ^ np.uint64(n), dtype=np.uint64)
+            for k in range(n):
+                # Phép nhân uint64 tràn số theo modulo 2^64, đúng như FNV
+                hashes = (hashes ^ codes[k:k + num_ngrams]) * _FNV_PRIME
+            valid = separators[n:n + num_ngrams] == separators[:num_ngrams]
+            hashes = hashes[valid]
+            hashes = (hashes ^ (hashes >> np.uint64(31))) * _MIX
+            buckets = (hashes % np.uint64(self.dimension)).astype(np.int64)
+            signs = np.where(hashes >> np.uint64(63), -1.0, 1.0)
+            counts += np.bincount(doc_ids[:num_ngrams][valid] * self.dimension + buckets,
+                                  weights=signs, minlength=len(counts))
+
+        vectors = (np.sign(counts) * np.log1p(np.abs(counts))).reshape(len(docs), self.dimension)
+        if self.normalize:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors.astype(np.float32)
+
@@ -0,0 +1,114 @@
+import random
+import threading
+import time
+from typing import List, Optional, Sequence
+
+# Cấu hình retry mặc định
+MAX_RETRIES = 5  # Số lần thử lại sau lần gọi đầu tiên
+BACKOFF_BASE = 1.0  # Giây, delay tối đa của lần retry đầu tiên
+BACKOFF_MAX = 60.0  # Giây, trần của delay
+# Sau bao nhiêu request thành công liên tiếp thì tăng concurrency thêm 1
+CONCURRENCY_INCREASE_AFTER = 10
+
+
+class EmbeddingError(Exception):
+    def __init__(self, message: str, embeddings: Sequence[Optional[List[float]]], failed_indices: List[int]):
+        """
+        Some texts could not be embedded, even after retries.
+
+        Args:
+            message: Description of the last error
+            embeddings: One entry per input text, None for the failed ones
+            failed_indices: Positions of the failed texts in the input
+        """
+        super().__init__(message)
+        self.embeddings = list(embeddings)
+        self.failed_indices = failed_indices
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Thread-safe token bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (defaults to one second worth of tokens)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float) -> "TokenBucket":
+        """Bucket matching a per-minute quota, with bursts of up to one second"""
+        return cls(requests_per_minute / 60)
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until `tokens` are available, then take them"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    def __init__(self, max_limit: int, min_limit: int = 1,
+                 increase_after: int = CONCURRENCY_INCREASE_AFTER):
+        """
+        Concurrency limit that halves on rate-limit errors and grows back by
+        one after `increase_after` consecutive successes (AIMD).
+        """
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.increase_after = increase_after
+        self.limit = max_limit
+        self._active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+
+    def release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def on_success(self):
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.increase_after and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify()
+
+    def on_rate_limited(self):
+        with self._condition:
+            self.limit = max(self.min_limit, self.limit // 2)
+            self._successes = 0
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
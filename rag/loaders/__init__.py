@@ -1,17 +1,39 @@
-from .manager import DocumentLoaderManager
-from .csv_loader import load_csv
-from .docx_loader import load_docx
-from .pdf_loader import load_pdf
-from .text_loader import load_text
-from .url_loader import load_url
-from .xlsx_loader import load_xlsx
+from importlib import import_module
 
-__all__ = [
-    'load_csv',
-    'load_docx',
-    'load_pdf',
-    'load_text',
-    'load_url',
-    'load_xlsx',
-    'DocumentLoaderManager'
-]
\ No newline at end of file
+# Tên được export và module chứa nó; module (pandas, pypdf, aiohttp...) chỉ
+# được import khi tên được dùng lần đầu
+_EXPORTS = {
+    'load_csv': '.csv_loader',
+    'load_docx': '.docx_loader',
+    'load_pdf': '.pdf_loader',
+    'load_text': '.text_loader',
+    'load_url': '.url_loader',
+    'load_xlsx': '.xlsx_loader',
+    'lazy_load_docx': '.docx_loader',
+    'lazy_load_pdf': '.pdf_loader',
+    'load_pdf_parallel': '.pdf_loader',
+    'lazy_load_pdf_parallel': '.pdf_loader',
+    'lazy_load_text': '.text_loader',
+    'lazy_load_url': '.url_loader',
+    'stream_csv_chunks': '.csv_loader',
+    'stream_xlsx_chunks': '.xlsx_loader',
+    'DocumentLoaderManager': '.manager',
+    'register_loader': '.manager',
+    'AsyncUrlLoader': '.async_url_loader',
+    'HttpValidatorStore': '.async_url_loader',
+    'PdfPageCache': '.pdf_loader'
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value  # Các lần sau không qua __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,422 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import xml.etree.ElementTree as ElementTree
+from contextlib import aclosing
+from html.parser import HTMLParser
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import aiohttp
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Cấu hình mặc định của URL loader
+MAX_CONCURRENCY = 16  # Số request đồng thời tối đa (kích thước connection pool)
+PER_HOST_CONCURRENCY = 4  # Số request đồng thời tối đa trên một host
+TIMEOUT = 30.0  # Giây cho mỗi request
+MAX_PAGES = 100  # Số trang tối đa của một lần crawl
+MAX_BYTES = 10 * 1024 * 1024  # Trang lớn hơn bị bỏ qua
+READ_CHUNK_SIZE = 64 * 1024  # Số byte mỗi lần đọc body
+STREAM_BUFFER = 16  # Số trang chờ consumer của lazy_load
+USER_AGENT = "file2rag/1.0 (Document Processing Tool)"
+
+# Tag không chứa text hiển thị và tag tạo xuống dòng
+_SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+_BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "table", "tr", "section", "article", "header", "footer",
+    "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "title", "nav", "aside", "main"
+}
+_TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+
+class _HtmlExtractor(HTMLParser):
+    """Visible text, title, description, language and links of an HTML page"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.links: List[str] = []
+        self.title = ""
+        self.description = ""
+        self.language = ""
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "html":
+            self.language = attrs.get("lang") or ""
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "meta" and (attrs.get("name") or "").lower() == "description":
+            self.description = attrs.get("content") or ""
+        elif tag == "a" and attrs.get("href"):
+            self.links.append(attrs["href"])
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if tag in _SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def parse_html(html: str) -> Tuple[str, Dict[str, str], List[str]]:
+    """
+    Extract the visible text of an HTML page.
+
+    Returns:
+        (text, {"title", "description", "language"}, raw href values)
+    """
+    extractor = _HtmlExtractor()
+    extractor.feed(html)
+    extractor.close()
+    metadata = {
+        "title": " ".join(extractor.title.split()),
+        "description": extractor.description,
+        "language": extractor.language
+    }
+    return extractor.text(), metadata, extractor.links
+
+
+def parse_sitemap(xml: Union[str, bytes]) -> Tuple[List[str], List[str]]:
+    """
+    Parse a sitemap or sitemap index.
+
+    Returns:
+        (page URLs, nested sitemap URLs)
+    """
+    root = ElementTree.fromstring(xml)
+    pages, sitemaps = [], []
+    for element in root.iter():
+        # Bỏ namespace: {http://www.sitemaps.org/...}loc -> loc
+        if element.tag.rsplit("}", 1)[-1] != "loc" or not element.text:
+            continue
+        parent = "sitemap" if root.tag.rsplit("}", 1)[-1] == "sitemapindex" else "url"
+        (sitemaps if parent == "sitemap" else pages).append(element.text.strip())
+    return pages, sitemaps
+
+
+class HttpValidatorStore:
+    def __init__(self, path: str):
+        """
+        SQLite store of the ETag / Last-Modified validators of fetched pages.
+
+        Pages whose validators are recorded are fetched with a conditional
+        GET and skipped when the server answers 304 Not Modified. The links
+        of a page are stored with it, so a crawl still follows them when the
+        page itself is not modified.
+
+        Args:
+            path: SQLite database file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS validators ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, links TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[Tuple[Optional[str], Optional[str], List[str]]]:
+        """(etag, last_modified, links) recorded for a URL, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, links FROM validators WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], links: Iterable[str] = ()):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO validators (url, etag, last_modified, links) VALUES (?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(list(links)))
+            )
+            self._conn.commit()
+
+    def record(self, document: Document, links: Optional[Iterable[str]] = None):
+        """
+        Record the validators of a page loaded by AsyncUrlLoader, once it is safely stored.
+
+        Args:
+            document: Page as yielded by AsyncUrlLoader
+            links: Links of the page, if already removed from its metadata
+        """
+        metadata = document.metadata
+        if metadata.get("etag") or metadata.get("last_modified"):
+            links = metadata.get("links", ()) if links is None else links
+            self.put(metadata["source"], metadata.get("etag"), metadata.get("last_modified"), links)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class AsyncUrlLoader:
+    def __init__(self,
+                 max_concurrency: int = MAX_CONCURRENCY,
+                 per_host_concurrency: int = PER_HOST_CONCURRENCY,
+                 timeout: float = TIMEOUT,
+                 max_depth: int = 0,
+                 max_pages: int = MAX_PAGES,
+                 same_domain: bool = True,
+                 sitemap: Union[bool, str] = False,
+                 validators: Optional[HttpValidatorStore] = None,
+                 max_bytes: int = MAX_BYTES,
+                 user_agent: Optional[str] = None):
+        """
+        Asynchronous URL loader with a pooled HTTP session and optional crawling.
+
+        All requests of a load share one aiohttp session, whose connection
+        pool is limited to `max_concurrency` connections and
+        `per_host_concurrency` per host. Pages are yielded as they arrive,
+        not in request order.
+
+        Args:
+            max_concurrency: Requests in flight
+            per_host_concurrency: Requests in flight to the same host
+            timeout: Seconds per request
+            max_depth: Follow links up to this many hops from the start URLs
+                (0: only load the given URLs)
+            max_pages: Stop scheduling pages after this many URLs
+            same_domain: Only follow links to the host of a start URL
+            sitemap: True to also load /sitemap.xml of every start host, or
+                the URL of a sitemap (sitemap indexes are followed)
+            validators: Send conditional GETs with the recorded ETag /
+                Last-Modified and skip pages answering 304 (listed in
+                `not_modified` after the load). Validators of loaded pages
+                are in their metadata; record them with
+                HttpValidatorStore.record once the page is stored.
+            max_bytes: Skip larger responses
+            user_agent: User-Agent header (USER_AGENT env var, then a default)
+        """
+        if max_concurrency < 1 or per_host_concurrency < 1:
+            raise ValueError("Concurrency limits must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.timeout = timeout
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.same_domain = same_domain
+        self.sitemap = sitemap
+        self.validators = validators
+        self.max_bytes = max_bytes
+        self.user_agent = user_agent or os.getenv("USER_AGENT", USER_AGENT)
+        self.not_modified: List[str] = []
+        self.failed: Dict[str, str] = {}
+
+    async def alazy_load(self, urls: Union[str, Iterable[str]]) -> AsyncIterator[Document]:
+        """Yield one Document per fetched page, as pages arrive"""
+        start_urls = [urls] if isinstance(urls, str) else list(urls)
+        self.not_modified = []
+        self.failed = {}
+        hosts = {urlparse(url).netloc for url in start_urls}
+        seen: Set[str] = set()
+        work: asyncio.Queue = asyncio.Queue()
+        results: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER)
+
+        def schedule(url: str, depth: int):
+            url = urldefrag(url)[0]
+            if url in seen or len(seen) >= self.max_pages or urlparse(url).scheme not in ("http", "https"):
+                return
+            if self.same_domain and urlparse(url).netloc not in hosts:
+                return
+            seen.add(url)
+            work.put_nowait((url, depth))
+
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.per_host_concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={"User-Agent": self.user_agent}) as session:
+            if self.sitemap:
+                for sitemap_url in self._sitemap_urls(start_urls):
+                    for url in await self._fetch_sitemap(session, sitemap_url):
+                        schedule(url, 0)
+            for url in start_urls:
+                schedule(url, 0)
+
+            async def worker():
+                while True:
+                    url, depth = await work.get()
+                    try:
+                        document, links = await self._fetch_page(session, url)
+                        if depth < self.max_depth:
+                            for link in links:
+                                schedule(urljoin(url, link), depth + 1)
+                        if document is not None:
+                            document.metadata["depth"] = depth
+                            await results.put(document)
+                    except Exception as e:
+                        logger.warning(f"Failed to load {url}: {str(e)}")
+                        self.failed[url] = str(e)
+                    finally:
+                        work.task_done()
+
+            async def close_when_done():
+                await work.join()
+                await results.put(None)
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+            closer = asyncio.create_task(close_when_done())
+            try:
+                while (document := await results.get()) is not None:
+                    yield document
+            finally:
+                for task in (*workers, closer):
+                    task.cancel()
+                await asyncio.gather(*workers, closer, return_exceptions=True)
+
+    async def aload(self, urls: Union[str, Iterable[str]]) -> List[Document]:
+        return [document async for document in self.alazy_load(urls)]
+
+    def lazy_load(self, urls: Union[str, Iterable[str]]) -> Iterator[Document]:
+        """
+        Synchronous version of alazy_load: the event loop runs in a
+        background thread and pages are handed over through a bounded queue,
+        so the caller can process a page while the next ones download.
+        """
+        pages: queue.Queue = queue.Queue(maxsize=STREAM_BUFFER)
+        done = object()
+        stop = threading.Event()
+
+        async def produce():
+            async with aclosing(self.alazy_load(urls)) as documents:
+                async for document in documents:
+                    # put chạy trong thread để không chặn event loop khi queue đầy
+                    await asyncio.to_thread(pages.put, document)
+                    if stop.is_set():
+                        return
+
+        def run():
+            try:
+                asyncio.run(produce())
+            except Exception as e:
+                pages.put(e)
+            finally:
+                pages.put(done)
+
+        thread = threading.Thread(target=run, name="async-url-loader", daemon=True)
+        thread.start()
+        try:
+            while (item := pages.get()) is not done:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            # Giải phóng producer nếu nó đang chờ queue còn chỗ
+            while thread.is_alive():
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            thread.join()
+
+    def load(self, urls: Union[str, Iterable[str]]) -> List[Document]:
+        return list(self.lazy_load(urls))
+
+    def _sitemap_urls(self, start_urls: List[str]) -> List[str]:
+        if isinstance(self.sitemap, str):
+            return [self.sitemap]
+        origins = dict.fromkeys(f"{urlparse(url).scheme}://{urlparse(url).netloc}" for url in start_urls)
+        return [f"{origin}/sitemap.xml" for origin in origins]
+
+    async def _fetch_sitemap(self, session: aiohttp.ClientSession, sitemap_url: str, depth: int = 0) -> List[str]:
+        """Page URLs of a sitemap, following sitemap indexes a few levels deep"""
+        try:
+            async with session.get(sitemap_url) as response:
+                if response.status != 200:
+                    logger.warning(f"Sitemap {sitemap_url}: HTTP {response.status}")
+                    return []
+                pages, sitemaps = parse_sitemap(await response.read())
+        except Exception as e:
+            logger.warning(f"Failed to load sitemap {sitemap_url}: {str(e)}")
+            return []
+        if depth < 3:
+            for nested in sitemaps:
+                pages.extend(await self._fetch_sitemap(session, nested, depth + 1))
+        return pages
+
+    async def _read_body(self, response: aiohttp.ClientResponse) -> Optional[bytes]:
+        """Whole response body, or None once it exceeds max_bytes"""
+        # content.read(n) chỉ trả phần đã có trong buffer: đọc đến EOF
+        parts = []
+        size = 0
+        async for part in response.content.iter_chunked(READ_CHUNK_SIZE):
+            size += len(part)
+            if size > self.max_bytes:
+                return None
+            parts.append(part)
+        return b"".join(parts)
+
+    async def _fetch_page(self, session: aiohttp.ClientSession, url: str) -> Tuple[Optional[Document], List[str]]:
+        """
+        GET one page (conditionally if validators are recorded).
+
+        Returns:
+            (Document or None if skipped, links to follow)
+        """
+        headers = {}
+        recorded = self.validators.get(url) if self.validators else None
+        if recorded:
+            etag, last_modified, _ = recorded
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and recorded:
+                self.not_modified.append(url)
+                return None, recorded[2]
+            response.raise_for_status()
+            content_type = response.content_type or ""
+            if not content_type.startswith(_TEXT_TYPES):
+                logger.info(f"Skipping {url}: unsupported content type {content_type}")
+                return None, []
+            if response.content_length and response.content_length > self.max_bytes:
+                logger.info(f"Skipping {url}: {response.content_length} bytes")
+                return None, []
+            body = await self._read_body(response)
+            if body is None:
+                logger.info(f"Skipping {url}: larger than {self.max_bytes} bytes")
+                return None, []
+            html = body.decode(response.charset or "utf-8", errors="replace")
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            final_url = str(response.url)
+
+        if content_type == "text/plain":
+            text, metadata, links = html, {"title": "", "description": "", "language": ""}, []
+        else:
+            text, metadata, links = parse_html(html)
+        links = [urljoin(final_url, link) for link in links]
+        metadata = {"source": url, **metadata, "etag": etag, "last_modified": last_modified, "links": links}
+        return Document(page_content=text, metadata=metadata), links
@@ -1,20 +1,21 @@
 import pandas as pd
 from langchain_core.documents import Document
-from typing import List
+from typing import Iterator, List
+from ..splitters.table_splitter import chunk_documents_by_rows
+from .table_rows import CHUNK_SIZE, READ_CHUNK_ROWS, format_rows, iter_row_chunks
 
 def load_csv(file_path: str) -> List[Document]:
     """
     Load CSV file and return a single Document (no chunking).
     Each row is formatted as key: value pairs for better readability.
+    Values are read as text, so they are written as in the file.
     """
     try:
-        df = pd.read_csv(file_path).fillna("")
+        # dtype=str: kiểu không phụ thuộc vào các row khác (1 không thành 1.0 khi cột có ô trống)
+        df = pd.read_csv(file_path, dtype=str).fillna("")
 
         # Chuyển tất cả row thành key: value
-        rows_text = []
-        for _, row in df.iterrows():
-            row_text = "\n".join([f"{col}: {row[col]}" for col in df.columns])
-            rows_text.append(row_text)
+        rows_text = format_rows(df)
 
         doc_text = "\n\n".join(rows_text)
 
@@ -31,14 +32,61 @@ def load_csv(file_path: str) -> List[Document]:
         ]
 
     except Exception as e:
-        return [
-            Document(
-                page_content=f"Error loading CSV file: {str(e)}",
-                metadata={
-                    "source": file_path,
-                    "file_type": "csv",
-                    "error": True,
-                    "error_message": str(e)
-                }
-            )
-        ]
+        return [_error_document(file_path, e)]
+
+def _error_document(file_path: str, error: Exception) -> Document:
+    """Document standing for a CSV file that could not be read"""
+    return Document(
+        page_content=f"Error loading CSV file: {str(error)}",
+        metadata={
+            "source": file_path,
+            "file_type": "csv",
+            "error": True,
+            "error_message": str(error)
+        }
+    )
+
+def stream_csv_chunks(file_path: str,
+                      chunk_size: int = CHUNK_SIZE,
+                      read_chunk_rows: int = READ_CHUNK_ROWS,
+                      count_rows: bool = True) -> Iterator[Document]:
+    """
+    Stream a CSV file as row-chunk Documents with constant memory.
+
+    Yields the same chunks (content and metadata) as
+    `chunk_documents_by_rows(load_csv(file_path), chunk_size)`, reading
+    `read_chunk_rows` rows at a time. Values are read as text like in
+    load_csv, so a row's text does not depend on the other rows of its block.
+
+    Args:
+        file_path: CSV file
+        chunk_size: Number of rows per chunk
+        read_chunk_rows: Rows parsed at a time
+        count_rows: Read the file a first time to count its rows, so chunk
+            metadata carries the totals of load_csv; as that pass parses
+            every row, a malformed file yields the error chunk of load_csv.
+            With False the file is read once, chunks have no totals (see
+            iter_row_chunks) and a malformed row raises when its block is
+            read, after the chunks before it were yielded
+    """
+    try:
+        columns = list(pd.read_csv(file_path, nrows=0).columns)
+        total_rows = None
+        if count_rows:
+            total_rows = 0
+            # Parse đủ các cột (không usecols): lỗi như row thừa field lộ ra trước chunk đầu tiên
+            for block in pd.read_csv(file_path, dtype=str, chunksize=read_chunk_rows):
+                total_rows += len(block)
+    except Exception as e:
+        yield from chunk_documents_by_rows([_error_document(file_path, e)], chunk_size)
+        return
+
+    metadata = {"source": file_path, "file_type": "csv"}
+    if total_rows is not None:
+        metadata["total_rows"] = total_rows
+    metadata["columns"] = columns
+    row_blocks = (
+        format_rows(block.fillna(""))
+        for block in pd.read_csv(file_path, dtype=str, chunksize=read_chunk_rows)
+    )
+    yield from iter_row_chunks(row_blocks, metadata, total_rows, chunk_size)
@@ -1,7 +1,11 @@
 from langchain_community.document_loaders import Docx2txtLoader
-from typing import List
+from typing import Iterator, List
 from langchain_core.documents import Document
 
 def load_docx(file_path: str) -> List[Document]:
     loader = Docx2txtLoader(file_path)
-    return loader.load()
\ No newline at end of file
+    return loader.load()
+
+def lazy_load_docx(file_path: str) -> Iterator[Document]:
+    loader = Docx2txtLoader(file_path)
+    return loader.lazy_load()
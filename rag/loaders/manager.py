@@ -1,42 +1,159 @@
-from typing import List
+from functools import lru_cache
+from importlib import import_module
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 from langchain_core.documents import Document
+import logging
 import os
+import pickle
 from dotenv import load_dotenv
-from utils import clean_documents_spaces
+from utils.text_cleaner import clean_documents_spaces, iter_clean_documents
 # Load environment variables from .env file at the module level
 load_dotenv()
 
-from .csv_loader import load_csv
-from .docx_loader import load_docx
-from .pdf_loader import load_pdf
-from .text_loader import load_text
-from .url_loader import load_url
-from .xlsx_loader import load_xlsx
+logger = logging.getLogger(__name__)
+
+# Hàm loader, hoặc "module:hàm" với module tương đối trong rag.loaders
+LoaderRef = Union[str, Callable]
+
+# Loader của từng extension: (load, lazy_load, là bảng). Module của loader chỉ
+# được import ở lần dùng đầu tiên, nên load một file .txt không kéo theo
+# pandas hay pypdf. Loader bảng (CSV/XLSX) trả về Document đã định dạng,
+# không qua bước clean whitespace và được chunk theo row.
+LOADERS: Dict[str, Tuple[LoaderRef, Optional[LoaderRef], bool]] = {
+    '.csv': ('.csv_loader:load_csv', None, True),
+    '.xlsx': ('.xlsx_loader:load_xlsx', None, True),
+    '.docx': ('.docx_loader:load_docx', '.docx_loader:lazy_load_docx', False),
+    '.pdf': ('.pdf_loader:load_pdf', '.pdf_loader:lazy_load_pdf', False),
+    '.txt': ('.text_loader:load_text', '.text_loader:lazy_load_text', False)
+}
+URL_LOADER = ('.url_loader:load_url', '.url_loader:lazy_load_url', False)
+# Loader thêm bằng register_loader, được gửi lại cho các worker process (spawn
+# chỉ có LOADERS mặc định)
+_REGISTERED: Dict[str, Tuple[LoaderRef, Optional[LoaderRef], bool]] = {}
+
+
+def register_loader(extension: str,
+                    load: LoaderRef,
+                    lazy_load: Optional[LoaderRef] = None,
+                    table: bool = False):
+    """
+    Register the loader of a file extension, replacing any existing one.
+
+    Args:
+        extension: File extension including the dot, e.g. ".md"
+        load: Function file_path -> List[Document], or "package.module:function"
+            imported on first use
+        lazy_load: Function file_path -> Iterator[Document] (or a reference);
+            load is used if None
+        table: Documents are formatted tables: not whitespace-cleaned and
+            chunked by rows
+
+    Registrations reach the worker processes of
+    RAGPipeline.process_documents if they can be pickled: "module:function"
+    references and module-level functions, not lambdas or closures.
+    """
+    LOADERS[extension.lower()] = _REGISTERED[extension.lower()] = (load, lazy_load, table)
+
+
+def registered_loaders() -> Dict[str, Tuple[LoaderRef, Optional[LoaderRef], bool]]:
+    """Loaders added with register_loader that can be sent to worker processes"""
+    loaders = {}
+    for extension, entry in _REGISTERED.items():
+        try:
+            pickle.dumps(entry)
+        except Exception:
+            logger.warning(f"Loader registered for {extension} cannot be pickled and is not "
+                           f"available in worker processes; register it as \"module:function\"")
+            continue
+        loaders[extension] = entry
+    return loaders
+
+
+def restore_loaders(loaders: Dict[str, Tuple[LoaderRef, Optional[LoaderRef], bool]]):
+    """Register loaders in a worker process (ProcessPoolExecutor initializer)"""
+    for extension, entry in loaders.items():
+        register_loader(extension, *entry)
+
+
+@lru_cache(maxsize=None)
+def _import_loader(ref: str) -> Callable:
+    module_name, _, name = ref.partition(":")
+    return getattr(import_module(module_name, __package__), name)
+
+
+def _resolve(ref: LoaderRef) -> Callable:
+    return _import_loader(ref) if isinstance(ref, str) else ref
+
+
+def loader_for(file_path: str) -> Tuple[LoaderRef, Optional[LoaderRef], bool]:
+    """(load, lazy_load, is table) registered for a file path or URL"""
+    if file_path.startswith(("http://", "https://")):
+        return URL_LOADER
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in LOADERS:
+        raise ValueError(f"Unsupported file type: {extension}")
+    return LOADERS[extension]
+
 
 class DocumentLoaderManager:
-    def __init__(self):
+    def __init__(self,
+                 preserve_paragraphs: bool = False,
+                 pdf_workers: int = 1,
+                 pdf_cache_path: Optional[str] = None):
+        """
+        Args:
+            preserve_paragraphs: Keep paragraph breaks ("\n\n") when cleaning
+                whitespace, so text splitters can cut on paragraphs. Off by
+                default: all whitespace collapses to single spaces.
+            pdf_workers: Processes extracting PDF pages in parallel (see
+                lazy_load_pdf_parallel); 1 keeps PyPDFLoader, None uses all CPUs
+            pdf_cache_path: SQLite file caching extracted PDF pages by file
+                hash; no cache if None
+        """
+        self.preserve_paragraphs = preserve_paragraphs
+        self.pdf_workers = pdf_workers
+        self.pdf_cache_path = pdf_cache_path
+        self.pdf_cache = None
+        if pdf_cache_path:
+            from .pdf_loader import PdfPageCache
+            self.pdf_cache = PdfPageCache(pdf_cache_path)
         # Ensure USER_AGENT is set
         if 'USER_AGENT' not in os.environ:
             os.environ['USER_AGENT'] = 'file2rag/1.0 (Document Processing Tool)'
 
     def load(self, file_path: str) -> List[Document]:
-        if(file_path.startswith("http://") or file_path.startswith("https://")):
-            documents = load_url(file_path)
+        load, _, table = loader_for(file_path)
+        if table:
+            return _resolve(load)(file_path)
+        if self._parallel_pdf(file_path):
+            documents = list(self._lazy_load_pdf(file_path))
         else:
-            extension = os.path.splitext(file_path)[1].lower()
-
-            match extension:
-                case '.csv':
-                    return load_csv(file_path)
-                case '.xlsx':
-                    return load_xlsx(file_path)
-                case '.docx':
-                    documents = load_docx(file_path)
-                case '.pdf':
-                    documents = load_pdf(file_path)
-                case '.txt':
-                    documents = load_text(file_path)
-                case _:
-                    raise ValueError(f"Unsupported file type: {extension}")
-                
-        return clean_documents_spaces(documents)
+            documents = _resolve(load)(file_path)
+
+        # Loader vừa tạo các Document này nên có thể sửa trực tiếp
+        return clean_documents_spaces(documents, preserve_paragraphs=self.preserve_paragraphs, in_place=True)
+
+    def lazy_load(self, file_path: str) -> Iterator[Document]:
+        """
+        Yield cleaned documents one at a time (one per page for PDF) instead
+        of loading the whole source first. CSV/XLSX yield the same table
+        Documents as load(); use stream_csv_chunks/stream_xlsx_chunks to
+        stream their rows.
+        """
+        load, lazy_load, table = loader_for(file_path)
+        if table:
+            yield from _resolve(load)(file_path)
+            return
+        if self._parallel_pdf(file_path):
+            documents = self._lazy_load_pdf(file_path)
+        else:
+            documents = _resolve(lazy_load or load)(file_path)
+
+        yield from iter_clean_documents(documents, preserve_paragraphs=self.preserve_paragraphs, in_place=True)
+
+    def _parallel_pdf(self, file_path: str) -> bool:
+        return (self.pdf_workers != 1 or self.pdf_cache is not None) and file_path.lower().endswith('.pdf')
+
+    def _lazy_load_pdf(self, file_path: str) -> Iterator[Document]:
+        from .pdf_loader import lazy_load_pdf_parallel
+        return lazy_load_pdf_parallel(file_path, self.pdf_workers, cache=self.pdf_cache)
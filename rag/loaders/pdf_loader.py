@@ -1,7 +1,239 @@
 from langchain_community.document_loaders import PyPDFLoader
-from typing import List
+from concurrent.futures import Future, ProcessPoolExecutor
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
 from langchain_core.documents import Document
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import pypdf
+
+# Cấu hình cho parallel PDF loader
+PAGES_PER_TASK = 8  # Số trang liên tiếp mỗi worker trích xuất trong một task
+TASKS_PER_WORKER = 2  # Số task đang chạy/chờ trên mỗi worker, giới hạn số trang giữ trong bộ nhớ
+PDF_CACHE_PATH = ".cache/pdf_pages.sqlite"
+HASH_BLOCK_SIZE = 1024 * 1024  # Đọc file theo block 1 MB khi tính hash
 
 def load_pdf(file_path: str) -> List[Document]:
     loader = PyPDFLoader(file_path)
-    return loader.load()
\ No newline at end of file
+    return loader.load()
+
+def lazy_load_pdf(file_path: str) -> Iterator[Document]:
+    loader = PyPDFLoader(file_path)
+    return loader.lazy_load()
+
+
+def _normalize_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normalize PDF document metadata exactly like PyPDFLoader: keys lowercased
+    without the leading "/", values as str or int, creation/modification
+    dates as ISO 8601. Kept here instead of importing the private helper of
+    langchain_community, which may change between releases.
+    """
+    normalized = {}
+    for key, value in metadata.items():
+        if type(value) not in (str, int):
+            value = str(value)
+        key = key[1:].lower() if key.startswith("/") else key.lower()
+        if key in ("creationdate", "moddate"):
+            try:
+                normalized[key] = datetime.strptime(value.replace("'", ""), "D:%Y%m%d%H%M%S%z").isoformat("T")
+            except ValueError:
+                normalized[key] = value
+        elif key in ("page_count", "file_path"):
+            # Tên key chung với các PDF parser khác
+            normalized["total_pages" if key == "page_count" else "source"] = value
+            normalized[key] = value
+        elif isinstance(value, str):
+            normalized[key] = value.strip()
+        else:
+            normalized[key] = value
+    return normalized
+
+
+def pdf_cache_key(file_path: str) -> str:
+    """Cache key of a PDF: SHA-256 of its content and the pypdf version that extracts it"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return f"{digest.hexdigest()}:pypdf-{pypdf.__version__}"
+
+
+class PdfPageCache:
+    def __init__(self, path: str = PDF_CACHE_PATH):
+        """
+        SQLite cache of the text extracted from each PDF page.
+
+        Entries are keyed by file content hash (see pdf_cache_key), so a
+        renamed or copied file hits the cache and a modified file misses it.
+        Pages are stored as soon as they are extracted: an interrupted load
+        only extracts the missing pages next time.
+
+        Args:
+            path: SQLite database file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pdf_files ("
+            "key TEXT PRIMARY KEY, metadata TEXT NOT NULL, page_labels TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pdf_pages ("
+            "key TEXT NOT NULL, page INTEGER NOT NULL, text TEXT NOT NULL, PRIMARY KEY (key, page))"
+        )
+        self._conn.commit()
+
+    def get_file(self, key: str) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+        """(document metadata, page labels) of a cached PDF, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT metadata, page_labels FROM pdf_files WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), json.loads(row[1])
+
+    def put_file(self, key: str, metadata: Dict[str, Any], page_labels: List[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pdf_files (key, metadata, page_labels) VALUES (?, ?, ?)",
+                (key, json.dumps(metadata), json.dumps(page_labels))
+            )
+            self._conn.commit()
+
+    def get_pages(self, key: str) -> Dict[int, str]:
+        """Cached page texts of a PDF by page number"""
+        with self._lock:
+            rows = self._conn.execute("SELECT page, text FROM pdf_pages WHERE key = ?", (key,)).fetchall()
+        return dict(rows)
+
+    def put_pages(self, key: str, start: int, texts: List[str]):
+        """Store the texts of the pages start, start + 1, ..."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pdf_pages (key, page, text) VALUES (?, ?, ?)",
+                [(key, start + i, text) for i, text in enumerate(texts)]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _extract_pages(file_path: str, start: int, end: int) -> List[str]:
+    # Chạy trong worker process: mỗi task mở file riêng, pypdf chỉ parse các trang được dùng
+    reader = pypdf.PdfReader(file_path)
+    return [reader.pages[i].extract_text(extraction_mode="plain").strip() for i in range(start, end)]
+
+
+def _page_ranges(pages: List[int], pages_per_task: int) -> List[Tuple[int, int]]:
+    # Gom các trang liên tiếp (theo thứ tự) thành các khoảng [start, end) tối đa pages_per_task trang
+    ranges = []
+    for page in pages:
+        if ranges and ranges[-1][1] == page and page - ranges[-1][0] < pages_per_task:
+            ranges[-1] = (ranges[-1][0], page + 1)
+        else:
+            ranges.append((page, page + 1))
+    return ranges
+
+
+def lazy_load_pdf_parallel(file_path: str,
+                           max_workers: Optional[int] = None,
+                           pages_per_task: int = PAGES_PER_TASK,
+                           cache: Optional[PdfPageCache] = None) -> Iterator[Document]:
+    """
+    Yield the pages of a PDF in order while a process pool extracts them.
+
+    Page ranges of `pages_per_task` pages are extracted in parallel; at most
+    TASKS_PER_WORKER ranges per worker are in flight, so memory does not grow
+    with the size of the file, and the first pages are yielded while later
+    ones are still being parsed. Documents are the same as PyPDFLoader's
+    (text, metadata, `page` and `page_label`).
+
+    Args:
+        file_path: Path to the PDF file
+        max_workers: Worker processes (default: number of CPUs); 1 extracts
+            in the calling process
+        pages_per_task: Pages extracted per task
+        cache: Page cache; cached pages are not extracted again
+
+    Yields:
+        One Document per page
+    """
+    key = pdf_cache_key(file_path) if cache else None
+    cached_file = cache.get_file(key) if cache else None
+    if cached_file:
+        metadata, page_labels = cached_file
+        cached_pages = cache.get_pages(key)
+    else:
+        reader = pypdf.PdfReader(file_path)
+        page_labels = list(reader.page_labels)
+        metadata = _normalize_metadata(
+            {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""}
+            | dict(reader.metadata or {})
+            | {"source": file_path, "total_pages": len(reader.pages)}
+        )
+        del reader
+        cached_pages = {}
+        if cache:
+            cache.put_file(key, metadata, page_labels)
+    # Cache theo nội dung: source là đường dẫn của lần load hiện tại
+    metadata["source"] = file_path
+
+    missing = [page for page in range(len(page_labels)) if page not in cached_pages]
+    ranges = deque(_page_ranges(missing, pages_per_task))
+    max_workers = max_workers or os.cpu_count() or 1
+    executor = None
+    if max_workers > 1 and len(ranges) > 1:
+        executor = ProcessPoolExecutor(max_workers=min(max_workers, len(ranges)),
+                                       mp_context=multiprocessing.get_context("spawn"))
+    pending: Deque[Tuple[int, Future]] = deque()
+
+    def next_range() -> Tuple[int, List[str]]:
+        if executor is None:
+            start, end = ranges.popleft()
+            texts = _extract_pages(file_path, start, end)
+        else:
+            while ranges and len(pending) < max_workers * TASKS_PER_WORKER:
+                start, end = ranges.popleft()
+                pending.append((start, executor.submit(_extract_pages, file_path, start, end)))
+            start, future = pending.popleft()
+            texts = future.result()
+        if cache:
+            cache.put_pages(key, start, texts)
+        return start, texts
+
+    try:
+        start, texts = 0, []
+        for page, page_label in enumerate(page_labels):
+            if page in cached_pages:
+                text = cached_pages.pop(page)
+            else:
+                if page >= start + len(texts):
+                    start, texts = next_range()
+                text = texts[page - start]
+            yield Document(page_content=text, metadata={**metadata, "page": page, "page_label": page_label})
+    finally:
+        if executor is not None:
+            # Dừng sớm (consumer đóng generator): bỏ các task chưa chạy
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def load_pdf_parallel(file_path: str,
+                      max_workers: Optional[int] = None,
+                      pages_per_task: int = PAGES_PER_TASK,
+                      cache: Optional[PdfPageCache] = None) -> List[Document]:
+    """List version of lazy_load_pdf_parallel"""
+    return list(lazy_load_pdf_parallel(file_path, max_workers, pages_per_task, cache))
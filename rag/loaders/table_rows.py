@@ -0,0 +1,109 @@
+import datetime
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+from langchain_core.documents import Document
+
+# Cấu hình mặc định, giống rag/splitters/table_splitter.py
+CHUNK_SIZE = 20  # Số hàng trên mỗi chunk
+READ_CHUNK_ROWS = 10000  # Số hàng đọc vào bộ nhớ mỗi lần
+
+
+def format_rows(df: pd.DataFrame) -> List[str]:
+    """
+    Format every row as "column: value" lines, as load_csv/load_xlsx do.
+
+    Works column by column on the whole frame instead of calling iterrows,
+    so values are not converted to a dtype shared by the row. The text of
+    a value depends on its column dtype: callers read tables with types
+    fixed per cell (CSV as str, XLSX through format_cell) so that every
+    block of a file is formatted the same way.
+    """
+    if len(df) == 0:
+        return []
+    if len(df.columns) == 0:
+        return [""] * len(df)
+
+    columns = [f"{name}: " + df.iloc[:, i].astype(str) for i, name in enumerate(df.columns)]
+    return columns[0].str.cat(columns[1:], sep="\n").tolist() if len(columns) > 1 else columns[0].tolist()
+
+
+def format_cell(value: Any) -> str:
+    """
+    Text of an XLSX cell value, the same for values read by openpyxl and by
+    `pd.read_excel(dtype=object)`: empty cells give "", integral floats are
+    written as ints (pandas reads numeric cells that way) and dates and
+    datetimes as pd.Timestamp ("2020-01-01 00:00:00").
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ""
+        return str(int(value)) if value.is_integer() else str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return str(pd.Timestamp(value))
+    return str(value)
+
+
+def iter_row_chunks(row_blocks: Iterable[List[str]],
+                    metadata: Dict[str, Any],
+                    total_rows: Optional[int],
+                    chunk_size: int = CHUNK_SIZE) -> Iterator[Document]:
+    """
+    Group formatted rows into chunk Documents as they arrive.
+
+    The metadata matches what chunk_documents_by_rows adds to a table loaded
+    with load_csv/load_xlsx, so `total_rows` must be known up front. If it
+    is None, the chunks carry no totals ("total_chunks",
+    "is_complete_document", "original_rows_count").
+
+    Args:
+        row_blocks: Blocks of formatted rows, in file order
+        metadata: Metadata of the table (source, file_type, ...)
+        total_rows: Number of rows in the table, or None if not counted
+        chunk_size: Number of rows per chunk
+    """
+    num_chunks = math.ceil(total_rows / chunk_size) if total_rows is not None else None
+    chunk_idx = 0
+    pending: List[str] = []
+
+    def make_chunk(rows: List[str]) -> Document:
+        chunk_metadata = {**metadata, "chunk_index": chunk_idx + 1}
+        if num_chunks is not None:
+            chunk_metadata["total_chunks"] = num_chunks
+        chunk_metadata["chunk_size"] = len(rows)
+        if num_chunks is not None:
+            chunk_metadata["is_complete_document"] = num_chunks == 1
+            chunk_metadata["original_rows_count"] = total_rows
+        chunk_metadata["splitter_type"] = "table_rows"
+        chunk_metadata["chunk_size_config"] = chunk_size
+        return Document(page_content="\n\n".join(rows), metadata=chunk_metadata)
+
+    for block in row_blocks:
+        pending.extend(block)
+        while len(pending) >= chunk_size:
+            yield make_chunk(pending[:chunk_size])
+            del pending[:chunk_size]
+            chunk_idx += 1
+
+    if pending:
+        yield make_chunk(pending)
+
+
+def unique_column_names(names: List[Any]) -> List[Any]:
+    """Name header cells like pandas: "Unnamed: i" for blanks, ".n" suffix for duplicates"""
+    seen: Dict[str, int] = {}
+    result = []
+    for i, name in enumerate(names):
+        if name is None or name == "":
+            name = f"Unnamed: {i}"
+        key = str(name)
+        if key in seen:
+            seen[key] += 1
+            name = f"{key}.{seen[key]}"
+        else:
+            seen[key] = 0
+        result.append(name)
+    return result
@@ -1,7 +1,16 @@
-from langchain_community.document_loaders import TextLoader
-from typing import List
+from typing import Iterator, List
 from langchain_core.documents import Document
 
+# Đọc trực tiếp như TextLoader của langchain_community (encoding mặc định,
+# metadata "source"), không import langchain_community khi chỉ load file .txt
+
 def load_text(file_path: str) -> List[Document]:
-    loader = TextLoader(file_path)
-    return loader.load()
\ No newline at end of file
+    return list(lazy_load_text(file_path))
+
+def lazy_load_text(file_path: str) -> Iterator[Document]:
+    try:
+        with open(file_path) as f:
+            text = f.read()
+    except Exception as e:
+        raise RuntimeError(f"Error loading {file_path}") from e
+    yield Document(page_content=text, metadata={"source": str(file_path)})
@@ -1,7 +1,11 @@
 from langchain_community.document_loaders import WebBaseLoader
-from typing import List
+from typing import Iterator, List
 from langchain_core.documents import Document
 
 def load_url(url: str) -> List[Document]:
     loader = WebBaseLoader(url)
     return loader.load()
+
+def lazy_load_url(url: str) -> Iterator[Document]:
+    loader = WebBaseLoader(url)
+    return loader.lazy_load()
@@ -1,23 +1,24 @@
 import pandas as pd
 from langchain_core.documents import Document
-from typing import List
+from typing import Iterator, List, Optional
 import os
+from .table_rows import CHUNK_SIZE, READ_CHUNK_ROWS, format_cell, format_rows, iter_row_chunks, unique_column_names
 
 def load_xlsx(file_path: str) -> List[Document]:
     """
     Load XLSX file and return one Document per sheet (no chunking).
     Each row is formatted as key: value pairs for better readability.
+    Cell values are written with format_cell, whatever the other cells of
+    their row or column hold.
     """
     documents = []
     excel_file = pd.ExcelFile(file_path)
 
     for sheet_name in excel_file.sheet_names:
-        df = pd.read_excel(file_path, sheet_name=sheet_name).fillna("")
+        # dtype=object: giữ kiểu của từng ô, keep_default_na=False: chuỗi "NA" vẫn là "NA" như openpyxl
+        df = pd.read_excel(file_path, sheet_name=sheet_name, dtype=object, keep_default_na=False)
 
-        rows_text = []
-        for _, row in df.iterrows():
-            row_text = "\n".join([f"{col}: {row[col]}" for col in df.columns])
-            rows_text.append(row_text)
+        rows_text = format_rows(df.map(format_cell))
 
         doc_text = "\n\n".join(rows_text)
 
@@ -35,3 +36,79 @@ def load_xlsx(file_path: str) -> List[Document]:
         )
 
     return documents
+
+def stream_xlsx_chunks(file_path: str,
+                       chunk_size: int = CHUNK_SIZE,
+                       read_chunk_rows: int = READ_CHUNK_ROWS,
+                       count_rows: bool = True) -> Iterator[Document]:
+    """
+    Stream an XLSX file as row-chunk Documents with constant memory.
+
+    Sheets are read with openpyxl in read-only mode and yield the same
+    chunks as `chunk_documents_by_rows(load_xlsx(file_path), chunk_size)`,
+    sheet by sheet. Trailing empty rows are ignored like pandas does, and
+    cells are formatted with format_cell like load_xlsx.
+
+    Args:
+        file_path: XLSX file
+        chunk_size: Number of rows per chunk
+        read_chunk_rows: Rows formatted at a time
+        count_rows: Read each sheet a first time to count its rows, so chunk
+            metadata carries the totals of load_xlsx. With False every
+            sheet is read once and chunks have no totals (see iter_row_chunks)
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            columns = unique_column_names(list(header))
+
+            total_rows = None
+            if count_rows:
+                total_rows = 0
+                for i, row in enumerate(rows, start=1):
+                    if any(value is not None for value in row):
+                        total_rows = i
+
+            metadata = {"source": os.path.basename(file_path), "file_type": "xlsx", "sheet": sheet.title}
+            if total_rows is not None:
+                metadata["total_rows"] = total_rows
+            metadata["columns"] = columns
+            yield from iter_row_chunks(
+                _iter_sheet_blocks(sheet, columns, total_rows, read_chunk_rows),
+                metadata, total_rows, chunk_size
+            )
+    finally:
+        workbook.close()
+
+def _iter_sheet_blocks(sheet, columns: list, total_rows: Optional[int], read_chunk_rows: int) -> Iterator[List[str]]:
+    """Read the data rows of a sheet in blocks of formatted rows (up to the last non-empty row)"""
+    num_columns = len(columns)
+
+    def format_block(block):
+        df = pd.DataFrame(block, columns=range(num_columns), dtype=object).map(format_cell)
+        return format_rows(df.set_axis(columns, axis=1))
+
+    block = []
+    empty = []  # Row trống chỉ được giữ nếu sau nó còn row có dữ liệu
+    max_row = total_rows + 1 if total_rows is not None else None
+    for row in sheet.iter_rows(min_row=2, max_row=max_row, values_only=True):
+        # Cắt/bù cho đủ số cột của header
+        padded = tuple(row[:num_columns]) + (None,) * (num_columns - len(row))
+        if total_rows is None:
+            if not any(value is not None for value in row):
+                empty.append(padded)
+                continue
+            block.extend(empty)
+            empty = []
+        block.append(padded)
+        if len(block) >= read_chunk_rows:
+            yield format_block(block)
+            block = []
+    if block:
+        yield format_block(block)
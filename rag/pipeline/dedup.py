@@ -0,0 +1,239 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+
+# Cấu hình dedup
+NUM_PERM = 128  # Số hàm hash của chữ ký MinHash
+NUM_BANDS = 16  # LSH: 16 band x 8 hàng, cặp có Jaccard từ ~0.7 trở lên thành ứng viên
+THRESHOLD = 0.9  # Jaccard ước lượng tối thiểu để coi hai chunk là near-duplicate
+SHINGLE_SIZE = 3  # Số từ liên tiếp trong một shingle
+WORD_HASH_CACHE_SIZE = 65536  # Số từ được cache hash
+
+# Hằng số của bước kết hợp hash từ và bước trộn bit (splitmix64)
+_PRIME = np.uint64(0x100000001B3)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+# Seed cố định: chữ ký lưu trong SQLite phải giữ nguyên giữa các process
+_SEEDS = np.random.default_rng(20240601).integers(0, 2 ** 63, size=NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+_NO_SIGNATURE = np.zeros(0, dtype=np.uint32)  # Chunk chỉ dedup chính xác (threshold None, chunk không có từ)
+
+
+@dataclass
+class ChunkReference:
+    """A chunk that was not stored because it duplicates an already stored chunk"""
+    source: str
+    chunk_index: int
+    chunk_hash: str
+    ref_source: str  # Source của chunk được giữ lại
+    ref_chunk_hash: str
+    similarity: float  # 1.0: trùng chính xác, nhỏ hơn: Jaccard ước lượng
+
+
+@lru_cache(maxsize=WORD_HASH_CACHE_SIZE)
+def _word_hash(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Distinct 64-bit hashes of the word n-grams of a text (lowercased, punctuation ignored)"""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    hashes = np.fromiter((_word_hash(word) for word in words), dtype=np.uint64, count=len(words))
+    size = min(size, len(hashes))
+    num_shingles = len(hashes) - size + 1
+    shingles = hashes[:num_shingles].copy()
+    for k in range(1, size):
+        # Phép nhân uint64 tràn số theo modulo 2^64
+        shingles = (shingles * _PRIME) ^ hashes[k:k + num_shingles]
+    return np.unique(shingles)
+
+
+def minhash_signature(text: str, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE) -> np.ndarray:
+    """
+    MinHash signature of a text: for each of `num_perm` hash functions, the
+    smallest hash of its shingles. The fraction of equal positions of two
+    signatures estimates the Jaccard similarity of their shingle sets.
+    Empty for a text without words, which has nothing to compare.
+    """
+    shingles = shingle_hashes(text, shingle_size)
+    if not len(shingles):
+        return _NO_SIGNATURE
+    # Một ma trận (num_perm, số shingle): mỗi hàng là một hàm hash khác nhau
+    x = shingles[None, :] ^ _SEEDS[:num_perm, None]
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    x ^= x >> np.uint64(31)
+    return (x.min(axis=1) >> np.uint64(32)).astype(np.uint32)
+
+
+class DedupIndex:
+    def __init__(self,
+                 path: Optional[str] = None,
+                 threshold: Optional[float] = THRESHOLD,
+                 num_perm: int = NUM_PERM,
+                 num_bands: int = NUM_BANDS,
+                 shingle_size: int = SHINGLE_SIZE):
+        """
+        Index of stored chunks finding exact and near duplicates.
+
+        Exact duplicates are found by chunk hash. Near duplicates are found
+        with MinHash signatures bucketed by LSH bands: chunks sharing a band
+        are candidates, and a candidate is a duplicate if the estimated
+        Jaccard similarity of their word shingles reaches `threshold`.
+
+        Args:
+            path: SQLite file persisting the signatures, so chunks of
+                previously ingested sources are found across runs; in memory
+                only if None
+            threshold: Minimum estimated Jaccard similarity of a near
+                duplicate; None only removes exact duplicates
+            num_perm: Signature length, a multiple of num_bands
+            num_bands: LSH bands; more bands find less similar candidates
+            shingle_size: Words per shingle
+        """
+        if num_perm % num_bands:
+            raise ValueError("num_perm must be a multiple of num_bands")
+        if num_perm > NUM_PERM:
+            raise ValueError(f"num_perm must be at most {NUM_PERM}")
+
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.num_bands = num_bands
+        self.shingle_size = shingle_size
+        self._rows = num_perm // num_bands
+        self._lock = threading.Lock()
+        self._by_hash: Dict[str, Set[str]] = {}  # chunk hash -> các source chứa chunk đó
+        self._signatures: Dict[Tuple[str, str], np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], Set[Tuple[str, str]]] = {}
+        self._added: Dict[Tuple[str, str], np.ndarray] = {}
+        self._removed: Set[Tuple[str, str]] = set()
+        self._conn = None
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS signatures ("
+                "source TEXT NOT NULL, chunk_hash TEXT NOT NULL, signature BLOB NOT NULL, "
+                "PRIMARY KEY (source, chunk_hash))"
+            )
+            self._conn.commit()
+            for source, chunk_hash, blob in self._conn.execute("SELECT source, chunk_hash, signature FROM signatures"):
+                signature = np.frombuffer(blob, dtype=np.uint32)
+                if len(signature) in (0, num_perm):
+                    self._insert((source, chunk_hash), signature)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        return minhash_signature(text, self.num_perm, self.shingle_size)
+
+    def find(self, chunk_hash: str, text: str) -> Tuple[Optional[Tuple[str, str, float]], Optional[np.ndarray]]:
+        """
+        Look up a chunk that is not stored yet.
+
+        Returns:
+            ((source, chunk hash, similarity) of the stored chunk it
+            duplicates, or None; the chunk's signature if it was computed,
+            to pass to add)
+        """
+        with self._lock:
+            sources = self._by_hash.get(chunk_hash)
+            if sources:
+                return (min(sources), chunk_hash, 1.0), None
+        if self.threshold is None:
+            return None, None
+
+        signature = self.signature(text)
+        if not len(signature):
+            # Chunk không có từ nào (chỉ dấu câu, ký hiệu) chỉ được dedup chính xác theo hash
+            return None, signature
+        best = None
+        with self._lock:
+            candidates = set()
+            for band, key in self._band_keys(signature):
+                candidates |= self._buckets.get((band, key), set())
+            for candidate in candidates:
+                similarity = float(np.mean(self._signatures[candidate] == signature))
+                if similarity >= self.threshold and (best is None or similarity > best[2]):
+                    best = (candidate[0], candidate[1], similarity)
+        return best, signature
+
+    def add(self, source: str, chunk_hash: str, text: str, signature: Optional[np.ndarray] = None):
+        """Index a stored chunk (no-op if already indexed)"""
+        key = (source, chunk_hash)
+        with self._lock:
+            if key in self._signatures:
+                return
+        if signature is None:
+            signature = self.signature(text) if self.threshold is not None else _NO_SIGNATURE
+        with self._lock:
+            if key not in self._signatures:
+                self._insert(key, signature)
+                self._added[key] = signature
+                self._removed.discard(key)
+
+    def remove(self, source: str, chunk_hashes: Iterable[str]):
+        """Forget chunks of a source that are no longer stored"""
+        with self._lock:
+            for chunk_hash in chunk_hashes:
+                key = (source, chunk_hash)
+                signature = self._signatures.pop(key, None)
+                if signature is None:
+                    continue
+                sources = self._by_hash[chunk_hash]
+                sources.discard(source)
+                if not sources:
+                    del self._by_hash[chunk_hash]
+                for bucket in self._band_keys(signature) if len(signature) else ():
+                    members = self._buckets[bucket]
+                    members.discard(key)
+                    if not members:
+                        del self._buckets[bucket]
+                self._added.pop(key, None)
+                self._removed.add(key)
+
+    def commit(self):
+        """Persist the chunks added and removed since the last commit"""
+        with self._lock:
+            if self._conn is not None and (self._added or self._removed):
+                with self._conn:
+                    self._conn.executemany(
+                        "DELETE FROM signatures WHERE source = ? AND chunk_hash = ?", list(self._removed)
+                    )
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO signatures (source, chunk_hash, signature) VALUES (?, ?, ?)",
+                        [(source, chunk_hash, signature.tobytes())
+                         for (source, chunk_hash), signature in self._added.items()]
+                    )
+            self._added = {}
+            self._removed = set()
+
+    def close(self):
+        self.commit()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self._rows:(band + 1) * self._rows].tobytes())
+                for band in range(self.num_bands)]
+
+    def _insert(self, key: Tuple[str, str], signature: np.ndarray):
+        self._signatures[key] = signature
+        self._by_hash.setdefault(key[1], set()).add(key[0])
+        for bucket in self._band_keys(signature) if len(signature) else ():
+            self._buckets.setdefault(bucket, set()).add(key)
@@ -0,0 +1,400 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from ..embedders.rate_limit import EmbeddingError
+from utils.metrics import IngestStats, collecting
+from .jobs import JOB_BATCH_SIZE, POLL_INTERVAL, ClaimLost, JobChunk, JobLog, JobTask
+from .manifest import SourceRecord, file_content_hash, text_hash
+from .sources import (IngestResult, iter_text_chunks, loaded_content_hash, prepare_chunk_stream,
+                      stream_chunks_for_source, text_size)
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunnerMixin:
+    """
+    Durable ingest jobs of RAGPipeline (run_job) on the work log of
+    rag.pipeline.jobs. Relies on the pipeline's job_log, manifest helpers,
+    embedder and vector store.
+    """
+
+    def run_job(self,
+                job_id: str,
+                file_paths: Optional[List[str]] = None,
+                workers: int = 1,
+                batch_size: int = JOB_BATCH_SIZE,
+                retry_failed: bool = True) -> List[IngestResult]:
+        """
+        Ingest sources as a durable job that resumes where it stopped.
+
+        Sources are queued in the work log (`job_path`). Each source is
+        loaded and chunked into batches of `batch_size` chunks written to the
+        log, each batch is embedded and stored, and the source is recorded
+        in the manifest once all its batches are stored. Progress is
+        committed per batch: after a crash or an embedding / vector store
+        outage, running the same job again skips stored batches, stores the
+        checkpointed embeddings of batches that were embedded but not
+        stored, and retries the rest. The primary keys of stored batches are
+        in the log. A batch is flagged before its insert; if the process dies
+        before the primary keys are logged, the next attempt deletes the rows
+        matching the source, chunk index and content of the batch's chunks
+        that neither the manifest nor a work log knows (this needs a vector
+        store with find_chunks).
+
+        `workers` threads claim tasks from the job; other processes running
+        the same job on the same `job_path` add their workers to it. A task
+        whose worker died is claimed again when its lease expires. With a
+        manifest, unchanged sources are skipped and chunks stored by the
+        previous ingest are reused as in process_document. Job mode stores
+        every chunk of a source and does not support dedup; sources whose
+        duplicates referenced a chunk the job deletes are invalidated in the
+        manifest, as in process_document.
+
+        Args:
+            job_id: Name of the job; an existing job is resumed
+            file_paths: Sources (files or URLs) to add to the job
+            workers: Worker threads of this process
+            batch_size: Chunks per batch of a new job (a resumed job keeps
+                its batch size)
+            retry_failed: Queue the sources and batches that failed in an
+                earlier run again
+
+        Returns:
+            One IngestResult per source of the job, in queue order, with the
+            stats of the work done by this process. A source with failed
+            batches is "failed" until a later run stores them.
+
+        Raises:
+            ValueError: No work log, or the pipeline deduplicates chunks
+        """
+        if self.job_log is None:
+            raise ValueError("run_job needs a work log: RAGPipeline(job_path=...)")
+        if self.dedup:
+            raise ValueError("run_job does not support dedup: use process_documents or RAGPipeline(dedup=None)")
+        start_time = time.time()
+        log = self.job_log
+        batch_size = log.create_job(job_id, batch_size)
+        if file_paths:
+            added = log.add_sources(job_id, [
+                (path if path.startswith(("http://", "https://")) else os.path.abspath(path), path)
+                for path in file_paths
+            ])
+            logger.info(f"🗂️ Job {job_id}: queued {added} new sources")
+        if retry_failed and log.retry_failed(job_id):
+            logger.info(f"   Retrying failed tasks of job {job_id}")
+        progress = log.progress(job_id)
+        logger.info(f"🗂️ Running job {job_id} ({workers} workers): {progress['sources']} sources, "
+                    f"{progress['chunks_stored']} chunks already stored")
+
+        stats_by_source: Dict[str, IngestStats] = {}
+        stats_lock = threading.Lock()
+
+        def run_worker(worker: str):
+            while True:
+                task = log.claim(job_id, worker)
+                if task is None:
+                    if not log.has_open_work(job_id):
+                        return
+                    # Các task còn lại đang được worker khác giữ: chờ xong hoặc hết lease
+                    time.sleep(POLL_INTERVAL)
+                    continue
+                # Stats riêng cho mỗi task (stage timer không dùng chung giữa các thread)
+                stats = IngestStats(task.source)
+                try:
+                    with collecting(stats):
+                        self._run_job_task(log, job_id, worker, task, batch_size, stats)
+                except ClaimLost:
+                    # Worker khác đã lấy task sau khi lease hết hạn: để worker đó làm tiếp
+                    logger.warning(f"⚠️ Job {job_id}: lost the claim on {task.kind} of {task.source}")
+                    stats.count("job_claims_lost")
+                except Exception as e:
+                    name = task.kind if task.batch_index is None else f"batch {task.batch_index}"
+                    logger.error(f"❌ Job {job_id}, {name} of {task.source} (attempt {task.attempts}): {str(e)}")
+                    stats.count("job_task_errors")
+                    log.fail(task, job_id, worker, str(e))
+                except BaseException:
+                    # KeyboardInterrupt, ...: trả task lại ngay thay vì chờ hết lease
+                    log.release(task, job_id, worker)
+                    raise
+                finally:
+                    stats.finish()
+                    with stats_lock:
+                        stats_by_source.setdefault(task.source, IngestStats(task.source)).merge(stats)
+
+        worker_prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        if workers == 1:
+            run_worker(f"{worker_prefix}:0")
+        else:
+            threads = [threading.Thread(target=run_worker, args=(f"{worker_prefix}:{n}",), daemon=True)
+                       for n in range(workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        results = []
+        for source, path, status, document_id, num_chunks, failed_chunks, error in log.results(job_id):
+            stats = stats_by_source.get(source)
+            if stats is not None:
+                self._finish_stats(stats, finish=False)
+            if status in ("done", "skipped"):
+                results.append(IngestResult(path, "processed" if status == "done" else "skipped",
+                                            document_id, num_chunks, stats=stats))
+            else:
+                results.append(IngestResult(path, "failed", document_id, num_chunks, failed_chunks,
+                                            error or f"{failed_chunks} chunks in failed batches", stats))
+
+        processed = sum(1 for result in results if result.status == "processed")
+        failed = sum(1 for result in results if result.status == "failed")
+        elapsed_time = time.time() - start_time
+        logger.info(f"✅ Job {job_id}: processed {processed}, skipped {len(results) - processed - failed}, "
+                    f"failed {failed} sources in {elapsed_time:.2f}s")
+        if failed:
+            logger.warning(f"⚠️ Run job {job_id} again to retry the failed sources and batches")
+        return results
+
+    def job_progress(self, job_id: str) -> Dict[str, Any]:
+        """Sources and batches of a job by status and chunks stored so far (see JobLog.progress)"""
+        if self.job_log is None:
+            raise ValueError("job_progress needs a work log: RAGPipeline(job_path=...)")
+        return self.job_log.progress(job_id)
+
+    def _run_job_task(self,
+                      log: JobLog,
+                      job_id: str,
+                      worker: str,
+                      task: JobTask,
+                      batch_size: int,
+                      stats: IngestStats):
+        """Run one claimed task of a job"""
+        if task.kind == "chunk":
+            self._job_chunk(log, job_id, worker, task, batch_size, stats)
+        elif task.kind == "batch":
+            self._job_batch(log, job_id, worker, task, stats)
+        else:
+            self._job_finalize(log, job_id, worker, task, stats)
+
+    def _job_chunk(self,
+                   log: JobLog,
+                   job_id: str,
+                   worker: str,
+                   task: JobTask,
+                   batch_size: int,
+                   stats: IngestStats):
+        """Load and chunk a source, writing its chunks to the work log batch by batch"""
+        with stats.stage("inspect"):
+            current, previous = self._inspect_source(task.path)
+        documents = None
+        if current.content_hash is None:
+            # Hash của nội dung đã chunk: lần chạy sau biết batch cũ có còn dùng được không
+            if task.path.startswith(("http://", "https://")):
+                with stats.stage("load") as stage:
+                    documents = self.load_manager.load(task.path)
+                    stage.items += len(documents)
+                    stage.bytes += sum(text_size(doc.page_content) for doc in documents)
+                current.content_hash = loaded_content_hash(documents)
+            else:
+                with stats.stage("inspect"):
+                    current.content_hash = file_content_hash(task.path)
+        if self._is_unchanged(current, previous):
+            logger.info(f"⏭️ {task.source} unchanged since last ingest, skipping")
+            log.skip_source(job_id, task.source, worker, previous.document_id)
+            stats.count("skipped")
+            return
+
+        stale_ids = log.start_chunking(job_id, task.source, current.content_hash, current.mtime, current.size)
+        if stale_ids:
+            # Lần chạy trước dừng giữa chừng trên nội dung cũ của source
+            with stats.stage("delete") as stage:
+                self.vector_store.delete(stale_ids)
+                stage.items += len(stale_ids)
+            self._query_results.clear()
+        if documents is not None:
+            chunks = stats.timed_iter("chunk", iter_text_chunks(documents, self.token_budget),
+                                      lambda doc: text_size(doc.page_content))
+        else:
+            chunks = stream_chunks_for_source(task.path, self.load_manager, stats, self.token_budget)
+
+        batch = []
+        num_batches = num_chunks = num_new = 0
+        for text, metadata in prepare_chunk_stream(chunks):
+            batch.append((text_hash(text), text, metadata))
+            if len(batch) >= batch_size:
+                num_new += log.add_batch(job_id, task.source, worker, num_batches, batch)
+                num_batches += 1
+                num_chunks += len(batch)
+                batch = []
+        if batch:
+            num_new += log.add_batch(job_id, task.source, worker, num_batches, batch)
+            num_batches += 1
+            num_chunks += len(batch)
+        if not log.finish_chunking(job_id, task.source, worker, num_batches, num_chunks):
+            logger.warning(f"⚠️ Lost the claim on {task.source} while chunking; another worker took over")
+            stats.count("job_claims_lost")
+            return
+        stats.count("job_batches_written", num_new)
+        logger.info(f"✂️ {task.source}: {num_chunks} chunks in {num_batches} batches "
+                    f"({num_batches - num_new} already in the work log)")
+
+    def _job_batch(self, log: JobLog, job_id: str, worker: str, task: JobTask, stats: IngestStats):
+        """Embed and store one batch of a job, checkpointing embeddings and primary keys"""
+        chunks = log.get_batch(job_id, task.source, task.batch_index)
+        if task.inserting:
+            self._delete_interrupted_insert(log, job_id, worker, task, chunks, stats)
+
+        # Chunk đã lưu ở lần ingest trước của source: dùng lại primary key, không embed.
+        # Lần xuất hiện thứ n của một hash trong source nhận pk thứ n của hash đó, như
+        # _store_chunk_stream, nên các chunk giống nhau không dùng chung một pk
+        pks = {}
+        if self.manifest:
+            previous_ids: Dict[str, List[int]] = {}
+            for chunk_hash, pk in self.manifest.get_chunks(task.source):
+                previous_ids.setdefault(chunk_hash, []).append(pk)
+            seen = log.earlier_hash_counts(job_id, task.source, task.batch_index,
+                                           [chunk.chunk_hash for chunk in chunks if chunk.chunk_hash in previous_ids])
+            for chunk in chunks:
+                occurrence = seen.get(chunk.chunk_hash, 0)
+                if occurrence < len(previous_ids.get(chunk.chunk_hash, ())):
+                    pks[chunk.position] = previous_ids[chunk.chunk_hash][occurrence]
+                    seen[chunk.chunk_hash] = occurrence + 1
+        new = [chunk for chunk in chunks if chunk.position not in pks]
+        to_embed = [chunk for chunk in new if chunk.embedding is None]
+
+        if to_embed:
+            texts = [chunk.text for chunk in to_embed]
+            failed = set()
+            with stats.stage("embed") as stage:
+                stage.items += len(texts)
+                stage.bytes += sum(text_size(text) for text in texts)
+                try:
+                    embeddings = self.embedder.embed_documents(texts)
+                except EmbeddingError as e:
+                    failed = set(e.failed_indices)
+                    embeddings = e.embeddings
+            checkpoint = {chunk.position: vector for i, (chunk, vector) in enumerate(zip(to_embed, embeddings))
+                          if i not in failed}
+            # Checkpoint trước khi store: store lỗi thì lần thử sau không embed lại
+            log.save_embeddings(task, job_id, worker, checkpoint)
+            if failed:
+                raise RuntimeError(f"{len(failed)} of {len(texts)} chunks could not be embedded")
+            for chunk in to_embed:
+                chunk.embedding = checkpoint[chunk.position]
+        if len(new) > len(to_embed):
+            stats.count("job_embeddings_reused", len(new) - len(to_embed))
+
+        ids = []
+        if new:
+            # Cờ "inserting" được commit trước: nếu process chết giữa insert và complete_batch,
+            # lần thử sau xóa các row đã insert nhưng chưa có pk trong log
+            log.start_insert(task, job_id, worker)
+            with stats.stage("store") as stage:
+                ids = self.vector_store.add_documents(
+                    texts=[chunk.text for chunk in new],
+                    embeddings=np.stack([chunk.embedding for chunk in new]),
+                    metadatas=[chunk.metadata for chunk in new],
+                    flush=False
+                )
+                stage.items += len(ids)
+                stage.bytes += sum(text_size(chunk.text) for chunk in new)
+            self._query_results.clear()
+            pks.update((chunk.position, pk) for chunk, pk in zip(new, ids))
+        if not log.complete_batch(task, job_id, worker, pks):
+            # Lease đã hết và worker khác đã claim batch: bỏ bản vừa insert để không bị trùng
+            logger.warning(f"⚠️ Lost the claim on batch {task.batch_index} of {task.source}; "
+                           f"deleting its {len(ids)} inserted chunks")
+            if ids:
+                self.vector_store.delete(ids)
+            stats.count("job_claims_lost")
+            return
+        stats.chunks += len(chunks)
+        stats.count("chunks_new", len(ids))
+        stats.count("chunks_unchanged", len(chunks) - len(ids))
+
+    def _delete_interrupted_insert(self,
+                                   log: JobLog,
+                                   job_id: str,
+                                   worker: str,
+                                   task: JobTask,
+                                   chunks: List[JobChunk],
+                                   stats: IngestStats):
+        """
+        Delete the rows an interrupted attempt inserted for a batch before its
+        primary keys were logged.
+
+        The vector store assigns primary keys on insert, so a row of the
+        batch is recognized by the source and chunk index in its metadata
+        and its exact content, as written to the work log before the insert.
+        Rows whose primary key the manifest or a work log records for any
+        source are kept (e.g. another file with the same basename), and at
+        most one row per chunk of the batch is deleted.
+        """
+        find_chunks = getattr(self.vector_store, "find_chunks", None)
+        if find_chunks is None:
+            logger.warning(f"⚠️ Batch {task.batch_index} of {task.source} was interrupted while inserting and "
+                           f"{type(self.vector_store).__name__} has no find_chunks: its rows may be duplicated")
+            return
+        expected = Counter((chunk.metadata.get("source", ""), chunk.metadata.get("chunk_index", 0), chunk.text)
+                           for chunk in chunks if chunk.pk is None)
+        rows = find_chunks(sorted({key[0] for key in expected}), sorted({key[1] for key in expected}))
+        candidates = [row for row in rows if (row["source"], row["chunk_index"], row["content"]) in expected]
+        known = log.known_ids(row["id"] for row in candidates)
+        if self.manifest:
+            known |= self.manifest.known_ids(row["id"] for row in candidates)
+        orphan_ids = []
+        # Primary key nhỏ trước: row của lần insert bị ngắt có trước row của writer khác
+        for row in sorted(candidates, key=lambda row: row["id"]):
+            key = (row["source"], row["chunk_index"], row["content"])
+            if row["id"] not in known and expected[key] > 0:
+                expected[key] -= 1
+                orphan_ids.append(row["id"])
+        if orphan_ids:
+            with stats.stage("delete") as stage:
+                self.vector_store.delete(orphan_ids)
+                stage.items += len(orphan_ids)
+            self._query_results.clear()
+            stats.count("job_orphans_deleted", len(orphan_ids))
+            logger.info(f"   Deleted {len(orphan_ids)} rows left by an interrupted insert of batch "
+                        f"{task.batch_index} of {task.source}")
+        log.clear_inserting(task, job_id, worker)
+
+    def _job_finalize(self, log: JobLog, job_id: str, worker: str, task: JobTask, stats: IngestStats):
+        """Record a source whose batches are all stored in the manifest, deleting its stale chunks"""
+        content_hash, mtime, size = log.get_source(job_id, task.source)
+        chunk_ids = log.get_chunk_ids(job_id, task.source)
+        with stats.stage("store"):
+            self.vector_store.flush()
+
+        previous = self.manifest.get(task.source) if self.manifest else None
+        doc_id = (previous.document_id if previous else None) or (str(chunk_ids[0][1]) if chunk_ids else None)
+        stale_ids = []
+        if self.manifest:
+            kept = {pk for _, pk in chunk_ids}
+            stale = [(chunk_hash, pk) for chunk_hash, pk in self.manifest.get_chunks(task.source) if pk not in kept]
+            stale_ids = sorted({pk for _, pk in stale})
+            if stale_ids:
+                with stats.stage("delete") as stage:
+                    self.vector_store.delete(stale_ids)
+                    stage.items += len(stale_ids)
+                self._query_results.clear()
+            # Duplicate của source khác (ingest có dedup) trỏ tới chunk vừa xóa: ingest lại các source đó
+            kept_hashes = {chunk_hash for chunk_hash, _ in chunk_ids}
+            invalidated = self.manifest.referencing_sources(
+                task.source, {chunk_hash for chunk_hash, _ in stale} - kept_hashes)
+            if invalidated:
+                self.manifest.invalidate(invalidated)
+                logger.info(f"   {len(invalidated)} sources referenced stale chunks and will be re-ingested")
+            with stats.stage("manifest"):
+                self.manifest.record(SourceRecord(task.source, content_hash, mtime, size, doc_id), chunk_ids)
+        if not log.complete_source(job_id, task.source, worker, doc_id):
+            logger.warning(f"⚠️ Lost the claim on {task.source} while finalizing; another worker took over")
+            stats.count("job_claims_lost")
+            return
+        stats.count("chunks_stale", len(stale_ids))
+        logger.info(f"✅ {task.source} → {doc_id} ({len(chunk_ids)} chunks)")
@@ -0,0 +1,522 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+import numpy as np
+
+# Cấu hình cho ingest job
+JOB_PATH = ".cache/jobs.sqlite"
+JOB_BATCH_SIZE = 256  # Số chunk mỗi batch, đơn vị được claim / embed / store / checkpoint
+LEASE_SECONDS = 600.0  # Claim hết hạn sau thời gian này: worker chết thì worker khác lấy lại task
+MAX_ATTEMPTS = 3  # Số lần thử một task trước khi đánh dấu failed
+POLL_INTERVAL = 1.0  # Giây chờ khi các task còn lại đang được worker khác giữ
+SQLITE_BATCH_SIZE = 500  # Số key trên mỗi câu lệnh SELECT ... IN (...)
+
+
+class ClaimLost(Exception):
+    """The lease of a task expired and another worker claimed it"""
+
+
+@dataclass
+class JobTask:
+    """A unit of work claimed from a job"""
+    kind: str  # "chunk" (load + chunk một source), "batch" (embed + store) hoặc "finalize"
+    source: str
+    path: str
+    batch_index: Optional[int] = None
+    attempts: int = 0
+    inserting: bool = False  # Lần thử trước của batch dừng giữa lúc insert: có thể còn row mồ côi
+
+
+@dataclass
+class JobChunk:
+    """A chunk of a batch as recorded in the work log"""
+    position: int
+    chunk_hash: str
+    text: str
+    metadata: Dict[str, Any]
+    embedding: Optional[np.ndarray]  # Đã embed nhưng chưa store: không embed lại
+    pk: Optional[int]
+
+
+class JobLog:
+    def __init__(self,
+                 path: str = JOB_PATH,
+                 lease_seconds: float = LEASE_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS):
+        """
+        SQLite work log of durable ingest jobs.
+
+        A job is a queue of sources. Each source is loaded and chunked into
+        batches that are written to the log as they are produced; each batch
+        is then embedded and stored, and the source is finalized (recorded in
+        the manifest) once all its batches are stored. Every step is a task
+        that a worker claims with a lease, so several threads or processes
+        can work on the same job, and a task whose worker died is claimed
+        again when its lease expires. Embeddings and primary keys are
+        committed per batch, so a restarted job does not embed or insert a
+        stored batch again. A batch is flagged as inserting before its rows
+        are sent to the vector store, so the next attempt knows it has to
+        look for rows left by an interrupted insert.
+
+        Args:
+            path: SQLite database file, shared by all workers of a job
+            lease_seconds: Time after which a claimed task can be claimed by
+                another worker
+            max_attempts: Claims of a task before it is marked failed
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # isolation_level None: transaction mở tường minh bằng BEGIN IMMEDIATE khi claim
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, batch_size INTEGER NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_sources ("
+            "job_id TEXT NOT NULL, source TEXT NOT NULL, path TEXT NOT NULL, status TEXT NOT NULL, "
+            "worker TEXT, lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "content_hash TEXT, mtime REAL, size INTEGER, num_batches INTEGER, num_chunks INTEGER, "
+            "document_id TEXT, error TEXT, PRIMARY KEY (job_id, source))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_batches ("
+            "job_id TEXT NOT NULL, source TEXT NOT NULL, batch_index INTEGER NOT NULL, status TEXT NOT NULL, "
+            "worker TEXT, lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0, num_chunks INTEGER NOT NULL, "
+            "inserting INTEGER NOT NULL DEFAULT 0, error TEXT, PRIMARY KEY (job_id, source, batch_index))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_job_batches_status ON job_batches(job_id, status)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_chunks ("
+            "job_id TEXT NOT NULL, source TEXT NOT NULL, batch_index INTEGER NOT NULL, position INTEGER NOT NULL, "
+            "chunk_hash TEXT NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL, embedding BLOB, pk INTEGER, "
+            "PRIMARY KEY (job_id, source, batch_index, position))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_job_chunks_pk ON job_chunks(pk)")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE lấy write lock ngay: hai process không thể claim cùng một task
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def create_job(self, job_id: str, batch_size: int = JOB_BATCH_SIZE) -> int:
+        """
+        Create a job if it does not exist.
+
+        Returns:
+            Batch size of the job; an existing job keeps the batch size it
+            was created with, so resumed sources are cut the same way
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, batch_size, created_at) VALUES (?, ?, ?)",
+                (job_id, batch_size, time.time())
+            )
+            return conn.execute("SELECT batch_size FROM jobs WHERE job_id = ?", (job_id,)).fetchone()[0]
+
+    def add_sources(self, job_id: str, sources: Sequence[Tuple[str, str]]) -> int:
+        """
+        Queue (source, path) pairs; sources already in the job are ignored.
+
+        Returns:
+            Number of sources added
+        """
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO job_sources (job_id, source, path, status) VALUES (?, ?, ?, 'pending')",
+                [(job_id, source, path) for source, path in sources]
+            )
+            return conn.total_changes - before
+
+    def retry_failed(self, job_id: str) -> int:
+        """Queue the failed sources and batches of a job again. Returns the number of tasks reset."""
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.execute(
+                "UPDATE job_sources SET status = CASE WHEN num_batches IS NULL THEN 'pending' ELSE 'chunked' END, "
+                "attempts = 0, worker = NULL, lease_until = NULL WHERE job_id = ? AND status = 'failed'",
+                (job_id,)
+            )
+            conn.execute(
+                "UPDATE job_batches SET status = 'pending', attempts = 0, worker = NULL, lease_until = NULL "
+                "WHERE job_id = ? AND status = 'failed'", (job_id,)
+            )
+            return conn.total_changes - before
+
+    def claim(self, job_id: str, worker: str) -> Optional[JobTask]:
+        """
+        Claim the next task of a job: finalizing a source whose batches are
+        all stored, then storing a batch, then chunking a source. Tasks are
+        claimed when pending or when the lease of their worker expired.
+
+        Returns:
+            The claimed task, or None if no task is available right now
+        """
+        now = time.time()
+        lease_until = now + self.lease_seconds
+        with self._transaction() as conn:
+            # Task hết lease quá số lần thử (worker chết liên tục trên task đó): không claim lại
+            conn.execute(
+                "UPDATE job_sources SET status = 'failed', error = 'lease expired' WHERE job_id = ? "
+                "AND status IN ('chunking', 'finalizing') AND lease_until < ? AND attempts >= ?",
+                (job_id, now, self.max_attempts)
+            )
+            conn.execute(
+                "UPDATE job_batches SET status = 'failed', error = 'lease expired' WHERE job_id = ? "
+                "AND status = 'claimed' AND lease_until < ? AND attempts >= ?",
+                (job_id, now, self.max_attempts)
+            )
+
+            row = conn.execute(
+                "SELECT source, path, attempts FROM job_sources s WHERE job_id = ? "
+                "AND (status = 'chunked' OR (status = 'finalizing' AND lease_until < ?)) "
+                "AND NOT EXISTS (SELECT 1 FROM job_batches b WHERE b.job_id = s.job_id AND b.source = s.source "
+                "AND b.status != 'stored') ORDER BY rowid LIMIT 1",
+                (job_id, now)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE job_sources SET status = 'finalizing', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                    "WHERE job_id = ? AND source = ?", (worker, lease_until, job_id, row[0])
+                )
+                return JobTask("finalize", row[0], row[1], attempts=row[2] + 1)
+
+            row = conn.execute(
+                "SELECT b.source, s.path, b.batch_index, b.attempts, b.inserting FROM job_batches b "
+                "JOIN job_sources s ON s.job_id = b.job_id AND s.source = b.source WHERE b.job_id = ? "
+                "AND (b.status = 'pending' OR (b.status = 'claimed' AND b.lease_until < ?)) "
+                "ORDER BY b.rowid LIMIT 1",
+                (job_id, now)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE job_batches SET status = 'claimed', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                    "WHERE job_id = ? AND source = ? AND batch_index = ?", (worker, lease_until, job_id, row[0], row[2])
+                )
+                return JobTask("batch", row[0], row[1], row[2], attempts=row[3] + 1, inserting=bool(row[4]))
+
+            row = conn.execute(
+                "SELECT source, path, attempts FROM job_sources WHERE job_id = ? "
+                "AND (status = 'pending' OR (status = 'chunking' AND lease_until < ?)) ORDER BY rowid LIMIT 1",
+                (job_id, now)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE job_sources SET status = 'chunking', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                    "WHERE job_id = ? AND source = ?", (worker, lease_until, job_id, row[0])
+                )
+                return JobTask("chunk", row[0], row[1], attempts=row[2] + 1)
+        return None
+
+    def has_open_work(self, job_id: str) -> bool:
+        """Whether the job has tasks that are pending or held by a worker"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM job_sources WHERE job_id = ? AND status IN ('pending', 'chunking', 'finalizing')) "
+                "OR EXISTS (SELECT 1 FROM job_batches WHERE job_id = ? AND status IN ('pending', 'claimed')) "
+                "OR EXISTS (SELECT 1 FROM job_sources s WHERE job_id = ? AND status = 'chunked' AND NOT EXISTS ("
+                "SELECT 1 FROM job_batches b WHERE b.job_id = s.job_id AND b.source = s.source AND b.status != 'stored'))",
+                (job_id, job_id, job_id)
+            ).fetchone()
+        return bool(row[0])
+
+    def start_chunking(self,
+                       job_id: str,
+                       source: str,
+                       content_hash: Optional[str],
+                       mtime: Optional[float],
+                       size: Optional[int]) -> List[int]:
+        """
+        Record the content being chunked. If an interrupted attempt chunked
+        a different content, its batches are discarded.
+
+        Returns:
+            Primary keys already stored for the discarded batches, to delete
+            from the vector store
+        """
+        with self._transaction() as conn:
+            previous = conn.execute(
+                "SELECT content_hash FROM job_sources WHERE job_id = ? AND source = ?", (job_id, source)
+            ).fetchone()
+            stale_ids = []
+            if previous and previous[0] is not None and previous[0] != content_hash:
+                stale_ids = [row[0] for row in conn.execute(
+                    "SELECT pk FROM job_chunks WHERE job_id = ? AND source = ? AND pk IS NOT NULL", (job_id, source)
+                )]
+                conn.execute("DELETE FROM job_chunks WHERE job_id = ? AND source = ?", (job_id, source))
+                conn.execute("DELETE FROM job_batches WHERE job_id = ? AND source = ?", (job_id, source))
+            conn.execute(
+                "UPDATE job_sources SET content_hash = ?, mtime = ?, size = ? WHERE job_id = ? AND source = ?",
+                (content_hash, mtime, size, job_id, source)
+            )
+        return stale_ids
+
+    def add_batch(self,
+                  job_id: str,
+                  source: str,
+                  worker: str,
+                  batch_index: int,
+                  chunks: Sequence[Tuple[str, str, Dict[str, Any]]]) -> bool:
+        """
+        Write a batch of (chunk hash, text, metadata) chunks, pending
+        embedding, and renew the chunking claim. A batch written by an
+        earlier attempt is kept as is.
+
+        Returns:
+            True if the batch was new
+
+        Raises:
+            ClaimLost: Another worker took over chunking the source
+        """
+        with self._transaction() as conn:
+            self._renew(conn, "UPDATE job_sources SET lease_until = ? WHERE job_id = ? AND source = ? "
+                              "AND status = 'chunking' AND worker = ?", (job_id, source, worker))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO job_batches (job_id, source, batch_index, status, num_chunks) "
+                "VALUES (?, ?, ?, 'pending', ?)", (job_id, source, batch_index, len(chunks))
+            )
+            if not cursor.rowcount:
+                return False
+            conn.executemany(
+                "INSERT INTO job_chunks (job_id, source, batch_index, position, chunk_hash, text, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(job_id, source, batch_index, position, chunk_hash, text, json.dumps(metadata, default=str))
+                 for position, (chunk_hash, text, metadata) in enumerate(chunks)]
+            )
+        return True
+
+    def _renew(self, conn: sqlite3.Connection, sql: str, params: Tuple):
+        # Gia hạn lease của task; task đã bị worker khác claim thì dừng
+        if not conn.execute(sql, (time.time() + self.lease_seconds, *params)).rowcount:
+            raise ClaimLost("lease expired and the task was claimed by another worker")
+
+    def finish_chunking(self, job_id: str, source: str, worker: str, num_batches: int, num_chunks: int) -> bool:
+        """Mark a source as fully chunked. Returns False if the worker lost its claim."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE job_sources SET status = 'chunked', num_batches = ?, num_chunks = ?, worker = NULL, "
+                "lease_until = NULL, attempts = 0, error = NULL "
+                "WHERE job_id = ? AND source = ? AND status = 'chunking' AND worker = ?",
+                (num_batches, num_chunks, job_id, source, worker)
+            )
+            return bool(cursor.rowcount)
+
+    def skip_source(self, job_id: str, source: str, worker: str, document_id: Optional[str]):
+        """Mark a source unchanged since the last ingest as done without processing it"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE job_sources SET status = 'skipped', document_id = ?, worker = NULL, lease_until = NULL "
+                "WHERE job_id = ? AND source = ? AND worker = ?", (document_id, job_id, source, worker)
+            )
+
+    def get_batch(self, job_id: str, source: str, batch_index: int) -> List[JobChunk]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position, chunk_hash, text, metadata, embedding, pk FROM job_chunks "
+                "WHERE job_id = ? AND source = ? AND batch_index = ? ORDER BY position",
+                (job_id, source, batch_index)
+            ).fetchall()
+        return [JobChunk(position, chunk_hash, text, json.loads(metadata),
+                         np.frombuffer(embedding, dtype=np.float32) if embedding is not None else None, pk)
+                for position, chunk_hash, text, metadata, embedding, pk in rows]
+
+    def earlier_hash_counts(self, job_id: str, source: str, batch_index: int, chunk_hashes: Iterable[str]) -> Dict[str, int]:
+        """Occurrences of chunk hashes in the batches of a source before `batch_index`"""
+        counts = {}
+        with self._lock:
+            for chunk_hash in set(chunk_hashes):
+                counts[chunk_hash] = self._conn.execute(
+                    "SELECT COUNT(*) FROM job_chunks WHERE job_id = ? AND source = ? AND batch_index < ? AND chunk_hash = ?",
+                    (job_id, source, batch_index, chunk_hash)
+                ).fetchone()[0]
+        return counts
+
+    def save_embeddings(self, task: JobTask, job_id: str, worker: str, embeddings: Dict[int, np.ndarray]):
+        """
+        Checkpoint the embeddings of a batch by chunk position and renew the claim.
+
+        Raises:
+            ClaimLost: Another worker claimed the batch
+        """
+        with self._transaction() as conn:
+            self._renew(conn, "UPDATE job_batches SET lease_until = ? WHERE job_id = ? AND source = ? "
+                              "AND batch_index = ? AND status = 'claimed' AND worker = ?",
+                        (job_id, task.source, task.batch_index, worker))
+            conn.executemany(
+                "UPDATE job_chunks SET embedding = ? WHERE job_id = ? AND source = ? AND batch_index = ? AND position = ?",
+                [(np.asarray(vector, dtype=np.float32).tobytes(), job_id, task.source, task.batch_index, position)
+                 for position, vector in embeddings.items()]
+            )
+
+    def start_insert(self, task: JobTask, job_id: str, worker: str):
+        """
+        Flag a batch as being inserted (committed before the insert) and renew the claim.
+
+        Raises:
+            ClaimLost: Another worker claimed the batch
+        """
+        with self._transaction() as conn:
+            self._renew(conn, "UPDATE job_batches SET lease_until = ?, inserting = 1 WHERE job_id = ? AND source = ? "
+                              "AND batch_index = ? AND status = 'claimed' AND worker = ?",
+                        (job_id, task.source, task.batch_index, worker))
+
+    def complete_batch(self, task: JobTask, job_id: str, worker: str, pks: Dict[int, int]) -> bool:
+        """
+        Record the primary keys of a stored batch by chunk position.
+
+        Returns:
+            False if the worker lost its claim (the lease expired and another
+            worker claimed the batch); nothing is recorded then
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE job_batches SET status = 'stored', worker = NULL, lease_until = NULL, inserting = 0, error = NULL "
+                "WHERE job_id = ? AND source = ? AND batch_index = ? AND status = 'claimed' AND worker = ?",
+                (job_id, task.source, task.batch_index, worker)
+            )
+            if not cursor.rowcount:
+                return False
+            # Vector đã nằm trong vector store: bỏ embedding để log không phình ra
+            conn.executemany(
+                "UPDATE job_chunks SET pk = ?, embedding = NULL "
+                "WHERE job_id = ? AND source = ? AND batch_index = ? AND position = ?",
+                [(pk, job_id, task.source, task.batch_index, position) for position, pk in pks.items()]
+            )
+        return True
+
+    def get_source(self, job_id: str, source: str) -> Tuple[Optional[str], Optional[float], Optional[int]]:
+        """(content hash, mtime, size) of the content chunked for a source"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT content_hash, mtime, size FROM job_sources WHERE job_id = ? AND source = ?", (job_id, source)
+            ).fetchone()
+
+    def clear_inserting(self, task: JobTask, job_id: str, worker: str):
+        """Unflag a batch once the rows of an interrupted insert are deleted"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE job_batches SET inserting = 0 WHERE job_id = ? AND source = ? AND batch_index = ? "
+                "AND status = 'claimed' AND worker = ?", (job_id, task.source, task.batch_index, worker)
+            )
+
+    def get_chunk_ids(self, job_id: str, source: str) -> List[Tuple[str, int]]:
+        """(chunk hash, primary key) of the stored chunks of a source, in chunk order"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT chunk_hash, pk FROM job_chunks WHERE job_id = ? AND source = ? AND pk IS NOT NULL "
+                "ORDER BY batch_index, position", (job_id, source)
+            ).fetchall()
+
+    def known_ids(self, pks: Iterable[int]) -> Set[int]:
+        """The primary keys among `pks` that are recorded for a chunk of any job"""
+        pks = list(pks)
+        known = set()
+        with self._lock:
+            for start in range(0, len(pks), SQLITE_BATCH_SIZE):
+                batch = pks[start:start + SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                known.update(row[0] for row in self._conn.execute(
+                    f"SELECT pk FROM job_chunks WHERE pk IN ({placeholders})", batch
+                ))
+        return known
+
+    def complete_source(self, job_id: str, source: str, worker: str, document_id: Optional[str]) -> bool:
+        """Mark a finalized source as done and drop its chunks from the log"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE job_sources SET status = 'done', document_id = ?, worker = NULL, lease_until = NULL, error = NULL "
+                "WHERE job_id = ? AND source = ? AND status = 'finalizing' AND worker = ?",
+                (document_id, job_id, source, worker)
+            )
+            if not cursor.rowcount:
+                return False
+            conn.execute("DELETE FROM job_chunks WHERE job_id = ? AND source = ?", (job_id, source))
+        return True
+
+    def fail(self, task: JobTask, job_id: str, worker: str, error: str):
+        """Release a task after an error: pending again, or failed after max_attempts"""
+        status = "failed" if task.attempts >= self.max_attempts else None
+        with self._transaction() as conn:
+            if task.kind == "batch":
+                conn.execute(
+                    "UPDATE job_batches SET status = ?, worker = NULL, lease_until = NULL, error = ? "
+                    "WHERE job_id = ? AND source = ? AND batch_index = ? AND status = 'claimed' AND worker = ?",
+                    (status or "pending", error, job_id, task.source, task.batch_index, worker)
+                )
+            else:
+                claimed, released = ("chunking", "pending") if task.kind == "chunk" else ("finalizing", "chunked")
+                conn.execute(
+                    "UPDATE job_sources SET status = ?, worker = NULL, lease_until = NULL, error = ? "
+                    "WHERE job_id = ? AND source = ? AND status = ? AND worker = ?",
+                    (status or released, error, job_id, task.source, claimed, worker)
+                )
+
+    def release(self, task: JobTask, job_id: str, worker: str):
+        """Give a task back without counting the attempt (the worker is stopping)"""
+        with self._transaction() as conn:
+            if task.kind == "batch":
+                conn.execute(
+                    "UPDATE job_batches SET status = 'pending', worker = NULL, lease_until = NULL, attempts = attempts - 1 "
+                    "WHERE job_id = ? AND source = ? AND batch_index = ? AND status = 'claimed' AND worker = ?",
+                    (job_id, task.source, task.batch_index, worker)
+                )
+            else:
+                claimed, released = ("chunking", "pending") if task.kind == "chunk" else ("finalizing", "chunked")
+                conn.execute(
+                    "UPDATE job_sources SET status = ?, worker = NULL, lease_until = NULL, attempts = attempts - 1 "
+                    "WHERE job_id = ? AND source = ? AND status = ? AND worker = ?",
+                    (released, job_id, task.source, claimed, worker)
+                )
+
+    def progress(self, job_id: str) -> Dict[str, Any]:
+        """Number of sources and batches of a job by status, and of chunks stored so far"""
+        with self._lock:
+            sources = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM job_sources WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+            batches = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM job_batches WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+            stored_chunks = self._conn.execute(
+                "SELECT COALESCE(SUM(num_chunks), 0) FROM job_batches WHERE job_id = ? AND status = 'stored'", (job_id,)
+            ).fetchone()[0]
+        return {"sources": sources, "batches": batches, "chunks_stored": stored_chunks}
+
+    def results(self, job_id: str) -> List[Tuple[str, str, str, Optional[str], int, int, Optional[str]]]:
+        """
+        (source, path, status, document ID, number of chunks, chunks of
+        failed batches, error) of every source of a job, in queue order
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT s.source, s.path, s.status, s.document_id, COALESCE(s.num_chunks, 0), "
+                "COALESCE((SELECT SUM(num_chunks) FROM job_batches b WHERE b.job_id = s.job_id AND b.source = s.source "
+                "AND b.status = 'failed'), 0), "
+                "COALESCE(s.error, (SELECT error FROM job_batches b WHERE b.job_id = s.job_id AND b.source = s.source "
+                "AND b.status = 'failed' LIMIT 1)) "
+                "FROM job_sources s WHERE s.job_id = ? ORDER BY s.rowid", (job_id,)
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
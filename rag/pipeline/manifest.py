@@ -0,0 +1,192 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Set, Tuple
+
+# Cấu hình cho manifest
+MANIFEST_PATH = ".cache/manifest.sqlite"
+HASH_BLOCK_SIZE = 1024 * 1024  # Đọc file theo block 1 MB khi tính hash
+SQLITE_BATCH_SIZE = 500  # Số key trên mỗi câu lệnh SELECT ... IN (...)
+
+
+def file_content_hash(file_path: str) -> str:
+    """SHA-256 of a file's bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of a text, used for chunks and for loaded URL content"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SourceRecord:
+    source: str
+    content_hash: str
+    mtime: Optional[float]
+    size: Optional[int]
+    document_id: Optional[str]
+
+
+class IngestManifest:
+    def __init__(self, path: str = MANIFEST_PATH):
+        """
+        SQLite manifest of ingested sources.
+
+        For every source (file path or URL) it keeps the content hash, mtime,
+        size and document ID, plus the hash and Milvus primary key of every
+        stored chunk, and the duplicate chunks that reference a stored chunk
+        instead of being stored themselves.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            "source TEXT PRIMARY KEY, content_hash TEXT NOT NULL, mtime REAL, "
+            "size INTEGER, document_id TEXT, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "source TEXT NOT NULL, chunk_hash TEXT NOT NULL, pk INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_pk ON chunks(pk)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_refs ("
+            "source TEXT NOT NULL, chunk_index INTEGER NOT NULL, chunk_hash TEXT NOT NULL, "
+            "ref_source TEXT NOT NULL, ref_chunk_hash TEXT NOT NULL, similarity REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_refs_source ON chunk_refs(source)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_refs_ref ON chunk_refs(ref_source, ref_chunk_hash)")
+        self._conn.commit()
+
+    def get(self, source: str) -> Optional[SourceRecord]:
+        """Return the record of a source, or None if it was never ingested"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source, content_hash, mtime, size, document_id FROM sources WHERE source = ?",
+                (source,)
+            ).fetchone()
+        return SourceRecord(*row) if row else None
+
+    def sources(self) -> List[str]:
+        """All recorded sources"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT source FROM sources ORDER BY source")]
+
+    def get_chunks(self, source: str) -> List[Tuple[str, int]]:
+        """Return (chunk_hash, primary_key) pairs stored for a source"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT chunk_hash, pk FROM chunks WHERE source = ? ORDER BY rowid", (source,)
+            ).fetchall()
+
+    def known_ids(self, pks: Iterable[int]) -> Set[int]:
+        """The primary keys among `pks` that are recorded for any source"""
+        pks = list(pks)
+        known = set()
+        with self._lock:
+            for start in range(0, len(pks), SQLITE_BATCH_SIZE):
+                batch = pks[start:start + SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                known.update(row[0] for row in self._conn.execute(
+                    f"SELECT pk FROM chunks WHERE pk IN ({placeholders})", batch
+                ))
+        return known
+
+    def get_references(self, source: str) -> List[Tuple[int, str, str, str, float]]:
+        """(chunk_index, chunk_hash, ref_source, ref_chunk_hash, similarity) of the duplicates of a source"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT chunk_index, chunk_hash, ref_source, ref_chunk_hash, similarity "
+                "FROM chunk_refs WHERE source = ? ORDER BY chunk_index", (source,)
+            ).fetchall()
+
+    def referencing_sources(self, ref_source: str, ref_chunk_hashes: Iterable[str]) -> List[str]:
+        """Other sources with duplicates referencing these chunks of `ref_source`"""
+        sources = set()
+        with self._lock:
+            for chunk_hash in ref_chunk_hashes:
+                rows = self._conn.execute(
+                    "SELECT DISTINCT source FROM chunk_refs WHERE ref_source = ? AND ref_chunk_hash = ? AND source != ?",
+                    (ref_source, chunk_hash, ref_source)
+                ).fetchall()
+                sources.update(row[0] for row in rows)
+        return sorted(sources)
+
+    def invalidate(self, sources: Iterable[str]):
+        """Clear the content hash of sources so the next ingest processes them again"""
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE sources SET content_hash = '', mtime = NULL, size = NULL WHERE source = ?",
+                    [(source,) for source in sources]
+                )
+
+    def touch(self, source: str, mtime: Optional[float], size: Optional[int]):
+        """Update mtime/size of a source whose content did not change"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sources SET mtime = ?, size = ?, updated_at = ? WHERE source = ?",
+                (mtime, size, time.time(), source)
+            )
+            self._conn.commit()
+
+    def record(self,
+               record: SourceRecord,
+               chunks: List[Tuple[str, int]],
+               references: Iterable[Tuple[int, str, str, str, float]] = ()):
+        """
+        Replace the record, chunk list and duplicate references of a source
+        in one transaction.
+
+        Args:
+            record: Source record
+            chunks: (chunk_hash, primary_key) of the stored chunks
+            references: (chunk_index, chunk_hash, ref_source, ref_chunk_hash,
+                similarity) of the chunks skipped as duplicates
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sources "
+                    "(source, content_hash, mtime, size, document_id, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (record.source, record.content_hash, record.mtime, record.size,
+                     record.document_id, time.time())
+                )
+                self._conn.execute("DELETE FROM chunks WHERE source = ?", (record.source,))
+                self._conn.executemany(
+                    "INSERT INTO chunks (source, chunk_hash, pk) VALUES (?, ?, ?)",
+                    [(record.source, chunk_hash, pk) for chunk_hash, pk in chunks]
+                )
+                self._conn.execute("DELETE FROM chunk_refs WHERE source = ?", (record.source,))
+                self._conn.executemany(
+                    "INSERT INTO chunk_refs (source, chunk_index, chunk_hash, ref_source, ref_chunk_hash, similarity) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(record.source, *reference) for reference in references]
+                )
+
+    def remove(self, source: str):
+        """Forget a source"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+                self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+                self._conn.execute("DELETE FROM chunk_refs WHERE source = ?", (source,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,187 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..loaders.manager import DocumentLoaderManager, registered_loaders, restore_loaders
+from utils.metrics import IngestStats, collecting
+from .sources import IngestResult, chunk_for_source, loaded_content_hash, prepare_chunks, text_size
+
+logger = logging.getLogger(__name__)
+
+
+def load_and_chunk(file_path: str,
+                   preserve_paragraphs: bool = False,
+                   token_budget: Optional[int] = None,
+                   pdf_cache_path: Optional[str] = None) -> Tuple[List[str], List[Dict[str, Any]], Optional[str], Dict[str, Tuple[float, int, int]]]:
+    """
+    Load and chunk one source in a worker process. PDF pages are extracted
+    serially (files are already loaded in parallel), through the page cache
+    at `pdf_cache_path` if given.
+
+    Returns:
+        (texts, metadatas, content hash of the loaded documents,
+        {stage: (wall time, items, bytes)} for the "load" and "chunk" stages)
+    """
+    start = time.perf_counter()
+    documents = DocumentLoaderManager(preserve_paragraphs, pdf_cache_path=pdf_cache_path).load(file_path)
+    load_time = time.perf_counter() - start
+    load_size = sum(text_size(doc.page_content) for doc in documents)
+    if not documents:
+        return [], [], loaded_content_hash(documents), {"load": (load_time, 0, 0)}
+
+    start = time.perf_counter()
+    texts, metadatas = prepare_chunks(chunk_for_source(file_path, documents, token_budget))
+    chunk_time = time.perf_counter() - start
+    timings = {
+        "load": (load_time, len(documents), load_size),
+        "chunk": (chunk_time, len(texts), sum(text_size(text) for text in texts))
+    }
+    return texts, metadatas, loaded_content_hash(documents), timings
+
+
+class MultiFileIngestMixin:
+    """
+    Multi-file ingest of RAGPipeline (process_documents): parsing in a
+    process pool, embedding and storage in threads. Relies on the
+    pipeline's manifest helpers and _store_chunks.
+    """
+
+    def process_documents(self,
+                          file_paths: List[str],
+                          max_workers: Optional[int] = None,
+                          store_workers: int = 1,
+                          queue_size: int = 4) -> List[IngestResult]:
+        """
+        Ingest many sources, overlapping parsing with embedding and storage.
+
+        Load + chunk runs in a process pool (`max_workers` processes), embed +
+        store runs in `store_workers` threads. At most `max_workers + queue_size`
+        loaded sources wait for the embed/store stage at any time.
+        A failing source is reported in its result and does not abort the batch.
+        If a worker process dies (crash, out of memory), the sources it was
+        parsing, and the others in flight in the same pool, are reported as
+        failed and the pool is restarted for the remaining sources. Empty
+        sources are recorded in the manifest like any other, so they are
+        skipped next time.
+
+        Worker processes are started with "spawn", so scripts calling this
+        must guard their entry point with `if __name__ == "__main__":`.
+
+        Returns:
+            One IngestResult per path, in input order, each with its IngestStats
+        """
+        start_time = time.time()
+        max_workers = max_workers or os.cpu_count() or 1
+        results: List[Optional[IngestResult]] = [None] * len(file_paths)
+        logger.info(f"📚 Processing {len(file_paths)} documents "
+                    f"({max_workers} parse workers, {store_workers} store workers)")
+
+        def finish(i: int, result: IngestResult):
+            result.stats.count(result.status)
+            self._finish_stats(result.stats)
+            results[i] = result
+
+        # Step 0: Skip unchanged sources before spending a worker on them
+        to_load = []
+        for i, file_path in enumerate(file_paths):
+            stats = IngestStats(file_path)
+            try:
+                with collecting(stats), stats.stage("inspect"):
+                    current, previous = self._inspect_source(file_path)
+                if self._is_unchanged(current, previous):
+                    finish(i, IngestResult(file_path, "skipped", previous.document_id, stats=stats))
+                else:
+                    to_load.append((i, file_path, current, previous, stats))
+            except Exception as e:
+                finish(i, IngestResult(file_path, "failed", error=str(e), stats=stats))
+
+        # Bounded hand-off between the parse stage and the embed/store stage
+        in_flight = threading.BoundedSemaphore(max_workers + queue_size)
+        loaded = queue.Queue(maxsize=max_workers + queue_size)
+
+        def store_worker():
+            while True:
+                item = loaded.get()
+                if item is None:
+                    return
+                i, file_path, current, previous, stats, future = item
+                try:
+                    with collecting(stats):
+                        texts, metadatas, content_hash, timings = future.result()
+                        for stage, (wall_time, items, size) in timings.items():
+                            stats.add_stage(stage, wall_time, items, size)
+                        # Source rỗng vẫn đi qua manifest: được ghi lại và skip ở lần sau
+                        if self.manifest and current.content_hash is None:
+                            current.content_hash = content_hash
+                            if self._is_unchanged(current, previous):
+                                finish(i, IngestResult(file_path, "skipped", previous.document_id, stats=stats))
+                                continue
+                        doc_id = self._store_chunks(current, previous, texts, metadatas, stats)
+                    failed_chunks = stats.counters.get("chunks_failed", 0)
+                    status = "partial" if failed_chunks else "processed"
+                    finish(i, IngestResult(file_path, status, doc_id, len(texts), failed_chunks=failed_chunks, stats=stats))
+                    logger.info(f"✅ {file_path} → {doc_id}")
+                except Exception as e:
+                    finish(i, IngestResult(file_path, "failed", error=str(e), stats=stats))
+                    logger.error(f"❌ {file_path}: {str(e)}")
+                finally:
+                    in_flight.release()
+
+        threads = [threading.Thread(target=store_worker, daemon=True) for _ in range(store_workers)]
+        for thread in threads:
+            thread.start()
+
+        # Worker spawn chỉ có loader mặc định: đăng ký lại các loader thêm bằng register_loader
+        loaders = registered_loaders()
+
+        def new_executor() -> ProcessPoolExecutor:
+            return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=restore_loaders, initargs=(loaders,))
+
+        executor = new_executor()
+        try:
+            for i, file_path, current, previous, stats in to_load:
+                in_flight.acquire()
+                submit_args = (load_and_chunk, file_path, self.load_manager.preserve_paragraphs,
+                               self.token_budget, self.load_manager.pdf_cache_path)
+                try:
+                    try:
+                        future = executor.submit(*submit_args)
+                    except BrokenProcessPool:
+                        # Một worker đã chết: các file đang chạy trong pool cũ nhận lỗi qua future
+                        # của chúng, các file còn lại chạy trong pool mới
+                        logger.warning("⚠️ A parse worker died, restarting the process pool")
+                        executor.shutdown(wait=False)
+                        executor = new_executor()
+                        future = executor.submit(*submit_args)
+                except Exception as e:
+                    finish(i, IngestResult(file_path, "failed", error=str(e), stats=stats))
+                    logger.error(f"❌ {file_path}: {str(e)}")
+                    in_flight.release()
+                    continue
+                future.add_done_callback(
+                    lambda f, item=(i, file_path, current, previous, stats): loaded.put((*item, f))
+                )
+        finally:
+            executor.shutdown(wait=True)
+            for _ in threads:
+                loaded.put(None)
+            for thread in threads:
+                thread.join()
+
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = IngestResult(file_paths[i], "failed", error="Not processed")
+        processed = sum(1 for result in results if result.status == "processed")
+        partial = sum(1 for result in results if result.status == "partial")
+        failed = sum(1 for result in results if result.status == "failed")
+        elapsed_time = time.time() - start_time
+        logger.info(f"✅ Processed {processed}, partial {partial}, skipped {len(results) - processed - partial - failed}, "
+                    f"failed {failed} documents in {elapsed_time:.2f}s")
+        return results
@@ -1,101 +1,726 @@
-import sys
 import os
-from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import logging
 import time
+import numpy as np
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
+# Backend nặng (pandas, pypdf, aiohttp, pymilvus, google-generativeai) được
+# import khi dùng lần đầu, không phải khi import pipeline
+from ..loaders.manager import DocumentLoaderManager
+from ..splitters import count_tokens
+from ..embedders.base import get_embedder
+from ..embedders.embedding_cache import CachedEmbedder, EmbeddingCache
+from ..embedders.rate_limit import EmbeddingError
+from ..vector_stores.filters import build_filter
+from utils.metrics import IngestStats, QueryStats, collecting
+from utils.text_cleaner import iter_clean_documents
+from utils.ttl_cache import TTLCache
+from utils.vectors import VECTOR_DTYPES
+from .dedup import THRESHOLD as DEDUP_THRESHOLD, ChunkReference, DedupIndex
+from .job_runner import JobRunnerMixin
+from .jobs import JobLog
+from .manifest import IngestManifest, SourceRecord, file_content_hash, text_hash
+from .multi_file import MultiFileIngestMixin
+from .sources import IngestResult, chunk_for_source, loaded_content_hash, prepare_chunks, text_size
+from .streaming import StreamingIngestMixin
+# Các tên trước đây định nghĩa trong module này, vẫn import được từ rag_pipeline
+from .multi_file import load_and_chunk  # noqa: F401
+from .sources import iter_text_chunks, prepare_chunk_stream, stream_chunks_for_source  # noqa: F401
+from .streaming import STREAM_BATCH_SIZE  # noqa: F401
 
-from loaders import DocumentLoaderManager
-from splitters import *
-from embedders import GeminiEmbedder
-from vector_stores import MilvusVectorStore
+if TYPE_CHECKING:
+    from ..loaders.async_url_loader import AsyncUrlLoader
 
-class RAGPipeline:
-    def __init__(self, collection_name: str = "document"):
-        """Initialize RAG Pipeline"""
-        print("🚀 Initializing RAG Pipeline...")
+logger = logging.getLogger(__name__)
+
+# Cấu hình cho query cache (in-memory)
+QUERY_CACHE_SIZE = 1024  # Số entry tối đa của mỗi cache (embedding và kết quả)
+QUERY_EMBEDDING_TTL = 3600  # Giây, embedding của query chỉ phụ thuộc model
+QUERY_RESULT_TTL = 60  # Giây, kết quả còn bị xóa khi pipeline ghi vào collection
+
+
+class RAGPipeline(StreamingIngestMixin, MultiFileIngestMixin, JobRunnerMixin):
+    def __init__(self,
+                 collection_name: str = "document",
+                 cache_path: Optional[str] = None,
+                 cache_max_bytes: Optional[int] = None,
+                 manifest_path: Optional[str] = None,
+                 metrics_sink=None,
+                 embedder=None,
+                 vector_store=None,
+                 query_cache_size: int = QUERY_CACHE_SIZE,
+                 query_cache_ttl: Optional[float] = QUERY_RESULT_TTL,
+                 preserve_paragraphs: bool = False,
+                 token_budget: Optional[int] = None,
+                 url_state_path: Optional[str] = None,
+                 pdf_workers: int = 1,
+                 pdf_cache_path: Optional[str] = None,
+                 dedup: Optional[str] = None,
+                 dedup_path: Optional[str] = None,
+                 dedup_threshold: Optional[float] = DEDUP_THRESHOLD,
+                 job_path: Optional[str] = None):
+        """
+        Initialize RAG Pipeline
+
+        Args:
+            collection_name: Milvus collection to store chunks in
+            cache_path: SQLite file for the embedding cache; no cache if None
+            cache_max_bytes: Size budget of the embedding cache
+            manifest_path: SQLite file for the ingest manifest. When set,
+                unchanged sources are skipped and changed ones are re-ingested
+                incrementally; no manifest if None
+            metrics_sink: Object with an `emit(stats)` method (e.g.
+                utils.JsonLinesSink or utils.PrometheusTextSink) receiving the
+                IngestStats of every processed source
+            embedder: Embedder to use instead of GeminiEmbedder, or the name
+                of a backend for embedders.get_embedder ("gemini", "hashing");
+                the collection dimension comes from the embedder
+            vector_store: Vector store to use instead of MilvusVectorStore
+                (collection_name is then ignored)
+            query_cache_size: Entries of the in-memory query embedding and
+                query result caches used by `query`
+            query_cache_ttl: Lifetime of cached query results in seconds
+            preserve_paragraphs: Keep paragraph breaks when cleaning loaded
+                text, so the text splitter prefers cutting between paragraphs
+            token_budget: Chunk by approximate tokens instead of characters,
+                at most this many per chunk (capped to the embedder's
+                `max_input_tokens`), and pack small adjacent table row groups
+                up to it; None keeps the character presets
+            url_state_path: SQLite file of the ETag / Last-Modified
+                validators of ingested web pages; process_urls then skips
+                pages the server reports as not modified
+            pdf_workers: Processes extracting the pages of a PDF in parallel
+                in process_document / process_document_stream (None: all
+                CPUs); 1 parses PDFs serially with PyPDFLoader
+            pdf_cache_path: SQLite file caching extracted PDF pages by file
+                hash, so re-ingesting a PDF skips parsing it
+            dedup: Skip chunks duplicating a stored chunk instead of
+                embedding and storing them again: "document" within each
+                source, "collection" across all sources of the pipeline;
+                None stores every chunk. Skipped chunks are recorded in the
+                manifest as references to the chunk kept, so dedup requires
+                `manifest_path`.
+            dedup_path: SQLite file persisting the signatures of the
+                "collection" dedup index across runs
+            dedup_threshold: Estimated Jaccard similarity from which chunks
+                are near-duplicates (see DedupIndex); None only skips exact
+                duplicates
+            job_path: SQLite work log of run_job; jobs and their progress
+                persist there across restarts and are shared by all
+                pipelines (threads or processes) using the same file
+        """
+        logger.info("🚀 Initializing RAG Pipeline...")
 
         try:
-            self.load_manager = DocumentLoaderManager()
-            self.embedder = GeminiEmbedder()
-            self.vector_store = MilvusVectorStore(
+            self.load_manager = DocumentLoaderManager(preserve_paragraphs, pdf_workers, pdf_cache_path)
+            if embedder is None:
+                embedder = get_embedder("gemini")
+            elif isinstance(embedder, str):
+                embedder = get_embedder(embedder)
+            self.embedder = embedder
+            if cache_path:
+                cache_kwargs = {"max_bytes": cache_max_bytes} if cache_max_bytes else {}
+                self.embedder = CachedEmbedder(self.embedder, EmbeddingCache(cache_path, **cache_kwargs))
+            if vector_store is None:
+                # pymilvus được import và kết nối được mở ở lần dùng đầu tiên
+                from ..vector_stores.milvus_vector_store import MilvusVectorStore
+            self.vector_store = vector_store if vector_store is not None else MilvusVectorStore(
                 collection_name=collection_name,
                 dimension=self.embedder.get_dimension()
             )
-            print("✅ RAG Pipeline initialized successfully!")
+            self.token_budget = token_budget
+            max_input_tokens = getattr(self.embedder, "max_input_tokens", None)
+            if token_budget and max_input_tokens:
+                self.token_budget = min(token_budget, max_input_tokens)
+            self.manifest = IngestManifest(manifest_path) if manifest_path else None
+            self.url_validators = None
+            if url_state_path:
+                from ..loaders.async_url_loader import HttpValidatorStore
+                self.url_validators = HttpValidatorStore(url_state_path)
+            if dedup not in (None, "document", "collection"):
+                raise ValueError(f"Unknown dedup scope: {dedup}")
+            if dedup and not manifest_path:
+                # Không có manifest thì tham chiếu của chunk bị bỏ qua sẽ mất
+                raise ValueError("dedup needs a manifest to record skipped chunks: RAGPipeline(manifest_path=...)")
+            self.dedup = dedup
+            self.dedup_threshold = dedup_threshold
+            self.dedup_index = DedupIndex(dedup_path, dedup_threshold) if dedup == "collection" else None
+            self.job_log = JobLog(job_path) if job_path else None
+            self.metrics_sink = metrics_sink
+            self.last_stats: Optional[IngestStats] = None
+            self.query_stats = QueryStats()
+            self._query_embeddings = TTLCache(query_cache_size, QUERY_EMBEDDING_TTL)
+            self._query_results = TTLCache(query_cache_size, query_cache_ttl)
+            logger.info("✅ RAG Pipeline initialized successfully!")
 
         except Exception as e:
-            print(f"❌ Failed to initialize RAG Pipeline: {str(e)}")
+            logger.error(f"❌ Failed to initialize RAG Pipeline: {str(e)}")
             raise
 
     def process_document(self, file_path: str, document_id: Optional[str] = None) -> str:
-        """Complete pipeline: Load -> Chunk -> Embed -> Store"""
+        """
+        Complete pipeline: Load -> Chunk -> Embed -> Store
+
+        With a manifest, a source whose content did not change since the last
+        ingest is skipped. For a changed source only chunks that were not
+        stored before are embedded and inserted, and chunks that disappeared
+        are deleted from Milvus.
+
+        Chunks that cannot be embedded even after retries are not stored;
+        their number is counted as "chunks_failed" in the stats and the
+        source is re-processed by the next ingest.
+
+        Metrics of the run are available afterwards as `self.last_stats`.
+
+        Returns:
+            `document_id` if given, otherwise the document ID recorded in the
+            manifest or the primary key of the first chunk inserted into Milvus
+        """
+        start_time = time.time()
+        logger.info(f"📄 Processing document: {file_path}")
+        stats = IngestStats(file_path)
+
+        try:
+            with collecting(stats):
+                # Step 0: Skip sources that did not change since the last ingest
+                with stats.stage("inspect"):
+                    current, previous = self._inspect_source(file_path)
+                if self._is_unchanged(current, previous):
+                    logger.info("⏭️ Document unchanged since last ingest, skipping")
+                    stats.count("skipped")
+                    return previous.document_id
+
+                # Step 1: Load documents
+                logger.info("📂 Loading document...")
+                with stats.stage("load") as stage:
+                    documents = self.load_manager.load(file_path)
+                    stage.items += len(documents)
+                    stage.bytes += sum(text_size(doc.page_content) for doc in documents)
+                logger.info(f"   Loaded {len(documents)} document sections")
+
+                if not documents:
+                    logger.warning("⚠️ No content found in document")
+                    if self.manifest:
+                        # Ghi source rỗng vào manifest (xóa chunk cũ nếu có): lần sau được skip
+                        if current.content_hash is None:
+                            current.content_hash = loaded_content_hash(documents)
+                        self._store_chunks(current, previous, [], [], stats)
+                    return None
+
+                if self.manifest and current.content_hash is None:
+                    current.content_hash = loaded_content_hash(documents)
+                    if self._is_unchanged(current, previous):
+                        logger.info("⏭️ Document unchanged since last ingest, skipping")
+                        stats.count("skipped")
+                        return previous.document_id
+
+                # Step 2: Chunk documents
+                logger.info("✂️ Chunking documents...")
+                with stats.stage("chunk") as stage:
+                    chunks = chunk_for_source(file_path, documents, self.token_budget)
+                    # Step 3: Prepare data for embedding
+                    texts, metadatas = prepare_chunks(chunks)
+                    stage.items += len(texts)
+                    stage.bytes += sum(text_size(text) for text in texts)
+                logger.info(f"   Created {len(chunks)} chunks")
+
+                # Step 4-6: Embed, store and record in the manifest
+                doc_id = self._store_chunks(current, previous, texts, metadatas, stats, document_id)
+
+            elapsed_time = time.time() - start_time
+            logger.info(f"✅ Document processed successfully in {elapsed_time:.2f}s")
+            logger.info(f"   Document ID: {doc_id}")
+
+            return doc_id
+        except Exception as e:
+            logger.error(f"❌ Error processing document: {str(e)}")
+            stats.count("failed")
+            raise
+        finally:
+            self._finish_stats(stats)
+
+    def process_urls(self,
+                     urls: Union[str, List[str]],
+                     max_depth: int = 0,
+                     max_pages: int = 100,
+                     sitemap: Union[bool, str] = False,
+                     loader: Optional["AsyncUrlLoader"] = None) -> List[IngestResult]:
+        """
+        Fetch web pages concurrently and ingest each page as soon as it arrives.
+
+        Pages are downloaded by an AsyncUrlLoader (one pooled HTTP session,
+        per-host concurrency limit) while earlier pages are chunked,
+        embedded and stored. Each page is a source of its own, with the same
+        manifest handling as process_document. With `url_state_path`, pages
+        answering 304 Not Modified are skipped without downloading them;
+        validators are only recorded once a page is fully stored.
+
+        Args:
+            urls: Start URL(s)
+            max_depth: Follow same-domain links up to this many hops
+            max_pages: Maximum number of pages to fetch
+            sitemap: True to also ingest the pages of /sitemap.xml, or a sitemap URL
+            loader: Preconfigured loader (the other crawl arguments are then ignored)
+
+        Returns:
+            One IngestResult per page, in arrival order, followed by the
+            pages that were not modified or could not be fetched
+        """
         start_time = time.time()
-        print(f"\n📄 Processing document: {file_path}")
+        if loader is None:
+            from ..loaders.async_url_loader import AsyncUrlLoader
+            loader = AsyncUrlLoader(max_depth=max_depth, max_pages=max_pages, sitemap=sitemap,
+                                    validators=self.url_validators)
+        results = []
+
+        for document in loader.lazy_load(urls):
+            url = document.metadata["source"]
+            # Link chỉ cần cho validator store, không copy vào metadata của mọi chunk
+            links = document.metadata.pop("links", [])
+            stats = IngestStats(url)
+            try:
+                with collecting(stats):
+                    document = next(iter_clean_documents([document], self.load_manager.preserve_paragraphs, in_place=True))
+                    with stats.stage("inspect"):
+                        current, previous = self._inspect_source(url)
+                        if self.manifest:
+                            current.content_hash = loaded_content_hash([document])
+                    if self._is_unchanged(current, previous):
+                        result = IngestResult(url, "skipped", previous.document_id, stats=stats)
+                    else:
+                        with stats.stage("chunk") as stage:
+                            texts, metadatas = prepare_chunks(chunk_for_source(url, [document], self.token_budget))
+                            stage.items += len(texts)
+                            stage.bytes += sum(text_size(text) for text in texts)
+                        doc_id = self._store_chunks(current, previous, texts, metadatas, stats) if texts else None
+                        failed_chunks = stats.counters.get("chunks_failed", 0)
+                        status = "partial" if failed_chunks else "processed"
+                        result = IngestResult(url, status, doc_id, len(texts), failed_chunks=failed_chunks, stats=stats)
+                if self.url_validators and result.status != "partial":
+                    self.url_validators.record(document, links)
+                logger.info(f"✅ {url} → {result.status}")
+            except Exception as e:
+                result = IngestResult(url, "failed", error=str(e), stats=stats)
+                logger.error(f"❌ {url}: {str(e)}")
+            result.stats.count(result.status)
+            self._finish_stats(result.stats)
+            results.append(result)
+
+        for url in loader.not_modified:
+            previous = self.manifest.get(url) if self.manifest else None
+            results.append(IngestResult(url, "skipped", previous.document_id if previous else None))
+        for url, error in loader.failed.items():
+            results.append(IngestResult(url, "failed", error=error))
+
+        elapsed_time = time.time() - start_time
+        logger.info(f"✅ Ingested {len(results)} URLs in {elapsed_time:.2f}s "
+                    f"({len(loader.not_modified)} not modified, {len(loader.failed)} failed)")
+        return results
+
+    def query(self,
+              query: Union[str, List[str]],
+              top_k: int = 5,
+              sources: Optional[Sequence[str]] = None,
+              content_types: Optional[Sequence[str]] = None,
+              expr: Optional[str] = None,
+              nprobe: Optional[int] = None,
+              ef: Optional[int] = None,
+              use_cache: bool = True) -> Union[List[Dict[str, Any]], List[List[Dict[str, Any]]]]:
+        """
+        Retrieve the chunks most similar to one or more queries.
+
+        Query embeddings and search results are kept in in-memory LRU caches
+        with a TTL; cached results are dropped whenever this pipeline writes
+        to the collection. Latencies and cache hits are recorded in
+        `self.query_stats`.
+
+        Args:
+            query: A query, or a list of queries searched in one batch
+            top_k: Number of hits per query
+            sources: Only return chunks of these sources (as stored in the
+                "source" field)
+            content_types: Only return chunks of these content types
+            expr: Additional Milvus filter expression, e.g. "page <= 10"
+            nprobe: IVF clusters to scan (vector store default if None)
+            ef: HNSW candidate list size (vector store default if None)
+            use_cache: Set to False to bypass both caches
+
+        Returns:
+            For a single query, its hits {"id", "score", "content", "source",
+            "page", "content_type", "chunk_index"}; for a list, one list of
+            hits per query
+        """
+        start = time.perf_counter()
+        queries = [query] if isinstance(query, str) else list(query)
+        filter_expr = build_filter(sources, content_types, expr)
+        search_kwargs = {key: value for key, value in (("nprobe", nprobe), ("ef", ef)) if value is not None}
+        self.query_stats.count("queries", len(queries))
+
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+        result_keys = [(text, top_k, filter_expr, nprobe, ef) for text in queries]
+        if use_cache:
+            for i, key in enumerate(result_keys):
+                results[i] = self._query_results.get(key)
+        missing = [i for i, hits in enumerate(results) if hits is None]
+        self.query_stats.count("result_cache_hits", len(queries) - len(missing))
 
-        if not os.path.exists(file_path) and not file_path.startswith(('http://', 'https://')):
+        if missing:
+            # Step 1: Embed the queries that are not cached
+            embed_start = time.perf_counter()
+            embeddings = {}
+            if use_cache:
+                for i in missing:
+                    embedding = self._query_embeddings.get(queries[i])
+                    if embedding is not None:
+                        embeddings[queries[i]] = embedding
+                self.query_stats.count("embedding_cache_hits", len(embeddings))
+            to_embed = list(dict.fromkeys(queries[i] for i in missing if queries[i] not in embeddings))
+            if to_embed:
+                for text, embedding in zip(to_embed, self.embedder.embed_queries(to_embed)):
+                    embeddings[text] = embedding
+                    self._query_embeddings.put(text, embedding)
+            self.query_stats.observe("embed", time.perf_counter() - embed_start)
+
+            # Step 2: Search all missing queries in batched requests, each distinct query once
+            search_start = time.perf_counter()
+            to_search = list(dict.fromkeys(queries[i] for i in missing))
+            hits_per_query = dict(zip(to_search, self.vector_store.search(
+                [embeddings[text] for text in to_search], top_k=top_k, expr=filter_expr, **search_kwargs
+            )))
+            self.query_stats.observe("search", time.perf_counter() - search_start)
+            for i in missing:
+                results[i] = hits_per_query[queries[i]]
+                self._query_results.put(result_keys[i], results[i])
+
+        self.query_stats.observe("total", time.perf_counter() - start)
+        # Copy để caller sửa kết quả không làm hỏng cache
+        results = [[dict(hit) for hit in hits] for hits in results]
+        return results[0] if isinstance(query, str) else results
+
+    def _finish_stats(self, stats: IngestStats, finish: bool = True):
+        """Close the stats of one source and send them to the metrics sink"""
+        if finish:
+            stats.finish()
+        self.last_stats = stats
+        if self.metrics_sink is not None:
+            try:
+                self.metrics_sink.emit(stats)
+            except Exception as e:
+                logger.warning(f"Failed to emit metrics: {str(e)}")
+
+    def _inspect_source(self, file_path: str) -> Tuple[SourceRecord, Optional[SourceRecord]]:
+        """
+        Describe the current state of a source and fetch its manifest record.
+
+        The current content hash stays None when it can only be computed
+        after loading (URLs) or when no manifest is used.
+        """
+        is_url = file_path.startswith(('http://', 'https://'))
+        if not os.path.exists(file_path) and not is_url:
             raise FileNotFoundError(f"Document not found: {file_path}")
 
-        try:
-            # Step 1: Load documents
-            print("📂 Loading document...")
-            documents = self.load_manager.load(file_path)
-            print(f"   Loaded {len(documents)} document sections")
-            
-            if not documents:
-                print("⚠️ No content found in document")
-                return None
-            
-            # Step 2: Chunk documents
-            print("✂️ Chunking documents...")
-            if(file_path.startswith("http://") or file_path.startswith("https://")):
-                chunks = chunk_text_medium(documents)
+        current = SourceRecord(file_path if is_url else os.path.abspath(file_path), None, None, None, None)
+        previous = self.manifest.get(current.source) if self.manifest else None
+        if self.manifest and not is_url:
+            stat = os.stat(file_path)
+            current.mtime, current.size = stat.st_mtime, stat.st_size
+            if previous and (previous.mtime, previous.size) == (current.mtime, current.size):
+                current.content_hash = previous.content_hash
             else:
-                extension = os.path.splitext(file_path)[1].lower()
-                match extension:
-                    case '.csv':
-                        chunks = chunk_documents_by_rows(documents)
-                    case '.xlsx':
-                        chunks = chunk_documents_by_rows(documents)
-                    case '.docx':
-                        chunks = chunk_text_medium(documents)
-                    case '.pdf':
-                        chunks = chunk_text_medium(documents)
-                    case '.txt':
-                        chunks = chunk_text_medium(documents)
-                    case _:
-                        raise ValueError(f"Unsupported file type: {extension}")
-            print(f"   Created {len(chunks)} chunks")
-
-            # Step 3: Prepare data for embedding
-            texts = []
-            metadatas = []
-
-            for i, chunk in enumerate(chunks):
-                texts.append(chunk.page_content)
-                metadata = chunk.metadata.copy()
-                metadata["chunk_index"] = i
-                metadatas.append(metadata)
-
-            # Step 4: Create embeddings
-            print("🧠 Creating embeddings...")
-            embeddings = self.embedder.embed_documents(texts)
-            print(f"   Generated {len(embeddings)} embeddings")
-
-            # Step 5: Store in vector database
-            print("💾 Storing in vector database...")
-            doc_id = self.vector_store.add_documents(
+                current.content_hash = file_content_hash(file_path)
+        return current, previous
+
+    def _is_unchanged(self, current: SourceRecord, previous: Optional[SourceRecord]) -> bool:
+        """Check whether a source has the content recorded by the last ingest"""
+        if previous is None or current.content_hash != previous.content_hash:
+            return False
+        if (current.mtime, current.size) != (previous.mtime, previous.size):
+            self.manifest.touch(current.source, current.mtime, current.size)
+        return True
+
+    def _store_chunks(self,
+                      current: SourceRecord,
+                      previous: Optional[SourceRecord],
+                      texts: List[str],
+                      metadatas: List[Dict[str, Any]],
+                      stats: IngestStats,
+                      document_id: Optional[str] = None) -> Optional[str]:
+        """Embed and store the chunks of one source, diffing against the manifest"""
+        doc_id, _ = self._store_chunk_stream(current, previous, zip(texts, metadatas), stats, document_id)
+        return doc_id
+
+    def _store_chunk_stream(self,
+                            current: SourceRecord,
+                            previous: Optional[SourceRecord],
+                            chunks: Iterable[Tuple[str, Dict[str, Any]]],
+                            stats: IngestStats,
+                            document_id: Optional[str] = None,
+                            batch_size: Optional[int] = None) -> Tuple[Optional[str], int]:
+        """
+        Embed and store (text, metadata) chunks, diffing against the manifest.
+
+        Chunks already stored by the previous ingest keep their primary key.
+        New chunks are embedded and inserted in micro-batches of `batch_size`
+        (all at once if None), flushing once at the end; stale chunks are
+        deleted afterwards. Chunks that fail to embed are skipped and the
+        manifest record is marked incomplete so the next ingest retries them.
+
+        With dedup, a new chunk duplicating a stored chunk (same hash, or
+        MinHash similarity above the threshold) is not embedded; it is
+        recorded as a reference to that chunk. When a referenced chunk goes
+        stale, the sources referencing it are invalidated in the manifest so
+        their next ingest stores their own copy.
+
+        Returns:
+            (document ID, number of chunks)
+        """
+        stored = {}
+        if previous:
+            for chunk_hash, pk in self.manifest.get_chunks(current.source):
+                stored.setdefault(chunk_hash, []).append(pk)
+
+        chunk_hashes = []
+        chunk_ids = []
+        pending = []  # (vị trí, text, metadata) của các chunk mới
+        num_new = 0
+        num_failed = 0
+        # Index "document" chỉ sống trong lần ingest này, "collection" dùng chung
+        dedup = self.dedup_index if self.dedup == "collection" else (
+            DedupIndex(threshold=self.dedup_threshold) if self.dedup else None)
+        references: List[ChunkReference] = []
+        saved: List[Tuple[int, int]] = []  # (token, byte) của từng chunk không embed, theo references
+        if dedup is not None and stored:
+            # Chunk cũ của source có thể sắp thành stale: không để chunk mới tham chiếu tới,
+            # chunk còn giữ được index lại bên dưới
+            dedup.remove(current.source, stored)
+
+        for text, metadata in chunks:
+            chunk_hash = text_hash(text)
+            if stored.get(chunk_hash):
+                chunk_hashes.append(chunk_hash)
+                chunk_ids.append(stored[chunk_hash].pop())
+                if dedup is not None:
+                    dedup.add(current.source, chunk_hash, text)
+                continue
+            if dedup is not None:
+                with stats.stage("dedup") as stage:
+                    stage.items += 1
+                    match, signature = dedup.find(chunk_hash, text)
+                    if match is None:
+                        dedup.add(current.source, chunk_hash, text, signature)
+                if match is not None:
+                    references.append(ChunkReference(current.source, metadata.get("chunk_index", len(chunk_ids) + len(references)),
+                                                     chunk_hash, *match))
+                    saved.append((count_tokens(text), text_size(text)))
+                    continue
+            chunk_hashes.append(chunk_hash)
+            chunk_ids.append(None)
+            pending.append((len(chunk_ids) - 1, text, metadata))
+            if batch_size and len(pending) >= batch_size:
+                inserted, failed = self._embed_and_insert(pending, chunk_ids, stats)
+                num_new += inserted
+                num_failed += failed
+                pending = []
+        if pending:
+            inserted, failed = self._embed_and_insert(pending, chunk_ids, stats)
+            num_new += inserted
+            num_failed += failed
+        if num_new:
+            with stats.stage("store"):
+                self.vector_store.flush()
+            self._query_results.clear()
+
+        stale_ids = [pk for pks in stored.values() for pk in pks]
+        num_unchanged = len(chunk_ids) - num_new - num_failed
+        if dedup is not None:
+            num_failed += self._finish_dedup(current.source, dedup, chunk_hashes, chunk_ids, stored,
+                                             references, saved, stats)
+        stats.chunks = len(chunk_ids) + len(references)
+        stats.count("chunks_new", num_new)
+        stats.count("chunks_unchanged", num_unchanged)
+        stats.count("chunks_stale", len(stale_ids))
+        if num_failed:
+            stats.count("chunks_failed", num_failed)
+            logger.warning(f"⚠️ {num_failed} of {len(chunk_ids)} chunks could not be embedded and were not stored")
+        if previous:
+            logger.info(f"   {num_unchanged} chunks unchanged, {num_new} new, {len(stale_ids)} stale")
+        if stale_ids:
+            with stats.stage("delete") as stage:
+                self.vector_store.delete(stale_ids)
+                stage.items += len(stale_ids)
+            self._query_results.clear()
+
+        stored_ids = [pk for pk in chunk_ids if pk is not None]
+        doc_id = document_id or (previous.document_id if previous else None) or (str(stored_ids[0]) if stored_ids else None)
+
+        # Record the ingest in the manifest
+        if self.manifest:
+            with stats.stage("manifest"):
+                current.document_id = doc_id
+                if num_failed:
+                    # Hash rỗng: lần ingest sau không skip source, chỉ embed lại các chunk lỗi
+                    current.content_hash, current.mtime, current.size = "", None, None
+                self.manifest.record(current, [(chunk_hash, pk) for chunk_hash, pk in zip(chunk_hashes, chunk_ids)
+                                               if pk is not None],
+                                     [(ref.chunk_index, ref.chunk_hash, ref.ref_source, ref.ref_chunk_hash, ref.similarity)
+                                      for ref in references])
+        if dedup is not None:
+            dedup.commit()
+        return doc_id, len(chunk_ids) + len(references)
+
+    def _finish_dedup(self,
+                      source: str,
+                      dedup: DedupIndex,
+                      chunk_hashes: List[str],
+                      chunk_ids: List[Optional[int]],
+                      stored: Dict[str, List[int]],
+                      references: List[ChunkReference],
+                      saved: List[Tuple[int, int]],
+                      stats: IngestStats) -> int:
+        """
+        Update the dedup index after storing a source and report the savings.
+
+        Chunks that failed to embed and stale chunks leave the index; other
+        sources referencing a stale chunk are invalidated in the manifest.
+        References to a chunk of this source that failed to embed are
+        dropped (the source is retried anyway).
+
+        Returns:
+            Number of dropped references, counted as failed chunks
+        """
+        kept = {chunk_hash for chunk_hash, pk in zip(chunk_hashes, chunk_ids) if pk is not None}
+        failed = {chunk_hash for chunk_hash, pk in zip(chunk_hashes, chunk_ids) if pk is None} - kept
+        stale = [chunk_hash for chunk_hash, pks in stored.items() if pks and chunk_hash not in kept]
+        dedup.remove(source, failed)
+        if stale and self.manifest:
+            invalidated = self.manifest.referencing_sources(source, stale)
+            if invalidated:
+                self.manifest.invalidate(invalidated)
+                logger.info(f"   {len(invalidated)} sources referenced stale chunks and will be re-ingested")
+
+        kept_refs = [i for i, ref in enumerate(references) if not (ref.ref_source == source and ref.ref_chunk_hash in failed)]
+        num_dropped = len(references) - len(kept_refs)
+        if num_dropped:
+            references[:] = [references[i] for i in kept_refs]
+            saved[:] = [saved[i] for i in kept_refs]
+        if references:
+            saved_tokens = sum(tokens for tokens, _ in saved)
+            exact = sum(1 for ref in references if ref.chunk_hash == ref.ref_chunk_hash)
+            vector_type = getattr(self.vector_store, "vector_type", "float32")
+            vector_bytes = len(references) * self.embedder.get_dimension() * np.dtype(VECTOR_DTYPES[vector_type]).itemsize
+            stats.count("chunks_duplicate", len(references))
+            stats.count("chunks_duplicate_exact", exact)
+            stats.count("chunks_duplicate_near", len(references) - exact)
+            stats.count("dedup_tokens_saved", saved_tokens)
+            stats.count("dedup_bytes_saved", sum(size for _, size in saved))
+            stats.count("dedup_vector_bytes_saved", vector_bytes)
+            logger.info(f"♻️ Skipped {len(references)} duplicate chunks ({exact} exact, {len(references) - exact} near): "
+                        f"~{saved_tokens} tokens not embedded, {vector_bytes / 1024:.1f} KB of vectors not stored")
+        return num_dropped
+
+    def duplicate_references(self, source: str) -> List[ChunkReference]:
+        """
+        Chunks of a source that were skipped as duplicates, with the chunk
+        they reference (requires a manifest).
+        """
+        if not self.manifest:
+            return []
+        source = source if source.startswith(("http://", "https://")) else os.path.abspath(source)
+        return [ChunkReference(source, *row) for row in self.manifest.get_references(source)]
+
+    def remove_source(self, source: str) -> int:
+        """
+        Delete the chunks of a source from the vector store and forget it in
+        the manifest, e.g. after its file was deleted (requires a manifest).
+        Sources whose duplicates reference its chunks are invalidated, so
+        their next ingest stores their own copy.
+
+        Returns:
+            Number of deleted chunks
+        """
+        if not self.manifest:
+            raise ValueError("remove_source needs a manifest: RAGPipeline(manifest_path=...)")
+        source = source if source.startswith(("http://", "https://")) else os.path.abspath(source)
+        chunks = self.manifest.get_chunks(source)
+        ids = [pk for _, pk in chunks]
+        if ids:
+            self.vector_store.delete(ids)
+            self._query_results.clear()
+        chunk_hashes = {chunk_hash for chunk_hash, _ in chunks}
+        invalidated = self.manifest.referencing_sources(source, chunk_hashes)
+        if invalidated:
+            self.manifest.invalidate(invalidated)
+        if self.dedup_index is not None:
+            self.dedup_index.remove(source, chunk_hashes)
+            self.dedup_index.commit()
+        self.manifest.remove(source)
+        logger.info(f"🗑️ Removed {source} ({len(ids)} chunks)")
+        return len(ids)
+
+    def remove_missing_sources(self) -> List[str]:
+        """
+        Remove (see remove_source) every file of the manifest that no longer
+        exists; URLs are kept.
+
+        Returns:
+            The removed sources
+        """
+        if not self.manifest:
+            raise ValueError("remove_missing_sources needs a manifest: RAGPipeline(manifest_path=...)")
+        missing = [source for source in self.manifest.sources()
+                   if not source.startswith(("http://", "https://")) and not os.path.exists(source)]
+        for source in missing:
+            self.remove_source(source)
+        return missing
+
+    def _embed_and_insert(self,
+                          pending: List[Tuple[int, str, Dict[str, Any]]],
+                          chunk_ids: List[Optional[int]],
+                          stats: IngestStats) -> Tuple[int, int]:
+        """
+        Embed and insert one batch of new chunks, filling in their primary keys.
+
+        Returns:
+            (number of inserted chunks, number of chunks that failed to embed)
+        """
+        texts = [text for _, text, _ in pending]
+
+        # Create embeddings
+        logger.info("🧠 Creating embeddings...")
+        num_failed = 0
+        with stats.stage("embed") as stage:
+            stage.items += len(texts)
+            stage.bytes += sum(text_size(text) for text in texts)
+            try:
+                embeddings = self.embedder.embed_documents(texts)
+            except EmbeddingError as e:
+                # Chỉ lưu các chunk đã embed được, không bao giờ lưu vector giả
+                logger.error(f"   {str(e)}")
+                failed = set(e.failed_indices)
+                num_failed = len(failed)
+                pending = [item for i, item in enumerate(pending) if i not in failed]
+                embeddings = [vector for i, vector in enumerate(e.embeddings) if i not in failed]
+        logger.info(f"   Generated {len(embeddings)} embeddings")
+        if not pending:
+            return 0, num_failed
+        texts = [text for _, text, _ in pending]
+        metadatas = [metadata for _, _, metadata in pending]
+        size = sum(text_size(text) for text in texts)
+        if isinstance(self.embedder, CachedEmbedder):
+            cache_stats = self.embedder.cache.stats()
+            logger.info(f"   Cache hits: {cache_stats['hits']}, misses: {cache_stats['misses']}")
+
+        # Store in vector database
+        logger.info("💾 Storing in vector database...")
+        with stats.stage("store") as stage:
+            ids = self.vector_store.add_documents(
                 texts=texts,
                 embeddings=embeddings,
-                metadatas=metadatas
+                metadatas=metadatas,
+                flush=False
             )
-
-            elapsed_time = time.time() - start_time
-            print(f"✅ Document processed successfully in {elapsed_time:.2f}s")
-            print(f"   Document ID: {doc_id}")
-            
-            return doc_id
-        except Exception as e:
-            print(f"❌ Error processing document: {str(e)}")
-            raise
\ No newline at end of file
+            stage.items += len(ids)
+            stage.bytes += size
+        for (position, _, _), pk in zip(pending, ids):
+            chunk_ids[position] = pk
+        return len(ids), num_failed
@@ -0,0 +1,127 @@
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+
+from ..loaders.manager import LOADERS, DocumentLoaderManager
+from ..splitters import *
+from utils.metrics import IngestStats
+from .manifest import text_hash
+
+
+@dataclass
+class IngestResult:
+    """Outcome of ingesting one source with RAGPipeline.process_documents"""
+    source: str
+    status: str  # "processed", "partial", "skipped" hoặc "failed"
+    document_id: Optional[str] = None
+    num_chunks: int = 0
+    failed_chunks: int = 0  # Chunk không embed được sau khi retry (status "partial")
+    error: Optional[str] = None
+    stats: Optional[IngestStats] = None
+
+
+def text_size(text: str) -> int:
+    """UTF-8 size of a text, used for the byte counters of the stats"""
+    return len(text.encode("utf-8"))
+
+
+def chunk_for_source(file_path: str, documents: List[Document], token_budget: Optional[int] = None) -> List[Document]:
+    """
+    Chunk loaded documents with the strategy matching the source type.
+
+    With `token_budget`, text is chunked to at most that many (approximate)
+    tokens and adjacent row groups of tables are packed up to it.
+    """
+    if token_budget:
+        if os.path.splitext(file_path)[1].lower() in ('.csv', '.xlsx'):
+            return pack_documents(chunk_documents_by_rows(documents), token_budget)
+        return chunk_documents_by_tokens(documents, token_budget)
+
+    if file_path.startswith(("http://", "https://")):
+        return chunk_text_medium(documents)
+
+    extension = os.path.splitext(file_path)[1].lower()
+    match extension:
+        case '.csv':
+            return chunk_documents_by_rows(documents)
+        case '.xlsx':
+            return chunk_documents_by_rows(documents)
+        case '.docx':
+            return chunk_text_medium(documents)
+        case '.pdf':
+            return chunk_text_medium(documents)
+        case '.txt':
+            return chunk_text_medium(documents)
+        case _ if extension in LOADERS:
+            # Loader đăng ký thêm bằng register_loader
+            return chunk_documents_by_rows(documents) if LOADERS[extension][2] else chunk_text_medium(documents)
+        case _:
+            raise ValueError(f"Unsupported file type: {extension}")
+
+
+def stream_chunks_for_source(file_path: str,
+                             load_manager: DocumentLoaderManager,
+                             stats: Optional[IngestStats] = None,
+                             token_budget: Optional[int] = None) -> Iterator[Document]:
+    """
+    Yield the chunks of a source without loading it fully, with the strategy
+    of chunk_for_source. With `stats`, loading and chunking are timed as the
+    "load" and "chunk" stages (CSV/XLSX read and group rows in one "load" stage).
+    CSV/XLSX files are read once, so their chunks carry no row totals and a
+    malformed CSV row raises instead of yielding the error chunk of load_csv.
+    """
+    if not file_path.startswith(("http://", "https://")):
+        extension = os.path.splitext(file_path)[1].lower()
+        match extension:
+            case '.csv':
+                from ..loaders.csv_loader import stream_csv_chunks
+                chunks = stream_csv_chunks(file_path, count_rows=False)
+            case '.xlsx':
+                from ..loaders.xlsx_loader import stream_xlsx_chunks
+                chunks = stream_xlsx_chunks(file_path, count_rows=False)
+            case _:
+                chunks = None
+        if chunks is not None:
+            if stats:
+                chunks = stats.timed_iter("load", chunks, lambda doc: text_size(doc.page_content))
+            return iter_pack_documents(chunks, token_budget) if token_budget else chunks
+
+    documents = load_manager.lazy_load(file_path)
+    if stats is None:
+        return iter_text_chunks(documents, token_budget)
+    documents = stats.timed_iter("load", documents, lambda doc: text_size(doc.page_content))
+    return stats.timed_iter("chunk", iter_text_chunks(documents, token_budget), lambda doc: text_size(doc.page_content))
+
+
+def iter_text_chunks(documents: Iterable[Document], token_budget: Optional[int] = None) -> Iterator[Document]:
+    """Lazily chunk text documents by characters, or by tokens with `token_budget`"""
+    if token_budget:
+        return iter_chunks_by_tokens(documents, token_budget)
+    return iter_chunks_by_text(documents)
+
+
+def prepare_chunk_stream(chunks: Iterable[Document]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Generator version of prepare_chunks yielding (text, metadata) pairs"""
+    for i, chunk in enumerate(chunks):
+        metadata = chunk.metadata.copy()
+        metadata["chunk_index"] = i
+        yield chunk.page_content, metadata
+
+
+def prepare_chunks(chunks: List[Document]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Split chunks into texts and metadatas, numbering chunks within the source"""
+    texts = []
+    metadatas = []
+
+    for i, chunk in enumerate(chunks):
+        texts.append(chunk.page_content)
+        metadata = chunk.metadata.copy()
+        metadata["chunk_index"] = i
+        metadatas.append(metadata)
+    return texts, metadatas
+
+
+def loaded_content_hash(documents: List[Document]) -> str:
+    """Content hash of loaded documents, used for sources without a local file"""
+    return text_hash("\x00".join(doc.page_content for doc in documents))
@@ -0,0 +1,85 @@
+import logging
+import time
+from typing import Optional
+
+from utils.metrics import IngestStats, collecting
+from .sources import iter_text_chunks, loaded_content_hash, prepare_chunk_stream, stream_chunks_for_source, text_size
+
+logger = logging.getLogger(__name__)
+
+# Cấu hình cho streaming mode
+STREAM_BATCH_SIZE = 256  # Số chunk được embed + insert trong mỗi micro-batch
+
+
+class StreamingIngestMixin:
+    """
+    Streaming ingest of RAGPipeline (process_document_stream). Relies on the
+    pipeline's loader, manifest helpers and _store_chunk_stream.
+    """
+
+    def process_document_stream(self,
+                                file_path: str,
+                                document_id: Optional[str] = None,
+                                batch_size: int = STREAM_BATCH_SIZE) -> str:
+        """
+        Streaming variant of process_document with memory bounded by `batch_size`.
+
+        Loaders yield pages (PDF, DOCX, TXT, URL) or row chunks (CSV, XLSX),
+        the splitter yields chunks, and embedding + storage run in
+        micro-batches of `batch_size` chunks, so data reaches Milvus as soon
+        as each micro-batch is embedded. Manifest handling is the same as in
+        process_document.
+
+        Returns:
+            Same document ID as process_document
+        """
+        start_time = time.time()
+        logger.info(f"📄 Streaming document: {file_path} (batches of {batch_size} chunks)")
+        stats = IngestStats(file_path)
+
+        try:
+            with collecting(stats):
+                # Step 0: Skip sources that did not change since the last ingest
+                with stats.stage("inspect"):
+                    current, previous = self._inspect_source(file_path)
+                if self._is_unchanged(current, previous):
+                    logger.info("⏭️ Document unchanged since last ingest, skipping")
+                    stats.count("skipped")
+                    return previous.document_id
+
+                # Step 1-2: Lazily load and chunk
+                if self.manifest and current.content_hash is None:
+                    # URL: content hash cần toàn bộ nội dung, một trang web đủ nhỏ để load trước
+                    with stats.stage("load") as stage:
+                        documents = self.load_manager.load(file_path)
+                        stage.items += len(documents)
+                        stage.bytes += sum(text_size(doc.page_content) for doc in documents)
+                    current.content_hash = loaded_content_hash(documents)
+                    if self._is_unchanged(current, previous):
+                        logger.info("⏭️ Document unchanged since last ingest, skipping")
+                        stats.count("skipped")
+                        return previous.document_id
+                    chunks = stats.timed_iter("chunk", iter_text_chunks(documents, self.token_budget),
+                                              lambda doc: text_size(doc.page_content))
+                else:
+                    chunks = stream_chunks_for_source(file_path, self.load_manager, stats, self.token_budget)
+
+                # Step 3-6: Embed, store and record in micro-batches
+                doc_id, num_chunks = self._store_chunk_stream(
+                    current, previous, prepare_chunk_stream(chunks), stats, document_id, batch_size
+                )
+            if not num_chunks:
+                logger.warning("⚠️ No content found in document")
+                return None
+
+            elapsed_time = time.time() - start_time
+            logger.info(f"✅ Document streamed successfully in {elapsed_time:.2f}s ({num_chunks} chunks)")
+            logger.info(f"   Document ID: {doc_id}")
+
+            return doc_id
+        except Exception as e:
+            logger.error(f"❌ Error processing document: {str(e)}")
+            stats.count("failed")
+            raise
+        finally:
+            self._finish_stats(stats)
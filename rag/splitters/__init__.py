@@ -1,10 +1,21 @@
 from .table_splitter import chunk_documents_by_rows
-from .text_splitter import chunk_documents_by_text, chunk_text_small, chunk_text_medium, chunk_text_large
+from .text_splitter import chunk_documents_by_text, chunk_text_small, chunk_text_medium, chunk_text_large, iter_chunks_by_text
+from .span_splitter import SpanSplitter, split_spans_parallel
+from .token_splitter import (chunk_documents_by_tokens, iter_chunks_by_tokens, pack_documents,
+                             iter_pack_documents, count_tokens)
 
 __all__ = [
     'chunk_documents_by_rows',
     'chunk_documents_by_text',
     'chunk_text_small',
     'chunk_text_medium',
-    'chunk_text_large'
-]
\ No newline at end of file
+    'chunk_text_large',
+    'iter_chunks_by_text',
+    'SpanSplitter',
+    'split_spans_parallel',
+    'chunk_documents_by_tokens',
+    'iter_chunks_by_tokens',
+    'pack_documents',
+    'iter_pack_documents',
+    'count_tokens'
+]
@@ -0,0 +1,181 @@
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import multiprocessing
+import numpy as np
+
+# Separator mặc định, giống RecursiveCharacterTextSplitter
+SEPARATORS = ("\n\n", "\n", " ", "")
+
+Span = Tuple[int, int]
+
+
+class _SeparatorIndex:
+    def __init__(self, text: str):
+        """Offsets of single-character separators in a text, computed once per separator"""
+        self.text = text
+        self._codes: Optional[np.ndarray] = None
+        self._positions: Dict[str, np.ndarray] = {}
+
+    def positions(self, separator: str) -> np.ndarray:
+        if separator not in self._positions:
+            if self._codes is None:
+                # Một code point = một phần tử uint32, nên index trùng với index của str
+                self._codes = np.frombuffer(self.text.encode("utf-32-le"), dtype=np.uint32)
+            self._positions[separator] = np.flatnonzero(self._codes == ord(separator))
+        return self._positions[separator]
+
+    def find_all(self, separator: str, start: int, end: int) -> np.ndarray:
+        """Start offsets of the non-overlapping occurrences of `separator` in text[start:end]"""
+        if len(separator) == 1:
+            positions = self.positions(separator)
+            lo, hi = np.searchsorted(positions, (start, end))
+            return positions[lo:hi]
+
+        found = []
+        position = self.text.find(separator, start, end)
+        while position != -1:
+            found.append(position)
+            position = self.text.find(separator, position + len(separator), end)
+        return np.array(found, dtype=np.int64)
+
+    def contains(self, separator: str, start: int, end: int) -> bool:
+        return self.text.find(separator, start, end) != -1
+
+
+class SpanSplitter:
+    def __init__(self,
+                 chunk_size: int,
+                 chunk_overlap: int,
+                 separators: Sequence[str] = SEPARATORS):
+        """
+        Recursive character splitter producing (start, end) spans.
+
+        Produces exactly the chunks of LangChain's RecursiveCharacterTextSplitter
+        (keep_separator=True, strip_whitespace=True, length_function=len) with
+        the same separators, without building intermediate strings: separator
+        offsets are located once per document and chunks are only sliced out
+        of the source text when needed.
+        """
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators)
+
+    def split_spans(self, text: str, costs: Optional[np.ndarray] = None) -> List[Span]:
+        """
+        Chunk spans of `text`, in order; text[start:end] is the chunk
+
+        Args:
+            text: Text to split
+            costs: Optional prefix sums of a per-character length (len(text) + 1
+                values, costs[i] = length of text[:i]), e.g. approximate token
+                counts. chunk_size and chunk_overlap are then measured in
+                that unit instead of characters.
+        """
+        spans: List[Span] = []
+        if text:
+            self._split(text, _SeparatorIndex(text), costs, 0, len(text), self.separators, spans)
+        return spans
+
+    def split_text(self, text: str) -> List[str]:
+        """Same result as RecursiveCharacterTextSplitter.split_text"""
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def _split(self, text: str, index: _SeparatorIndex, costs: Optional[np.ndarray], start: int, end: int,
+               separators: Sequence[str], spans: List[Span]):
+        # Chọn separator đầu tiên có trong đoạn, "" luôn khớp
+        separator = separators[-1]
+        new_separators: Sequence[str] = ()
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if index.contains(candidate, start, end):
+                separator = candidate
+                new_separators = separators[i + 1:]
+                break
+
+        # Cắt ngay trước mỗi separator (separator thuộc về đoạn phía sau);
+        # split thứ k là (bounds[k], bounds[k + 1])
+        if separator:
+            bounds = np.concatenate(([start], index.find_all(separator, start, end), [end]))
+            if bounds[1] == start:
+                bounds = bounds[1:]  # Bỏ đoạn rỗng khi text bắt đầu bằng separator
+        else:
+            bounds = np.arange(start, end + 1)
+        # Độ dài tích lũy tại mỗi bound (ký tự, hoặc theo costs)
+        weights = costs[bounds] if costs is not None else bounds
+        big_splits = np.flatnonzero(np.diff(weights) >= self.chunk_size).tolist()
+        bounds = bounds.tolist()
+        weights = weights.tolist()
+
+        # Các split >= chunk_size được split tiếp; các split nhỏ liền nhau được merge
+        run_start = 0
+        for big in big_splits:
+            if big > run_start:
+                self._merge(text, bounds, weights, run_start, big, spans)
+            if not new_separators:
+                spans.append((bounds[big], bounds[big + 1]))
+            else:
+                self._split(text, index, costs, bounds[big], bounds[big + 1], new_separators, spans)
+            run_start = big + 1
+        if run_start < len(bounds) - 1:
+            self._merge(text, bounds, weights, run_start, len(bounds) - 1, spans)
+
+    def _merge(self, text: str, bounds: List[int], weights: List[float], lo: int, hi: int, spans: List[Span]):
+        """
+        Greedily merge the contiguous splits lo..hi-1 into chunks of at most
+        chunk_size, with overlap.
+
+        Same result as TextSplitter._merge_splits with an empty separator. As
+        the splits are contiguous, the length of splits h..i-1 is
+        weights[i] - weights[h], so each chunk boundary is found by binary
+        search instead of walking the splits one by one.
+        """
+        head = lo  # Chunk hiện tại bắt đầu từ split `head`
+        while True:
+            # Split đầu tiên không còn vừa chunk hiện tại
+            i = bisect_right(weights, weights[head] + self.chunk_size, head + 1, hi + 1) - 1
+            if i >= hi:
+                self._emit(text, bounds[head], bounds[hi], spans)
+                return
+            self._emit(text, bounds[head], bounds[i], spans)
+            # Bỏ split đầu cho tới khi phần còn lại <= overlap và còn chỗ cho split i
+            threshold = max(weights[i] - self.chunk_overlap, weights[i + 1] - self.chunk_size)
+            head = bisect_left(weights, threshold, head, i)
+
+    @staticmethod
+    def _emit(text: str, start: int, end: int, spans: List[Span]):
+        """Append text[start:end] stripped of surrounding whitespace, if not empty"""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            spans.append((start, end))
+
+
+def _split_spans_worker(args: Tuple[str, int, int, Tuple[str, ...]]) -> List[Span]:
+    text, chunk_size, chunk_overlap, separators = args
+    return SpanSplitter(chunk_size, chunk_overlap, separators).split_spans(text)
+
+
+def split_spans_parallel(texts: List[str],
+                         chunk_size: int,
+                         chunk_overlap: int,
+                         separators: Sequence[str] = SEPARATORS,
+                         max_workers: Optional[int] = None) -> List[List[Span]]:
+    """
+    Split many texts (e.g. the pages of a large PDF) in worker processes.
+
+    Returns the spans of every text, in input order. Worker processes are
+    started with "spawn", so scripts calling this must guard their entry
+    point with `if __name__ == "__main__":`.
+    """
+    separators = tuple(separators)
+    jobs = [(text, chunk_size, chunk_overlap, separators) for text in texts]
+    max_workers = max_workers or multiprocessing.cpu_count()
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return list(executor.map(_split_spans_worker, jobs, chunksize=max(1, len(jobs) // (max_workers * 4))))
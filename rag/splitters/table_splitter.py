@@ -20,7 +20,8 @@ def chunk_documents_by_rows(documents: List[Document], chunk_size: int = CHUNK_S
     chunked_docs = []
     
     for doc in documents:
-        rows = doc.page_content.split("\n\n")
+        # Bảng không có row nào (chỉ có header): không tạo chunk rỗng
+        rows = doc.page_content.split("\n\n") if doc.page_content else []
         num_chunks = math.ceil(len(rows) / chunk_size)
 
         for chunk_idx in range(num_chunks):
@@ -1,65 +1,90 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from functools import lru_cache
 from langchain_core.documents import Document
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+from .span_splitter import SEPARATORS, SpanSplitter, split_spans_parallel
 
 # Cấu hình cho text splitter
 CHUNK_SIZE = 1000  # Số ký tự trên mỗi chunk
 CHUNK_OVERLAP = 200  # Số ký tự overlap giữa các chunk
+PARALLEL_MIN_CHARS = 5_000_000  # Chỉ chia cho worker process khi tổng text đủ lớn
 
-def chunk_documents_by_text(documents: List[Document], chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> List[Document]:
+
+@lru_cache(maxsize=16)
+def get_span_splitter(chunk_size: int, chunk_overlap: int, separators: Tuple[str, ...] = SEPARATORS) -> SpanSplitter:
+    """Shared splitter per configuration instead of one per call"""
+    return SpanSplitter(chunk_size, chunk_overlap, separators)
+
+
+def chunk_documents_by_text(documents: List[Document],
+                            chunk_size: int = CHUNK_SIZE,
+                            chunk_overlap: int = CHUNK_OVERLAP,
+                            max_workers: Optional[int] = None) -> List[Document]:
     """
-    Chunk documents using LangChain's RecursiveCharacterTextSplitter with enhanced metadata.
+    Chunk documents with the recursive character strategy (same chunks as
+    LangChain's RecursiveCharacterTextSplitter) with enhanced metadata.
     
     Args:
         documents: List of documents to chunk
         chunk_size: Number of characters per chunk
         chunk_overlap: Number of characters to overlap between chunks
+        max_workers: Split the documents (e.g. PDF pages) in this many worker
+            processes when their total size exceeds PARALLEL_MIN_CHARS.
+            Opt-in only: the pipeline does not pass it, because splitting
+            spans is fast (~1 s for 50M characters) and starting spawn
+            workers and pickling the text usually costs more than it saves
         
     Returns:
         List of chunked documents with enhanced metadata
     """
-    # Sử dụng RecursiveCharacterTextSplitter của LangChain
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", " ", ""]  # Ưu tiên split theo paragraph, line, space
-    )
-    
-    chunked_docs = []
+    if max_workers and max_workers > 1 and len(documents) > 1 \
+            and sum(len(doc.page_content) for doc in documents) >= PARALLEL_MIN_CHARS:
+        all_spans = split_spans_parallel([doc.page_content for doc in documents], chunk_size, chunk_overlap,
+                                         max_workers=max_workers)
+        chunks = []
+        for doc, spans in zip(documents, all_spans):
+            chunks.extend(_span_documents(doc, spans, chunk_overlap))
+        return chunks
+    return list(iter_chunks_by_text(documents, chunk_size=chunk_size, chunk_overlap=chunk_overlap))
+
+def iter_chunks_by_text(documents: Iterable[Document], chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> Iterator[Document]:
+    """
+    Generator version of chunk_documents_by_text: consumes documents lazily
+    and yields the chunks of each document as soon as it is split.
+    """
+    text_splitter = get_span_splitter(chunk_size, chunk_overlap)  # Ưu tiên split theo paragraph, line, space
     
     for doc in documents:
-        # Split document thành chunks
-        chunks = text_splitter.split_documents([doc])
+        # Split document thành các span (start, end), text chỉ được cắt ra khi tạo chunk
+        yield from _span_documents(doc, text_splitter.split_spans(doc.page_content), chunk_overlap)
+
+def _span_documents(doc: Document, spans: Sequence[Tuple[int, int]], chunk_overlap: int) -> Iterator[Document]:
+    """Materialize the chunk Documents of one document from its spans"""
+    text = doc.page_content
+    # Thêm metadata chi tiết cho từng chunk
+    for chunk_idx, (start, end) in enumerate(spans):
+        # Enhanced metadata
+        enhanced_metadata = {
+            **doc.metadata,  # Giữ metadata gốc
+            "chunk_index": chunk_idx + 1,
+            "total_chunks": len(spans),
+            "chunk_size": end - start,
+            "is_complete_document": len(spans) == 1,
+            "original_text_length": len(text),
+            "splitter_type": "recursive_character",
+            "chunk_overlap_config": chunk_overlap
+        }
         
-        # Thêm metadata chi tiết cho từng chunk
-        for chunk_idx, chunk in enumerate(chunks):
-            # Enhanced metadata
-            enhanced_metadata = {
-                **doc.metadata,  # Giữ metadata gốc
-                "chunk_index": chunk_idx + 1,
-                "total_chunks": len(chunks),
-                "chunk_size": len(chunk.page_content),
-                "is_complete_document": len(chunks) == 1,
-                "original_text_length": len(doc.page_content),
-                "splitter_type": "recursive_character",
-                "chunk_overlap_config": chunk_overlap
-            }
-            
-            chunk.metadata = enhanced_metadata
-            chunked_docs.append(chunk)
-    
-    return chunked_docs
+        yield Document(page_content=text[start:end], metadata=enhanced_metadata)
 
 # Convenience functions với presets
-def chunk_text_small(documents: List[Document]) -> List[Document]:
+def chunk_text_small(documents: List[Document], max_workers: Optional[int] = None) -> List[Document]:
     """Small text chunks (500 chars, 100 overlap)"""
-    return chunk_documents_by_text(documents, chunk_size=500, chunk_overlap=100)
+    return chunk_documents_by_text(documents, chunk_size=500, chunk_overlap=100, max_workers=max_workers)
 
-def chunk_text_medium(documents: List[Document]) -> List[Document]:
+def chunk_text_medium(documents: List[Document], max_workers: Optional[int] = None) -> List[Document]:
     """Medium text chunks (1000 chars, 200 overlap) - DEFAULT"""
-    return chunk_documents_by_text(documents, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return chunk_documents_by_text(documents, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, max_workers=max_workers)
 
-def chunk_text_large(documents: List[Document]) -> List[Document]:
+def chunk_text_large(documents: List[Document], max_workers: Optional[int] = None) -> List[Document]:
     """Large text chunks (2000 chars, 400 overlap)"""
-    return chunk_documents_by_text(documents, chunk_size=2000, chunk_overlap=400)
\ No newline at end of file
+    return chunk_documents_by_text(documents, chunk_size=2000, chunk_overlap=400, max_workers=max_workers)
\ No newline at end of file
@@ -0,0 +1,213 @@
+import math
+from functools import lru_cache
+from langchain_core.documents import Document
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import numpy as np
+from .span_splitter import SEPARATORS, SpanSplitter
+
+# Cấu hình cho token splitter
+TOKEN_CHUNK_SIZE = 512  # Số token (ước lượng) trên mỗi chunk
+TOKEN_COUNT_CACHE_SIZE = 65536  # Số text được cache số token
+
+# Chi phí ước lượng (token) của mỗi ký tự trong một từ, theo tokenizer
+# SentencePiece của Gemini: ~4 ký tự Latin/token, chữ số tách riêng từng số,
+# ký tự có dấu (tiếng Việt) và ký tự ngoài Latin tách nhỏ hơn
+ASCII_LETTER_COST = 0.25
+DIGIT_COST = 1.0
+NON_ASCII_COST = 0.5
+CJK_COST = 1.0  # Từ U+2E80 trở lên (CJK, kana, hangul...)
+PUNCTUATION_COST = 1.0  # Mỗi dấu câu/ký hiệu ASCII là một token
+_CJK_START = 0x2E80
+
+# Các ký tự mà str.isspace() coi là khoảng trắng
+_WHITESPACE = np.array([c for c in range(0x3001) if chr(c).isspace()], dtype=np.uint32)
+
+# Bảng chi phí và phân loại cho 128 ký tự ASCII
+_ASCII_COST = np.zeros(128)
+_ASCII_PUNCTUATION = np.zeros(128, dtype=bool)
+for _code in range(128):
+    _char = chr(_code)
+    if _char.isdigit():
+        _ASCII_COST[_code] = DIGIT_COST
+    elif _char.isalpha() or _char == "_":
+        _ASCII_COST[_code] = ASCII_LETTER_COST
+    elif not _char.isspace():
+        _ASCII_PUNCTUATION[_code] = True
+
+
+def token_costs(text: str) -> np.ndarray:
+    """
+    Prefix sums of the approximate token count of a text.
+
+    Returns len(text) + 1 values, costs[i] being the estimated number of
+    tokens of text[:i], so any span costs costs[end] - costs[start]. Words
+    cost at least one token, spread evenly over their characters; every
+    ASCII punctuation character is one token and whitespace is free.
+    """
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    costs = np.zeros(len(codes) + 1)
+    if not len(codes):
+        return costs
+
+    is_ascii = codes < 128
+    ascii_codes = np.where(is_ascii, codes, 0)
+    is_punctuation = _ASCII_PUNCTUATION[ascii_codes] & is_ascii
+    is_word = ~(is_punctuation | np.isin(codes, _WHITESPACE))
+    char_cost = np.where(is_ascii, _ASCII_COST[ascii_codes], np.where(codes >= _CJK_START, CJK_COST, NON_ASCII_COST))
+
+    per_char = np.where(is_punctuation, PUNCTUATION_COST, 0.0)
+    word_starts = np.flatnonzero(is_word & ~np.concatenate(([False], is_word[:-1])))
+    if len(word_starts):
+        # Mỗi đoạn reduceat là một từ và các ký tự không thuộc từ phía sau nó
+        word_cost = np.add.reduceat(np.where(is_word, char_cost, 0.0), word_starts)
+        word_length = np.add.reduceat(is_word.astype(np.int64), word_starts)
+        is_start = np.zeros(len(codes), dtype=bool)
+        is_start[word_starts] = True
+        word_id = np.cumsum(is_start) - 1
+        # Chia đều chi phí của từ cho các ký tự, để cắt giữa từ dài vẫn đúng tỉ lệ
+        per_char_word = np.maximum(word_cost, 1.0) / word_length
+        per_char = np.where(is_word, per_char_word[np.maximum(word_id, 0)], per_char)
+    np.cumsum(per_char, out=costs[1:])
+    return costs
+
+
+@lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)
+def count_tokens(text: str) -> int:
+    """Approximate token count of a text (cached, see token_costs)"""
+    if not text:
+        return 0
+    return math.ceil(token_costs(text)[-1])
+
+
+@lru_cache(maxsize=16)
+def get_token_splitter(max_tokens: int, overlap_tokens: int) -> SpanSplitter:
+    """Shared splitter per budget; lengths are given as token costs"""
+    return SpanSplitter(max_tokens, overlap_tokens, SEPARATORS)
+
+
+def chunk_documents_by_tokens(documents: List[Document],
+                              max_tokens: int = TOKEN_CHUNK_SIZE,
+                              overlap_tokens: Optional[int] = None) -> List[Document]:
+    """
+    Chunk documents with the recursive strategy, measuring chunks in
+    approximate tokens instead of characters.
+
+    Args:
+        documents: List of documents to chunk
+        max_tokens: Token budget per chunk, e.g. the embedder's max input
+        overlap_tokens: Tokens to overlap between chunks (default: 20% of max_tokens)
+
+    Returns:
+        List of chunked documents with enhanced metadata
+    """
+    return list(iter_chunks_by_tokens(documents, max_tokens, overlap_tokens))
+
+
+def iter_chunks_by_tokens(documents: Iterable[Document],
+                          max_tokens: int = TOKEN_CHUNK_SIZE,
+                          overlap_tokens: Optional[int] = None) -> Iterator[Document]:
+    """Generator version of chunk_documents_by_tokens"""
+    if overlap_tokens is None:
+        overlap_tokens = max_tokens // 5
+    text_splitter = get_token_splitter(max_tokens, overlap_tokens)
+
+    for doc in documents:
+        text = doc.page_content
+        costs = token_costs(text)
+        spans = text_splitter.split_spans(text, costs)
+        for chunk_idx, (start, end) in enumerate(spans):
+            enhanced_metadata = {
+                **doc.metadata,  # Giữ metadata gốc
+                "chunk_index": chunk_idx + 1,
+                "total_chunks": len(spans),
+                "chunk_size": end - start,
+                "token_count": math.ceil(costs[end] - costs[start]),
+                "is_complete_document": len(spans) == 1,
+                "original_text_length": len(text),
+                "splitter_type": "token_budget",
+                "chunk_overlap_config": overlap_tokens,
+                "token_budget": max_tokens
+            }
+            yield Document(page_content=text[start:end], metadata=enhanced_metadata)
+
+
+def _fit_chunks(chunks: Iterable[Document], max_tokens: int) -> Iterator[Document]:
+    text_splitter = get_token_splitter(max_tokens, 0)
+    for chunk in chunks:
+        if count_tokens(chunk.page_content) <= max_tokens:
+            yield chunk
+            continue
+        text = chunk.page_content
+        spans = text_splitter.split_spans(text, token_costs(text))
+        for sub_chunk_idx, (start, end) in enumerate(spans):
+            # Giữ metadata của chunk gốc (splitter_type, chunk_index/total_chunks của row chunk)
+            metadata = {**chunk.metadata, "sub_chunk_index": sub_chunk_idx + 1}
+            yield Document(page_content=text[start:end], metadata=metadata)
+
+
+def _pack_key(metadata: Dict[str, Any]) -> tuple:
+    # Chỉ gộp chunk của cùng một nguồn và cùng trang/sheet
+    return metadata.get("source"), metadata.get("page"), metadata.get("sheet")
+
+
+def _packed_document(group: List[Document], tokens: int, separator: str) -> Document:
+    if len(group) == 1:
+        return group[0]
+    metadata = dict(group[0].metadata)
+    if all(isinstance(doc.metadata.get("chunk_size"), int) for doc in group):
+        # Số hàng (table_rows) hoặc số ký tự của chunk sau khi gộp
+        metadata["chunk_size"] = sum(doc.metadata["chunk_size"] for doc in group)
+    metadata["packed_chunks"] = len(group)
+    metadata["token_count"] = tokens
+    return Document(page_content=separator.join(doc.page_content for doc in group), metadata=metadata)
+
+
+def iter_pack_documents(chunks: Iterable[Document],
+                        max_tokens: int = TOKEN_CHUNK_SIZE,
+                        separator: str = "\n\n",
+                        split_oversized: bool = True) -> Iterator[Document]:
+    """
+    Merge adjacent small chunks of the same source up to a token budget.
+
+    Chunks are joined with `separator` in their original order. Packing
+    short row groups (e.g. from chunk_documents_by_rows) cuts the number of
+    embedding calls and stored vectors.
+
+    Args:
+        chunks: Chunks in document order
+        max_tokens: Token budget of a packed chunk
+        separator: Text inserted between merged chunks
+        split_oversized: Split chunks over the budget with the token splitter
+            (no overlap, row boundaries first) instead of yielding them
+            unchanged, as the embedder would truncate them. The pieces keep
+            the metadata of the chunk they come from, plus their 1-based
+            "sub_chunk_index"
+    """
+    separator_tokens = count_tokens(separator)
+    group: List[Document] = []
+    group_key = None
+    group_tokens = 0
+
+    for chunk in _fit_chunks(chunks, max_tokens) if split_oversized else chunks:
+        key = _pack_key(chunk.metadata)
+        tokens = count_tokens(chunk.page_content)
+        if group and (key != group_key or group_tokens + separator_tokens + tokens > max_tokens):
+            yield _packed_document(group, group_tokens, separator)
+            group = []
+        if not group:
+            group_key = key
+            group_tokens = tokens
+        else:
+            group_tokens += separator_tokens + tokens
+        group.append(chunk)
+
+    if group:
+        yield _packed_document(group, group_tokens, separator)
+
+
+def pack_documents(chunks: List[Document],
+                   max_tokens: int = TOKEN_CHUNK_SIZE,
+                   separator: str = "\n\n",
+                   split_oversized: bool = True) -> List[Document]:
+    """List version of iter_pack_documents"""
+    return list(iter_pack_documents(chunks, max_tokens, separator, split_oversized))
@@ -1,3 +1,24 @@
-from .milvus_vector_store import MilvusVectorStore
+from importlib import import_module
 
-__all__ = ["MilvusVectorStore"]
\ No newline at end of file
+# Tên được export và module chứa nó, import khi dùng lần đầu (pymilvus chỉ
+# được import khi MilvusVectorStore kết nối)
+_EXPORTS = {
+    "MilvusVectorStore": ".milvus_vector_store",
+    "build_filter": ".filters",
+    "IndexConfig": ".index_config",
+    "index_for_rows": ".index_config"
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value  # Các lần sau không qua __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,23 @@
+import json
+from typing import Optional, Sequence
+
+
+def build_filter(sources: Optional[Sequence[str]] = None,
+                 content_types: Optional[Sequence[str]] = None,
+                 expr: Optional[str] = None) -> Optional[str]:
+    """
+    Build a Milvus boolean expression restricting a search.
+
+    Args:
+        sources: Only return chunks of these sources
+        content_types: Only return chunks of these content types
+        expr: Additional raw Milvus expression, e.g. "page >= 3"
+    """
+    clauses = []
+    if sources:
+        clauses.append(f"source in {json.dumps(list(sources), ensure_ascii=False)}")
+    if content_types:
+        clauses.append(f"content_type in {json.dumps(list(content_types), ensure_ascii=False)}")
+    if expr:
+        clauses.append(f"({expr})")
+    return " and ".join(clauses) if clauses else None
@@ -0,0 +1,124 @@
+import json
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+# Ngưỡng số row để chọn loại index tự động (index_for_rows)
+FLAT_MAX_ROWS = 10_000  # Dưới ngưỡng này brute force đủ nhanh và recall 100%
+HNSW_MAX_ROWS = 1_000_000  # HNSW giữ toàn bộ graph trong RAM
+IVF_MAX_ROWS = 10_000_000  # Trên ngưỡng này dùng DISKANN (Milvus standalone/cluster)
+
+
+@dataclass
+class IndexConfig:
+    """
+    ANN index of the embedding field, with its build and search parameters.
+
+    Use the constructors (`hnsw`, `ivf_flat`, `ivf_sq8`, `ivf_pq`, `diskann`,
+    `flat`) or `index_for_rows` to size the parameters to the collection.
+    """
+    index_type: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    metric_type: str = "COSINE"
+
+    @classmethod
+    def flat(cls) -> "IndexConfig":
+        return cls("FLAT")
+
+    @classmethod
+    def ivf_flat(cls, nlist: int = 128) -> "IndexConfig":
+        return cls("IVF_FLAT", {"nlist": nlist})
+
+    @classmethod
+    def ivf_sq8(cls, nlist: int = 1024) -> "IndexConfig":
+        return cls("IVF_SQ8", {"nlist": nlist})
+
+    @classmethod
+    def ivf_pq(cls, nlist: int = 1024, m: int = 96, nbits: int = 8) -> "IndexConfig":
+        """`m` sub-quantizers; the vector dimension must be divisible by `m`"""
+        return cls("IVF_PQ", {"nlist": nlist, "m": m, "nbits": nbits})
+
+    @classmethod
+    def hnsw(cls, M: int = 16, ef_construction: int = 200) -> "IndexConfig":
+        return cls("HNSW", {"M": M, "efConstruction": ef_construction})
+
+    @classmethod
+    def diskann(cls) -> "IndexConfig":
+        return cls("DISKANN")
+
+    @classmethod
+    def from_index_params(cls, index_params: Dict[str, Any]) -> "IndexConfig":
+        """Rebuild a config from the params of an existing pymilvus Index"""
+        params = index_params.get("params", {})
+        if isinstance(params, str):
+            params = json.loads(params)
+        return cls(index_params.get("index_type", "FLAT"), dict(params), index_params.get("metric_type", "COSINE"))
+
+    def index_params(self) -> Dict[str, Any]:
+        """Parameters for Collection.create_index"""
+        return {"index_type": self.index_type, "metric_type": self.metric_type, "params": dict(self.params)}
+
+    def search_params(self, top_k: int, nprobe: Optional[int] = None, ef: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Parameters for Collection.search.
+
+        Args:
+            top_k: Number of hits requested
+            nprobe: IVF clusters to scan (default: ~1/16 of nlist, at least 8)
+            ef: HNSW candidate list / DISKANN search list size (default: 4 * top_k, at least 64)
+        """
+        ef = max(ef or max(64, 4 * top_k), top_k)
+        if self.index_type.startswith("IVF"):
+            nlist = self.params.get("nlist", 128)
+            params = {"nprobe": min(nlist, nprobe or max(8, nlist // 16))}
+        elif self.index_type == "HNSW":
+            params = {"ef": ef}
+        elif self.index_type == "DISKANN":
+            params = {"search_list": ef}
+        else:
+            params = {}
+        return {"metric_type": self.metric_type, "params": params}
+
+
+def index_for_rows(num_rows: int, dimension: int = 768, index_type: Optional[str] = None) -> IndexConfig:
+    """
+    Pick and size an index for a collection of `num_rows` vectors.
+
+    Args:
+        num_rows: Expected number of vectors
+        dimension: Vector dimension (IVF_PQ needs m dividing it)
+        index_type: Force an index type instead of choosing by size
+
+    Sizing follows the Milvus guidelines: nlist ~ 4 * sqrt(rows) for IVF,
+    larger graphs (M, efConstruction) for HNSW as the collection grows.
+    """
+    if index_type is None:
+        if num_rows < FLAT_MAX_ROWS:
+            index_type = "FLAT"
+        elif num_rows < HNSW_MAX_ROWS:
+            index_type = "HNSW"
+        elif num_rows < IVF_MAX_ROWS:
+            index_type = "IVF_SQ8"
+        else:
+            index_type = "DISKANN"
+
+    nlist = min(65536, max(64, int(4 * math.sqrt(max(num_rows, 1)))))
+    match index_type.upper():
+        case "FLAT":
+            return IndexConfig.flat()
+        case "IVF_FLAT":
+            return IndexConfig.ivf_flat(nlist)
+        case "IVF_SQ8":
+            return IndexConfig.ivf_sq8(nlist)
+        case "IVF_PQ":
+            # Mỗi sub-vector 8 chiều; m phải chia hết dimension
+            m = next(m for m in range(max(1, dimension // 8), 0, -1) if dimension % m == 0)
+            return IndexConfig.ivf_pq(nlist, m)
+        case "HNSW":
+            if num_rows < 100_000:
+                return IndexConfig.hnsw(16, 200)
+            return IndexConfig.hnsw(32, 360)
+        case "DISKANN":
+            return IndexConfig.diskann()
+        case _:
+            raise ValueError(f"Unsupported index type: {index_type}")
@@ -1,36 +1,149 @@
-from pymilvus import connections, Collection, CollectionSchema, FieldSchema, DataType, utility
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, Iterator, List, Dict, Any, Optional, Sequence, Union
+from contextlib import contextmanager
+import logging
 import os
+import threading
+import time
+import numpy as np
 from dotenv import load_dotenv
+from utils.vectors import as_float32, encode_vectors, l2_normalize
+from .filters import build_filter
+from .index_config import IndexConfig, index_for_rows
+
+if TYPE_CHECKING:
+    from pymilvus import Collection
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Cấu hình bulk insert
+INSERT_BATCH_SIZE = 1000  # Số row trên mỗi lần collection.insert
+
+# Cấu hình search
+SEARCH_BATCH_SIZE = 100  # Số query vector trên mỗi request search
+DEFAULT_INDEX = IndexConfig.ivf_flat(nlist=128)  # Index khi tạo collection mới
+OUTPUT_FIELDS = ["content", "source", "page", "content_type", "chunk_index"]
+# Kiểu field embedding theo vector_type (tên thành viên của pymilvus.DataType,
+# pymilvus chỉ được import khi kết nối)
+VECTOR_FIELD_TYPES = {
+    "float32": "FLOAT_VECTOR",
+    "float16": "FLOAT16_VECTOR",
+    "int8": "INT8_VECTOR"
+}
+
+
 class MilvusVectorStore:
-    def __init__(self, collection_name: str = "documents", dimension: int = 768):
-        """Initialize Milvus vector store"""
+    def __init__(self,
+                 collection_name: str = "documents",
+                 dimension: int = 768,
+                 batch_size: int = INSERT_BATCH_SIZE,
+                 flush_rows: Optional[int] = None,
+                 flush_interval: Optional[float] = None,
+                 index: Optional[IndexConfig] = None,
+                 defer_index: bool = False,
+                 uri: Optional[str] = None,
+                 vector_type: str = "float32",
+                 normalize: bool = False):
+        """
+        Initialize Milvus vector store. Nothing is sent to Milvus until the
+        collection is first used (see connect).
+
+        Args:
+            collection_name: Name of the Milvus collection
+            dimension: Embedding dimension
+            batch_size: Number of rows sent in a single insert request
+            flush_rows: Flush once this many rows were inserted since the last flush
+            flush_interval: Flush once this many seconds passed since the last flush
+            index: Index built on the embedding field of a new collection
+                (DEFAULT_INDEX if None). For an existing collection the
+                index already built on it is used.
+            defer_index: Do not build the index when creating the collection;
+                it is built by build_index() or the first search
+            uri: Milvus URI, e.g. "./milvus.db" for Milvus Lite or
+                "http://localhost:19530". Defaults to MILVUS_URI, then to
+                MILVUS_HOST/MILVUS_PORT.
+            vector_type: Storage type of the embedding field of a new
+                collection: "float32", "float16" (half the size) or "int8"
+                (a quarter; vectors are normalized, Milvus builds HNSW on it).
+                An existing collection keeps its own type.
+            normalize: L2-normalize vectors (inserted and queried) once per
+                call, vectorized, before storage
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if vector_type not in VECTOR_FIELD_TYPES:
+            raise ValueError(f"Unsupported vector type: {vector_type}")
+
         self.collection_name = collection_name
         self.dimension = dimension
-        
-        # Connect to Milvus
-        connections.connect(
-            alias="default",
-            host=os.getenv("MILVUS_HOST", "localhost"),
-            port=os.getenv("MILVUS_PORT", "19530")
-        )
-        
-        # Create collection if not exists
-        self._create_collection()
-    
-    def _create_collection(self):
+        self.batch_size = batch_size
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._unflushed_rows = 0
+        self._last_flush = time.monotonic()
+        self._loaded = False
+        self.vector_type = vector_type
+        self.normalize = normalize
+        if vector_type == "int8" and index is None:
+            index = IndexConfig.hnsw()  # INT8_VECTOR chỉ hỗ trợ HNSW
+        self.index = index
+        self.uri = uri
+        self.defer_index = defer_index
+        self._collection: Optional["Collection"] = None
+        self._connect_lock = threading.RLock()
+
+    @property
+    def collection(self) -> "Collection":
+        """The Milvus collection, connected and created on first access"""
+        if self._collection is None:
+            self.connect()
+        return self._collection
+
+    def connect(self):
+        """
+        Connect to Milvus and open the collection, creating it if needed.
+
+        Runs on the first use of the store; call it explicitly to check the
+        connection up front. Safe to call several times.
+        """
+        if self._collection is not None:
+            return
+        with self._connect_lock:
+            if self._collection is not None:
+                return
+            from pymilvus import connections
+            uri = self.uri or os.getenv("MILVUS_URI")
+            if uri:
+                connections.connect(alias="default", uri=uri)
+            else:
+                connections.connect(
+                    alias="default",
+                    host=os.getenv("MILVUS_HOST", "localhost"),
+                    port=os.getenv("MILVUS_PORT", "19530")
+                )
+
+            # Create collection if not exists
+            self._create_collection(self.defer_index)
+
+    def _create_collection(self, defer_index: bool = False):
         """Create collection with schema"""
+        from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, utility
         if utility.has_collection(self.collection_name):
-            self.collection = Collection(self.collection_name)
+            self._collection = Collection(self.collection_name)
+            for field in self._collection.schema.fields:
+                if field.name == "embedding":
+                    self.vector_type = next(
+                        (name for name, dtype in VECTOR_FIELD_TYPES.items() if getattr(DataType, dtype) == field.dtype), "float32"
+                    )
+            if self._collection.indexes:
+                self.index = IndexConfig.from_index_params(self._collection.indexes[0].params)
             return
         
         # Define schema
         fields = [
             FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
-            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=self.dimension),
+            FieldSchema(name="embedding", dtype=getattr(DataType, VECTOR_FIELD_TYPES[self.vector_type]), dim=self.dimension),
             FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=65535),
             FieldSchema(name="source", dtype=DataType.VARCHAR, max_length=1000),
             FieldSchema(name="page", dtype=DataType.INT64),
@@ -39,31 +152,236 @@ class MilvusVectorStore:
         ]
         
         schema = CollectionSchema(fields, f"Collection for {self.collection_name}")
-        self.collection = Collection(self.collection_name, schema)
+        self._collection = Collection(self.collection_name, schema)
         
+        logger.info(f"Created collection: {self.collection_name}")
+
         # Create index for vector field
-        index_params = {
-            "metric_type": "COSINE",
-            "index_type": "IVF_FLAT",
-            "params": {"nlist": 128}
-        }
-        self.collection.create_index("embedding", index_params)
-        print(f"Created collection: {self.collection_name}")
+        if not defer_index:
+            self.build_index(self.index or DEFAULT_INDEX)
     
-    def add_documents(self, 
-                     texts: List[str], 
-                     embeddings: List[List[float]], 
-                     metadatas: List[Dict[str, Any]]):
-        """Add documents to collection"""
-        for text, embedding, metadata in zip(texts, embeddings, metadatas):
-            data = {
-                "embedding": embedding,
-                "content": text[:65535],  # Truncate if too long
-                "source": metadata.get("source", ""),
-                "page": metadata.get("page", 0),
-                "content_type": metadata.get("content_type", "text"),
-                "chunk_index": metadata.get("chunk_index", 0)
-            }
-            self.collection.insert(data)
-            self.collection.flush()
-        print(f"Added {len(texts)} documents to {self.collection_name}")
\ No newline at end of file
+    def add_documents(self,
+                     texts: List[str],
+                     embeddings: Union[np.ndarray, Sequence[Sequence[float]]],
+                     metadatas: List[Dict[str, Any]],
+                     flush: bool = True) -> List[int]:
+        """
+        Add documents to collection using column-oriented bulk inserts.
+
+        Rows are inserted in batches of `batch_size`. The collection is flushed
+        once at the end (unless `flush=False`) or earlier when the
+        `flush_rows` / `flush_interval` threshold is reached.
+
+        Args:
+            embeddings: float32 array of shape (len(texts), dimension), or
+                one vector per text
+
+        Returns:
+            Primary keys of the inserted rows, in input order
+        """
+        # Kiểu vector của collection có sẵn chỉ biết sau khi kết nối
+        self.connect()
+        vectors = self._prepare_vectors(embeddings)
+        ids = []
+        for start in range(0, len(texts), self.batch_size):
+            end = start + self.batch_size
+            batch_metadatas = metadatas[start:end]
+
+            # Dữ liệu theo cột, đúng thứ tự field trong schema (bỏ qua id auto)
+            columns = [
+                self._vector_column(vectors[start:end]),
+                [text[:65535] for text in texts[start:end]],  # Truncate if too long
+                [metadata.get("source", "") for metadata in batch_metadatas],
+                [metadata.get("page", 0) for metadata in batch_metadatas],
+                [metadata.get("content_type", "text") for metadata in batch_metadatas],
+                [metadata.get("chunk_index", 0) for metadata in batch_metadatas]
+            ]
+            result = self.collection.insert(columns)
+            ids.extend(result.primary_keys)
+
+            self._unflushed_rows += len(batch_metadatas)
+            if self._flush_threshold_reached():
+                self.flush()
+
+        if flush and self._unflushed_rows:
+            self.flush()
+        logger.info(f"Added {len(texts)} documents to {self.collection_name}")
+        return ids
+
+    def _prepare_vectors(self, embeddings: Union[np.ndarray, Sequence[Sequence[float]]]) -> np.ndarray:
+        """Embeddings as a contiguous array of the storage type, normalized if configured"""
+        vectors = as_float32(embeddings, self.dimension)
+        if self.normalize or self.vector_type == "int8":
+            vectors = l2_normalize(vectors)
+        return encode_vectors(vectors, self.vector_type)
+
+    def _vector_column(self, vectors: np.ndarray) -> List[Any]:
+        """Column of the embedding field for one insert batch"""
+        if self.vector_type == "float32":
+            # pymilvus cần float Python cho FLOAT_VECTOR: một lần tolist() ở C cho cả batch
+            return vectors.tolist()
+        # FLOAT16 / INT8: pymilvus nối thẳng các bytes, không chuyển từng phần tử
+        return [vector.tobytes() for vector in vectors]
+
+    def delete(self, ids: List[int]):
+        """Delete rows by primary key"""
+        for start in range(0, len(ids), self.batch_size):
+            batch = [int(pk) for pk in ids[start:start + self.batch_size]]
+            self.collection.delete(f"id in {batch}")
+        logger.info(f"Deleted {len(ids)} documents from {self.collection_name}")
+
+    def find_chunk_ids(self, sources: Sequence[str], chunk_indices: Sequence[int]) -> List[int]:
+        """Primary keys of the rows of these sources with these chunk indices"""
+        expr = build_filter(sources, expr=f"chunk_index in {sorted({int(i) for i in chunk_indices})}")
+        # Strong: thấy cả các row vừa insert nhưng chưa flush
+        rows = self.collection.query(expr, output_fields=["id"], consistency_level="Strong")
+        return [row["id"] for row in rows]
+
+    def find_chunks(self, sources: Sequence[str], chunk_indices: Sequence[int]) -> List[Dict[str, Any]]:
+        """id, source, chunk_index and content of the rows of these sources with these chunk indices"""
+        expr = build_filter(sources, expr=f"chunk_index in {sorted({int(i) for i in chunk_indices})}")
+        return self.collection.query(expr, output_fields=["id", "source", "chunk_index", "content"],
+                                     consistency_level="Strong")
+
+    def search(self,
+               query_embeddings: Union[np.ndarray, Sequence[Sequence[float]]],
+               top_k: int = 5,
+               expr: Optional[str] = None,
+               nprobe: Optional[int] = None,
+               ef: Optional[int] = None,
+               output_fields: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search the nearest chunks of one or more query embeddings.
+
+        Queries are sent in batches of SEARCH_BATCH_SIZE vectors per request.
+
+        Args:
+            query_embeddings: One embedding per query
+            top_k: Number of hits per query
+            expr: Milvus filter expression (see build_filter)
+            nprobe: IVF clusters to scan (see IndexConfig.search_params)
+            ef: HNSW / DISKANN candidate list size
+            output_fields: Fields returned with every hit
+
+        Returns:
+            For every query, a list of hits {"id", "score", <output fields>}
+            ordered by decreasing similarity
+        """
+        if not self._loaded:
+            self.load()
+
+        output_fields = output_fields or OUTPUT_FIELDS
+        param = self.index.search_params(top_k, nprobe, ef)
+        results = []
+        queries = self._prepare_vectors(query_embeddings)
+        for start in range(0, len(queries), SEARCH_BATCH_SIZE):
+            # pymilvus serialize trực tiếp các hàng numpy theo dtype
+            batch = list(queries[start:start + SEARCH_BATCH_SIZE])
+            response = self.collection.search(
+                data=batch,
+                anns_field="embedding",
+                param=param,
+                limit=top_k,
+                expr=expr,
+                output_fields=output_fields
+            )
+            for hits in response:
+                results.append([
+                    {"id": hit.id, "score": hit.distance} | {field: hit.entity.get(field) for field in output_fields}
+                    for hit in hits
+                ])
+        return results
+
+    def build_index(self, index: Optional[IndexConfig] = None, wait: bool = True):
+        """
+        Build the index of the embedding field.
+
+        Args:
+            index: Index to build; if None it is sized to the current row
+                count with index_for_rows
+            wait: Block until Milvus finished building the index
+        """
+        if index is None:
+            index = index_for_rows(self.collection.num_entities, self.dimension)
+        start = time.monotonic()
+        self.collection.create_index("embedding", index.index_params())
+        if wait:
+            from pymilvus import utility
+            utility.wait_for_index_building_complete(self.collection_name)
+        self.index = index
+        logger.info(f"Built {index.index_type} index on {self.collection_name} "
+                    f"in {time.monotonic() - start:.2f}s ({index.params})")
+
+    def rebuild_index(self, index: Optional[IndexConfig] = None):
+        """
+        Drop and rebuild the index, e.g. after a large backfill or to switch
+        index type. The collection is released meanwhile and loaded again
+        if it was loaded before.
+        """
+        was_loaded = self._loaded
+        self.release()
+        if self.collection.has_index():
+            self.collection.drop_index()
+        self.build_index(index)
+        if was_loaded:
+            self.load()
+
+    @contextmanager
+    def bulk_load(self, index: Optional[IndexConfig] = None) -> Iterator["MilvusVectorStore"]:
+        """
+        Defer index maintenance during a large ingest.
+
+        The collection is released and its index dropped; inserts inside the
+        block are flushed at the end, then the index is built once over all
+        rows (sized to the final row count if `index` is None) and the
+        collection is loaded for search. If the block raises, the index is
+        not built: the rows inserted so far stay in the collection and the
+        index is built by build_index() or the next load().
+
+            with store.bulk_load():
+                pipeline.process_documents(paths)
+        """
+        self.release()
+        if self.collection.has_index():
+            self.collection.drop_index()
+        try:
+            yield self
+        except BaseException:
+            logger.warning(f"Bulk load into {self.collection_name} interrupted, index not built")
+            raise
+        self.flush()
+        self.build_index(index)
+        self.load()
+
+    def compact(self, wait: bool = True):
+        """Merge small segments and purge deleted rows"""
+        self.collection.compact()
+        if wait:
+            self.collection.wait_for_compaction_completed()
+        logger.info(f"Compacted {self.collection_name}")
+
+    def load(self):
+        """Load the collection into memory for search, building a missing index first"""
+        if not self.collection.has_index():
+            self.build_index(self.index)
+        self.collection.load()
+        self._loaded = True
+
+    def release(self):
+        """Release the collection from memory"""
+        self.collection.release()
+        self._loaded = False
+
+    def flush(self):
+        """Seal pending inserts into persisted segments"""
+        self.collection.flush()
+        self._unflushed_rows = 0
+        self._last_flush = time.monotonic()
+
+    def _flush_threshold_reached(self) -> bool:
+        """Check the size/time flush thresholds"""
+        if self.flush_rows is not None and self._unflushed_rows >= self.flush_rows:
+            return True
+        if self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            return True
+        return False
@@ -0,0 +1,230 @@
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from benchmarks.fakes import InMemoryVectorStore
+from rag.loaders.async_url_loader import AsyncUrlLoader, HttpValidatorStore
+from rag.pipeline.rag_pipeline import RAGPipeline
+
+NUM_EXTRA_PAGES = 40
+LARGE_PARAGRAPHS = 20000  # ~500 KB
+
+
+def _page(title, *links):
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return f"<html lang='en'><head><title>{title}</title></head><body><p>{title} body</p>{anchors}</body></html>"
+
+
+PAGES = {
+    "/": _page("Home", "/a", "/b#section", "https://elsewhere.example/x"),
+    "/a": _page("A", "/c"),
+    "/b": _page("B", "/"),
+    "/c": _page("C"),
+    "/only-in-sitemap": _page("Sitemap page"),
+    "/many": _page("Many", *(f"/extra/{i}" for i in range(NUM_EXTRA_PAGES))),
+    **{f"/extra/{i}": _page(f"Extra {i}") for i in range(NUM_EXTRA_PAGES)},
+}
+LARGE_PAGE = "<html><body>" + "".join(f"<p>Paragraph {i}</p>" for i in range(LARGE_PARAGRAPHS)) + "</body></html>"
+SITEMAP_INDEX = """<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>{base}/sitemap-pages.xml</loc></sitemap>
+</sitemapindex>"""
+SITEMAP_PAGES = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>{base}/only-in-sitemap</loc></url>
+  <url><loc>{base}/c</loc></url>
+</urlset>"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Cho phép Transfer-Encoding: chunked
+
+    def do_GET(self):
+        server = self.server
+        server.requests[self.path] += 1
+        if server.delay:
+            time.sleep(server.delay)
+        base = f"http://{self.headers['Host']}"
+        if self.path == "/sitemap.xml":
+            return self._send(SITEMAP_INDEX.format(base=base), "application/xml")
+        if self.path == "/sitemap-pages.xml":
+            return self._send(SITEMAP_PAGES.format(base=base), "application/xml")
+        if self.path == "/large":
+            return self._send(LARGE_PAGE, "text/html; charset=utf-8")
+        if self.path == "/large-chunked":
+            return self._send_chunked(LARGE_PAGE, "text/html; charset=utf-8")
+        if self.path not in PAGES:
+            self.send_error(404)
+            return
+        etag = f'"{server.version}-{self.path}"'
+        if self.headers.get("If-None-Match") == etag:
+            server.not_modified[self.path] += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self._send(PAGES[self.path], "text/html; charset=utf-8", etag)
+
+    def _send(self, body, content_type, etag=None):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except ConnectionError:
+            # Client đóng kết nối khi body vượt max_bytes
+            self.close_connection = True
+
+    def _send_chunked(self, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for start in range(0, len(data), 8192):
+                part = data[start:start + 8192]
+                self.wfile.write(f"{len(part):x}\r\n".encode() + part + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except ConnectionError:
+            # Client đóng kết nối khi body vượt max_bytes
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.requests = Counter()
+    httpd.not_modified = Counter()
+    httpd.version = "v1"
+    httpd.delay = 0.0
+    httpd.base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+    thread.join()
+
+
+def _paths(documents, base):
+    return sorted(document.metadata["source"][len(base):] for document in documents)
+
+
+def test_crawl_follows_same_domain_links_up_to_max_depth(server):
+    loader = AsyncUrlLoader(max_depth=1)
+    documents = loader.load(server.base + "/")
+
+    # /c cách trang gốc 2 hop, link ngoài domain không được theo
+    assert _paths(documents, server.base) == ["/", "/a", "/b"]
+    assert loader.failed == {}
+    home = next(document for document in documents if document.metadata["source"] == server.base + "/")
+    assert home.metadata["title"] == "Home"
+    assert home.metadata["language"] == "en"
+    assert home.metadata["depth"] == 0
+    assert "Home body" in home.page_content
+    # /b#section và link ngược về / không bị tải lại
+    assert server.requests["/"] == 1
+    assert server.requests["/b"] == 1
+
+
+def test_max_pages_limits_the_crawl(server):
+    documents = AsyncUrlLoader(max_depth=3, max_pages=2).load(server.base + "/")
+
+    assert len(documents) == 2
+
+
+def test_sitemap_index_is_followed(server):
+    loader = AsyncUrlLoader(sitemap=True)
+    documents = loader.load(server.base + "/")
+
+    assert _paths(documents, server.base) == ["/", "/c", "/only-in-sitemap"]
+    assert server.requests["/sitemap.xml"] == 1
+    assert server.requests["/sitemap-pages.xml"] == 1
+
+
+def test_unmodified_pages_are_revalidated_with_304(server, tmp_path):
+    validators = HttpValidatorStore(str(tmp_path / "urls.sqlite"))
+    first = AsyncUrlLoader(max_depth=1, validators=validators)
+    for document in first.load(server.base + "/"):
+        validators.record(document)
+
+    second = AsyncUrlLoader(max_depth=1, validators=validators)
+    documents = second.load(server.base + "/")
+
+    assert documents == []
+    # Link của trang 304 lấy từ validator store nên crawl vẫn đi tiếp
+    assert sorted(url[len(server.base):] for url in second.not_modified) == ["/", "/a", "/b"]
+    assert server.not_modified == Counter({"/": 1, "/a": 1, "/b": 1})
+
+    server.version = "v2"
+    third = AsyncUrlLoader(max_depth=1, validators=validators)
+    assert _paths(third.load(server.base + "/"), server.base) == ["/", "/a", "/b"]
+    assert third.not_modified == []
+    validators.close()
+
+
+@pytest.mark.parametrize("path", ["/large", "/large-chunked"])
+def test_large_page_is_read_to_the_end(server, path):
+    loader = AsyncUrlLoader()
+    documents = loader.load(server.base + path)
+
+    assert loader.failed == {}
+    assert len(documents) == 1
+    paragraphs = documents[0].page_content.split()
+    assert len(LARGE_PAGE) > 400_000
+    assert paragraphs[-2:] == ["Paragraph", str(LARGE_PARAGRAPHS - 1)]
+    assert len(paragraphs) == 2 * LARGE_PARAGRAPHS
+
+
+@pytest.mark.parametrize("path", ["/large", "/large-chunked"])
+def test_page_over_max_bytes_is_skipped(server, path):
+    loader = AsyncUrlLoader(max_bytes=len(LARGE_PAGE) - 1)
+
+    assert loader.load(server.base + path) == []
+    assert loader.failed == {}
+
+
+def test_early_break_stops_the_crawl(server):
+    server.delay = 0.05
+    loader = AsyncUrlLoader(max_depth=1, max_pages=NUM_EXTRA_PAGES + 1, per_host_concurrency=2)
+    pages = loader.lazy_load(server.base + "/many")
+    first = next(pages)
+    pages.close()
+
+    assert first.metadata["source"] == server.base + "/many"
+    assert not any(thread.name == "async-url-loader" for thread in threading.enumerate())
+    fetched = sum(server.requests.values())
+    time.sleep(0.3)
+    # Không còn request nào sau khi consumer dừng
+    assert sum(server.requests.values()) == fetched
+    assert fetched < NUM_EXTRA_PAGES + 1
+
+
+def test_process_urls_records_validators_of_stored_pages(server, tmp_path):
+    vector_store = InMemoryVectorStore()
+    rag = RAGPipeline(embedder="hashing", vector_store=vector_store,
+                      manifest_path=str(tmp_path / "manifest.sqlite"),
+                      url_state_path=str(tmp_path / "urls.sqlite"))
+
+    first = rag.process_urls(server.base + "/", max_depth=1)
+    assert sorted(result.status for result in first) == ["processed"] * 3
+    rows = len(vector_store.rows)
+    assert rows > 0
+
+    second = rag.process_urls(server.base + "/", max_depth=1)
+    assert sorted(result.status for result in second) == ["skipped"] * 3
+    assert sum(server.not_modified.values()) == 3
+    assert len(vector_store.rows) == rows
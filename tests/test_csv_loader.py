@@ -0,0 +1,87 @@
+import pandas as pd
+import pytest
+
+from rag.loaders.csv_loader import load_csv, stream_csv_chunks
+from rag.splitters import chunk_documents_by_rows
+
+CSV_FILES = {
+    "valid.csv": "a,b\n" + "".join(f"{i},x{i}\n" for i in range(45)),
+    "extra_field.csv": "a,b\n1,2\n3,4,5\n6,7\n",
+    "unterminated_quote.csv": 'a,b\n1,"open\n3,4\n',
+    "empty.csv": "",
+}
+TOTAL_KEYS = ("total_rows", "total_chunks", "is_complete_document", "original_rows_count")
+
+
+def without_totals(chunks):
+    return [(chunk.page_content, {key: value for key, value in chunk.metadata.items() if key not in TOTAL_KEYS})
+            for chunk in chunks]
+
+
+@pytest.mark.parametrize("name", [*CSV_FILES, "missing.csv"])
+def test_stream_matches_load_csv(tmp_path, name):
+    path = tmp_path / name
+    if name in CSV_FILES:
+        path.write_text(CSV_FILES[name], encoding="utf-8")
+
+    expected = chunk_documents_by_rows(load_csv(str(path)), chunk_size=20)
+    chunks = list(stream_csv_chunks(str(path), chunk_size=20, read_chunk_rows=2))
+
+    assert chunks == expected
+    if name != "valid.csv":
+        assert len(chunks) == 1
+        assert chunks[0].metadata["error"] is True
+        assert chunks[0].page_content.startswith("Error loading CSV file")
+
+
+# id int, price float, q int có ô trống ở vài row, name str có ô trống
+MIXED_CSV = "id,price,q,name\n" + "".join(
+    f"{i},{i * 1.5},{'' if i % 7 == 3 else i},{'' if i % 5 == 0 else f'n{i}'}\n" for i in range(45)
+)
+
+
+@pytest.mark.parametrize("read_chunk_rows", [1, 2, 3, 7, 100])
+def test_stream_matches_load_csv_with_float_and_missing_values(tmp_path, read_chunk_rows):
+    path = tmp_path / "mixed.csv"
+    path.write_text(MIXED_CSV, encoding="utf-8")
+
+    expected = chunk_documents_by_rows(load_csv(str(path)), chunk_size=20)
+    chunks = list(stream_csv_chunks(str(path), chunk_size=20, read_chunk_rows=read_chunk_rows))
+
+    assert chunks == expected
+    rows = expected[0].page_content.split("\n\n")
+    # Giá trị được ghi như trong file, không bị đổi kiểu theo row hoặc theo block
+    assert rows[0] == "id: 0\nprice: 0.0\nq: 0\nname: "
+    assert rows[1] == "id: 1\nprice: 1.5\nq: 1\nname: n1"
+    assert rows[3] == "id: 3\nprice: 4.5\nq: \nname: n3"
+
+
+@pytest.mark.parametrize("count_rows", [True, False])
+def test_header_only_csv_has_no_chunks(tmp_path, count_rows):
+    path = tmp_path / "header.csv"
+    path.write_text("id,price\n", encoding="utf-8")
+
+    assert load_csv(str(path))[0].metadata["total_rows"] == 0
+    assert chunk_documents_by_rows(load_csv(str(path)), chunk_size=20) == []
+    assert list(stream_csv_chunks(str(path), chunk_size=20, count_rows=count_rows)) == []
+
+
+def test_stream_without_count_reads_the_rows_once(tmp_path, monkeypatch):
+    path = tmp_path / "mixed.csv"
+    path.write_text(MIXED_CSV, encoding="utf-8")
+    expected = chunk_documents_by_rows(load_csv(str(path)), chunk_size=20)
+    read_csv = pd.read_csv
+    passes = []
+
+    def counting_read_csv(*args, **kwargs):
+        if kwargs.get("chunksize"):
+            passes.append(kwargs["chunksize"])
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_csv", counting_read_csv)
+    chunks = list(stream_csv_chunks(str(path), chunk_size=20, read_chunk_rows=7, count_rows=False))
+
+    assert passes == [7]
+    # Cùng nội dung và metadata, trừ các tổng số cần đếm trước
+    assert without_totals(chunks) == without_totals(expected)
+    assert not any(key in chunks[0].metadata for key in TOTAL_KEYS)
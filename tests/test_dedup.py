@@ -0,0 +1,66 @@
+import pytest
+
+from benchmarks.fakes import InMemoryVectorStore
+from rag.pipeline.dedup import DedupIndex, minhash_signature
+from rag.pipeline.rag_pipeline import RAGPipeline
+
+TEXT = " ".join(f"word{i}" for i in range(200))
+
+
+def test_texts_without_words_are_only_deduped_exactly():
+    index = DedupIndex()
+    index.add("a.txt", "dashes", "---- | ----")
+
+    assert len(minhash_signature("==== ****")) == 0
+    assert index.find("stars", "==== ****")[0] is None
+    assert index.find("dashes", "---- | ----")[0] == ("a.txt", "dashes", 1.0)
+
+
+def test_near_duplicate_is_found_above_threshold():
+    index = DedupIndex(threshold=0.8)
+    index.add("a.txt", "original", TEXT)
+
+    match, signature = index.find("edited", TEXT.replace("word100", "changed"))
+    assert match is not None and match[:2] == ("a.txt", "original")
+    assert match[2] >= 0.8
+    assert index.find("other", " ".join(f"other{i}" for i in range(200)))[0] is None
+
+
+def test_removed_chunks_are_forgotten_and_persisted(tmp_path):
+    path = str(tmp_path / "dedup.sqlite")
+    index = DedupIndex(path=path)
+    index.add("a.txt", "h1", TEXT)
+    index.add("b.txt", "h2", "something else entirely " * 20)
+    index.remove("a.txt", ["h1"])
+    index.close()
+
+    reopened = DedupIndex(path=path)
+    assert len(reopened) == 1
+    assert reopened.find("h1", TEXT)[0] is None
+    assert reopened.find("h2", "")[0] == ("b.txt", "h2", 1.0)
+    reopened.close()
+
+
+@pytest.mark.parametrize("scope", ["document", "collection"])
+def test_pipeline_dedup_needs_a_manifest(scope):
+    with pytest.raises(ValueError, match="manifest"):
+        RAGPipeline(embedder="hashing", vector_store=InMemoryVectorStore(), dedup=scope)
+
+
+def test_pipeline_records_references_of_skipped_duplicates(tmp_path):
+    (tmp_path / "a.txt").write_text(TEXT, encoding="utf-8")
+    (tmp_path / "b.txt").write_text(TEXT.replace("word100", "changed"), encoding="utf-8")
+    vector_store = InMemoryVectorStore()
+    rag = RAGPipeline(embedder="hashing", vector_store=vector_store, dedup="collection",
+                      manifest_path=str(tmp_path / "manifest.sqlite"))
+
+    rag.process_document(str(tmp_path / "a.txt"))
+    rows = len(vector_store.rows)
+    rag.process_document(str(tmp_path / "b.txt"))
+
+    assert len(vector_store.rows) == rows
+    references = rag.duplicate_references(str(tmp_path / "b.txt"))
+    # Một chunk trùng chính xác, chunk chứa từ bị sửa gần trùng
+    assert sorted((ref.ref_source, ref.similarity == 1.0) for ref in references) == [
+        (str(tmp_path / "a.txt"), False), (str(tmp_path / "a.txt"), True)
+    ]
@@ -0,0 +1,181 @@
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.fakes import DIMENSION, FakeEmbedContent, fake_vector
+from rag.embedders.embedding_cache import CachedEmbedder, EmbeddingCache, embedding_key
+from rag.embedders.gemini_embedder import GeminiEmbedder
+from rag.embedders.rate_limit import EmbeddingError
+
+VECTOR_BYTES = DIMENSION * 4
+
+
+class FailingEmbedContent(FakeEmbedContent):
+    """FakeEmbedContent failing every request that contains a text starting with FAIL"""
+
+    def __init__(self):
+        super().__init__()
+        self.failing = True
+
+    def __call__(self, model, content, task_type):
+        texts = [content] if isinstance(content, str) else content
+        if self.failing and any(text.startswith("FAIL") for text in texts):
+            with self._lock:
+                self.requests += 1
+            raise ValueError("400 invalid argument")
+        return super().__call__(model, content, task_type)
+
+
+def make_embedder(embed_fn, batch_size=4, max_concurrency=3):
+    return GeminiEmbedder(batch_size=batch_size, max_concurrency=max_concurrency, embed_fn=embed_fn,
+                          requests_per_minute=None, max_retries=0)
+
+
+def expected(texts):
+    return np.asarray([fake_vector(text) for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    yield cache
+    cache.close()
+
+
+def test_batches_keep_input_order():
+    fake = FakeEmbedContent(latency=0.01)
+    texts = [f"text {i}" for i in range(10)]
+
+    embeddings = make_embedder(fake).embed_documents(texts)
+
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (10, DIMENSION)
+    np.testing.assert_allclose(embeddings, expected(texts))
+    assert fake.requests == 3  # 4 + 4 + 2
+
+
+def test_empty_input():
+    fake = FakeEmbedContent()
+
+    assert make_embedder(fake).embed_documents([]).shape == (0, DIMENSION)
+    assert fake.requests == 0
+
+
+def test_cache_hits_and_misses(cache):
+    fake = FakeEmbedContent()
+    embedder = CachedEmbedder(make_embedder(fake), cache)
+    texts = ["a", "b", "a", "c"]
+
+    first = embedder.embed_documents(texts)
+    np.testing.assert_allclose(first, expected(texts))
+    # "a" lặp lại chỉ được embed một lần
+    assert fake.requests == 1
+    assert cache.stats()["entries"] == 3
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    second = embedder.embed_documents(["c", "a", "d"])
+    np.testing.assert_allclose(second, expected(["c", "a", "d"]))
+    assert fake.requests == 2
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_cache_keys_include_task_type(cache):
+    fake = FakeEmbedContent()
+    embedder = CachedEmbedder(make_embedder(fake), cache)
+
+    embedder.embed_documents(["same text"])
+    embedder.embed_queries(["same text"])
+    embedder.embed_query("same text")
+
+    assert fake.requests == 2
+    assert cache.stats()["entries"] == 2
+
+
+def test_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    first = EmbeddingCache(path)
+    CachedEmbedder(make_embedder(FakeEmbedContent()), first).embed_documents(["persisted"])
+    first.close()
+
+    fake = FakeEmbedContent()
+    reopened = EmbeddingCache(path)
+    embeddings = CachedEmbedder(make_embedder(fake), reopened).embed_documents(["persisted"])
+    reopened.close()
+
+    np.testing.assert_allclose(embeddings, expected(["persisted"]))
+    assert fake.requests == 0
+
+
+def test_lru_eviction(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), max_bytes=3 * VECTOR_BYTES)
+    keys = {name: embedding_key("model", "retrieval_document", name) for name in "abcd"}
+    for name in "abc":
+        cache.put_many([(keys[name], fake_vector(name))])
+        time.sleep(0.01)
+    # "a" được đọc lại nên "b" là entry ít dùng gần đây nhất
+    assert set(cache.get_many([keys["a"]])) == {keys["a"]}
+    time.sleep(0.01)
+
+    cache.put_many([(keys["d"], fake_vector("d"))])
+
+    assert set(cache.get_many(keys.values())) == {keys["a"], keys["c"], keys["d"]}
+    assert cache.stats()["bytes"] == 3 * VECTOR_BYTES
+    cache.close()
+
+
+def test_partial_results_are_cached_on_embedding_error(cache):
+    fake = FailingEmbedContent()
+    embedder = CachedEmbedder(make_embedder(fake, batch_size=2), cache)
+    texts = ["a", "b", "FAIL x", "c", "d"]
+
+    with pytest.raises(EmbeddingError) as info:
+        embedder.embed_documents(texts)
+
+    error = info.value
+    # Batch ["FAIL x", "c"] lỗi, các batch khác vẫn có vector
+    assert error.failed_indices == [2, 3]
+    assert error.embeddings[2] is None and error.embeddings[3] is None
+    np.testing.assert_allclose(np.stack([error.embeddings[i] for i in (0, 1, 4)]), expected(["a", "b", "d"]))
+    assert cache.stats()["entries"] == 3
+
+    fake.failing = False
+    requests = fake.requests
+    embeddings = embedder.embed_documents(texts)
+    np.testing.assert_allclose(embeddings, expected(texts))
+    # Chỉ hai text lỗi được embed lại, trong một request
+    assert fake.requests == requests + 1
+
+
+def test_failed_query_raises_embedding_error():
+    with pytest.raises(EmbeddingError) as info:
+        make_embedder(FailingEmbedContent()).embed_query("FAIL query")
+    assert info.value.failed_indices == [0]
+
+
+def test_cache_size_and_access_times_are_tracked_in_memory(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache(path)
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    keys = {name: embedding_key("model", "retrieval_document", name) for name in "ab"}
+
+    cache.put_many([(keys["a"], fake_vector("a")), (keys["b"], fake_vector("b"))])
+    # Ghi đè một key không làm tăng tổng kích thước
+    cache.put_many([(keys["a"], fake_vector("a"))])
+    time.sleep(0.01)
+    read_at = time.time()
+    assert set(cache.get_many(keys.values())) == set(keys.values())
+
+    assert cache.stats()["bytes"] == 2 * VECTOR_BYTES
+    # Không quét cả bảng khi ghi, không UPDATE ở mỗi lần đọc trúng
+    assert not any("SUM" in sql and "WHERE" not in sql for sql in statements)
+    assert not any(sql.startswith("UPDATE") for sql in statements)
+    cache.close()
+
+    reopened = EmbeddingCache(path)
+    assert reopened.stats()["bytes"] == 2 * VECTOR_BYTES
+    # Thời điểm đọc được ghi khi đóng cache
+    last_access = dict(reopened._conn.execute("SELECT key, last_access FROM embeddings"))
+    assert all(last_access[key] >= read_at for key in keys.values())
+    reopened.close()
@@ -0,0 +1,284 @@
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+import openpyxl
+import pytest
+
+from benchmarks.fakes import InMemoryVectorStore
+from rag.embedders import HashingEmbedder
+from rag.embedders.rate_limit import EmbeddingError
+from rag.pipeline.jobs import JobLog
+from rag.pipeline.rag_pipeline import RAGPipeline
+
+DIMENSION = 64
+JOB = "backfill"
+
+
+class FlakyEmbedder(HashingEmbedder):
+    """HashingEmbedder recording the texts it embeds and failing texts that contain a marker"""
+
+    def __init__(self, failing=()):
+        super().__init__(DIMENSION)
+        self.failing = set(failing)
+        self.embedded = Counter()
+        self.before_embed = None
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        if self.before_embed is not None:
+            self.before_embed()
+        with self._lock:
+            self.embedded.update(texts)
+        embeddings = super().embed_documents(texts)
+        failed = [i for i, text in enumerate(texts) if any(marker in text for marker in self.failing)]
+        if failed:
+            raise EmbeddingError("400 invalid argument",
+                                 [None if i in failed else vector for i, vector in enumerate(embeddings)], failed)
+        return embeddings
+
+
+class Crash(BaseException):
+    """The process dies"""
+
+
+class CrashingStore(InMemoryVectorStore):
+    """Vector store whose process dies right after the rows of one insert call reached it"""
+
+    def __init__(self, crash_on_call):
+        super().__init__(DIMENSION)
+        self.crash_on_call = crash_on_call
+        self.calls = 0
+
+    def add_documents(self, texts, embeddings, metadatas, flush=True):
+        self.calls += 1
+        ids = super().add_documents(texts, embeddings, metadatas, flush)
+        if self.calls == self.crash_on_call:
+            raise Crash()
+        return ids
+
+
+def paragraphs(name, count=5):
+    # Mỗi đoạn là một chunk riêng (preserve_paragraphs)
+    return "\n\n".join(" ".join([f"{name} paragraph {i}."] * 40) for i in range(count))
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for name in ("alpha", "beta", "gamma"):
+        path = tmp_path / f"{name}.txt"
+        path.write_text(paragraphs(name), encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def make_pipeline(tmp_path, embedder=None, vector_store=None):
+    return RAGPipeline(embedder=embedder or FlakyEmbedder(), vector_store=vector_store or InMemoryVectorStore(DIMENSION),
+                       preserve_paragraphs=True, manifest_path=str(tmp_path / "manifest.sqlite"),
+                       job_path=str(tmp_path / "jobs.sqlite"))
+
+
+def assert_stored_once(rag, files):
+    """Every chunk of the files is stored exactly once and recorded in the manifest"""
+    contents = Counter(row["content"] for row in rag.vector_store.rows.values())
+    expected = Counter(paragraph for path in files
+                       for paragraph in open(path, encoding="utf-8").read().split("\n\n"))
+    assert contents == expected
+    manifest_ids = sorted(pk for path in files for _, pk in rag.manifest.get_chunks(path))
+    assert manifest_ids == sorted(rag.vector_store.rows)
+
+
+def test_job_resumes_after_embedding_failure_without_duplicates(tmp_path, files):
+    embedder = FlakyEmbedder(failing={"beta paragraph 3."})
+    rag = make_pipeline(tmp_path, embedder)
+
+    results = rag.run_job(JOB, files, batch_size=2)
+
+    assert [result.status for result in results] == ["processed", "failed", "processed"]
+    # Batch [3, 4] của beta lỗi sau 3 lần thử, các batch khác đã được lưu
+    assert results[1].failed_chunks == 2
+    assert rag.manifest.get(files[1]) is None
+    assert len(rag.vector_store.rows) == 13
+    beta_ok = "beta paragraph 4." + " beta paragraph 4." * 39
+    # Chunk embed được của batch lỗi được checkpoint: không embed lại ở các lần thử sau
+    assert embedder.embedded[beta_ok] == 1
+    assert rag.job_progress(JOB)["batches"] == {"stored": 8, "failed": 1}
+
+    embedder.failing.clear()
+    results = rag.run_job(JOB)
+
+    assert [result.status for result in results] == ["processed"] * 3
+    assert_stored_once(rag, files)
+    assert embedder.embedded[beta_ok] == 1
+    assert all(count == 1 for text, count in embedder.embedded.items() if "beta paragraph 3." not in text)
+
+    # Job đã xong: chạy lại không làm gì
+    rows = dict(rag.vector_store.rows)
+    rag.run_job(JOB)
+    assert rag.vector_store.rows == rows
+
+
+@pytest.mark.parametrize("lost_at", ["embed", "store"])
+def test_lost_claim_leaves_the_batch_to_the_new_owner(tmp_path, files, lost_at):
+    embedder = FlakyEmbedder()
+    vector_store = InMemoryVectorStore(DIMENSION)
+    rag = make_pipeline(tmp_path, embedder, vector_store)
+    job_path = str(tmp_path / "jobs.sqlite")
+    other = JobLog(job_path)
+    taken = []
+
+    def take_over():
+        if taken:
+            return
+        # Lease của worker hết hạn, worker khác claim batch rồi trả lại khi dừng
+        with sqlite3.connect(job_path) as conn:
+            conn.execute("UPDATE job_batches SET lease_until = 0 WHERE status = 'claimed'")
+        task = other.claim(JOB, "other-worker")
+        assert task.kind == "batch"
+        taken.append(task)
+        other.release(task, JOB, "other-worker")
+
+    if lost_at == "embed":
+        # ClaimLost khi checkpoint embedding
+        embedder.before_embed = take_over
+    else:
+        # complete_batch thất bại sau khi insert: các row vừa insert bị xóa
+        add_documents = vector_store.add_documents
+        vector_store.add_documents = lambda *args, **kwargs: (add_documents(*args, **kwargs), take_over())[0]
+
+    results = rag.run_job(JOB, files[:1], batch_size=2)
+
+    assert len(taken) == 1
+    assert [result.status for result in results] == ["processed"]
+    assert results[0].stats.counters["job_claims_lost"] == 1
+    assert_stored_once(rag, files[:1])
+    other.close()
+
+
+def test_interrupted_insert_is_cleaned_up(tmp_path, files):
+    # Process chết sau khi batch thứ hai đã vào vector store nhưng trước khi pk được ghi vào log
+    vector_store = CrashingStore(crash_on_call=2)
+    rag = make_pipeline(tmp_path, vector_store=vector_store)
+
+    with pytest.raises(Crash):
+        rag.run_job(JOB, files[:1], batch_size=2)
+    first_batch = set(vector_store.rows)
+    assert len(first_batch) == 4
+
+    restarted = make_pipeline(tmp_path, vector_store=vector_store)
+    results = restarted.run_job(JOB)
+
+    assert [result.status for result in results] == ["processed"]
+    assert results[0].stats.counters["job_orphans_deleted"] == 2
+    assert_stored_once(restarted, files[:1])
+    # Batch đầu đã có pk trong log: không bị xóa
+    assert {pk for pk in first_batch if pk in vector_store.rows} == {1, 2}
+
+
+def write_workbook(path, label, rows=100):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["id", "label"])
+    for i in range(rows):
+        sheet.append([i, label])
+    path.parent.mkdir(exist_ok=True)
+    workbook.save(path)
+    return str(path)
+
+
+def test_interrupted_insert_keeps_rows_of_files_with_the_same_basename(tmp_path):
+    # Metadata "source" của XLSX là basename: ba file cùng là report.xlsx
+    job_file = write_workbook(tmp_path / "a" / "report.xlsx", "same")
+    copy = write_workbook(tmp_path / "b" / "report.xlsx", "same")
+    other = write_workbook(tmp_path / "c" / "report.xlsx", "other")
+    vector_store = CrashingStore(crash_on_call=0)
+    make_pipeline(tmp_path, vector_store=vector_store).process_document(copy)
+    # Writer không có manifest: row của nó không được ghi ở đâu cả
+    RAGPipeline(embedder=FlakyEmbedder(), vector_store=vector_store).process_document(other)
+    kept = dict(vector_store.rows)
+    assert {row["source"] for row in kept.values()} == {"report.xlsx"}
+
+    vector_store.calls, vector_store.crash_on_call = 0, 2
+    rag = make_pipeline(tmp_path, vector_store=vector_store)
+    with pytest.raises(Crash):
+        rag.run_job(JOB, [job_file], batch_size=2)
+    inserted = len(vector_store.rows) - len(kept)
+
+    results = make_pipeline(tmp_path, vector_store=vector_store).run_job(JOB)
+
+    assert [result.status for result in results] == ["processed"]
+    assert results[0].stats.counters["job_orphans_deleted"] == inserted - 2
+    assert all(vector_store.rows.get(pk) == row for pk, row in kept.items())
+    job_ids = [pk for _, pk in rag.manifest.get_chunks(os.path.abspath(job_file))]
+    assert len(vector_store.rows) == len(kept) + len(job_ids)
+
+
+def test_run_job_rejects_dedup(tmp_path, files):
+    rag = RAGPipeline(embedder=FlakyEmbedder(), vector_store=InMemoryVectorStore(DIMENSION), dedup="collection",
+                      manifest_path=str(tmp_path / "manifest.sqlite"), job_path=str(tmp_path / "jobs.sqlite"))
+
+    with pytest.raises(ValueError, match="dedup"):
+        rag.run_job(JOB, files)
+
+
+def test_job_invalidates_sources_referencing_its_stale_chunks(tmp_path):
+    vector_store = InMemoryVectorStore(DIMENSION)
+    original = paragraphs("alpha").split("\n\n")
+    referenced, copy = tmp_path / "alpha.txt", tmp_path / "copy.txt"
+    referenced.write_text("\n\n".join(original), encoding="utf-8")
+    copy.write_text(original[3] + "\n\n" + paragraphs("copy", 2), encoding="utf-8")
+    deduping = RAGPipeline(embedder=FlakyEmbedder(), vector_store=vector_store, preserve_paragraphs=True,
+                           dedup="collection", manifest_path=str(tmp_path / "manifest.sqlite"))
+    deduping.process_document(str(referenced))
+    deduping.process_document(str(copy))
+    # Đoạn 3 của copy.txt chỉ là tham chiếu tới chunk của alpha.txt
+    assert [ref.ref_source for ref in deduping.duplicate_references(str(copy))] == [str(referenced)]
+    copy_hash = deduping.manifest.get(str(copy)).content_hash
+
+    rag = make_pipeline(tmp_path, vector_store=vector_store)
+    edited = list(original)
+    edited[0] = "Edited " + edited[0]
+    referenced.write_text("\n\n".join(edited), encoding="utf-8")
+    rag.run_job("edit-unreferenced", [str(referenced)])
+    assert rag.manifest.get(str(copy)).content_hash == copy_hash
+
+    edited[3] = "Edited " + edited[3]
+    referenced.write_text("\n\n".join(edited), encoding="utf-8")
+    results = rag.run_job("edit-referenced", [str(referenced)])
+
+    assert results[0].stats.counters["chunks_stale"] == 1
+    # copy.txt được ingest lại ở lần sau và lưu bản riêng của đoạn đó
+    assert rag.manifest.get(str(copy)).content_hash == ""
+    rerun = RAGPipeline(embedder=FlakyEmbedder(), vector_store=vector_store, preserve_paragraphs=True,
+                        dedup="collection", manifest_path=str(tmp_path / "manifest.sqlite"))
+    rerun.process_document(str(copy))
+    assert rerun.last_stats.counters["chunks_new"] == 1
+    assert rerun.duplicate_references(str(copy)) == []
+    assert original[3] in {row["content"] for row in vector_store.rows.values()}
+
+
+def test_two_workers_and_two_processes_share_a_job(tmp_path, files):
+    embedder = FlakyEmbedder()
+    vector_store = InMemoryVectorStore(DIMENSION)
+    # Hai pipeline trên cùng job_path / manifest như hai process, mỗi cái hai worker thread
+    first = make_pipeline(tmp_path, embedder, vector_store)
+    second = make_pipeline(tmp_path, embedder, vector_store)
+    first.job_log.create_job(JOB, 2)
+    first.job_log.add_sources(JOB, [(path, path) for path in files])
+
+    results = {}
+    threads = [threading.Thread(target=lambda rag=rag: results.setdefault(id(rag), rag.run_job(JOB, workers=2)))
+               for rag in (first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for job_results in results.values():
+        assert [result.status for result in job_results] == ["processed"] * 3
+    assert_stored_once(first, files)
+    # Mỗi chunk được embed đúng một lần dù có bốn worker
+    assert set(embedder.embedded.values()) == {1}
+    assert first.job_progress(JOB)["batches"] == {"stored": 9}
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from benchmarks.fakes import InMemoryVectorStore
+from rag.embedders import HashingEmbedder
+from rag.pipeline.rag_pipeline import RAGPipeline
+
+DIMENSION = 64
+
+
+class CountingEmbedder(HashingEmbedder):
+    """HashingEmbedder recording the texts it embeds"""
+
+    def __init__(self):
+        super().__init__(DIMENSION)
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def paragraphs(*edited):
+    # Mỗi đoạn ~900 ký tự là một chunk riêng (preserve_paragraphs)
+    return "\n\n".join(
+        (f"Edited paragraph {i}. " if i in edited else f"Paragraph {i}. ") + " ".join([f"Sentence {i} of the report."] * 32)
+        for i in range(5)
+    )
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    embedder = CountingEmbedder()
+    vector_store = InMemoryVectorStore(DIMENSION)
+    rag = RAGPipeline(embedder=embedder, vector_store=vector_store, preserve_paragraphs=True,
+                      manifest_path=str(tmp_path / "manifest.sqlite"))
+    return rag, embedder, vector_store
+
+
+def write(path, text, mtime=None):
+    path.write_text(text, encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_unchanged_file_is_skipped(tmp_path, pipeline):
+    rag, embedder, vector_store = pipeline
+    path = tmp_path / "report.txt"
+    write(path, paragraphs())
+
+    doc_id = rag.process_document(str(path))
+    rows = dict(vector_store.rows)
+    assert len(rows) == 5 and len(embedder.embedded) == 5
+
+    assert rag.process_document(str(path)) == doc_id
+    assert rag.last_stats.counters["skipped"] == 1
+
+    # Nội dung giống hệt nhưng mtime khác: hash được tính lại, vẫn skip
+    write(path, paragraphs(), mtime=1_000_000)
+    assert rag.process_document_stream(str(path)) == doc_id
+    assert rag.last_stats.counters["skipped"] == 1
+    assert len(embedder.embedded) == 5
+    assert vector_store.rows == rows
+
+
+def test_edited_chunk_is_reembedded_and_stale_row_deleted(tmp_path, pipeline):
+    rag, embedder, vector_store = pipeline
+    path = tmp_path / "report.txt"
+    write(path, paragraphs())
+    doc_id = rag.process_document(str(path))
+    before = {row["content"]: pk for pk, row in vector_store.rows.items()}
+
+    write(path, paragraphs(2), mtime=1_000_000)
+    assert rag.process_document(str(path)) == doc_id
+
+    assert embedder.embedded[5:] == [paragraphs(2).split("\n\n")[2]]
+    counters = rag.last_stats.counters
+    assert (counters["chunks_new"], counters["chunks_unchanged"], counters["chunks_stale"]) == (1, 4, 1)
+    after = {row["content"]: pk for pk, row in vector_store.rows.items()}
+    assert len(after) == 5
+    # Chunk không đổi giữ primary key, chunk cũ của đoạn bị sửa bị xóa
+    unchanged = [text for text in before if text in after]
+    assert len(unchanged) == 4 and all(before[text] == after[text] for text in unchanged)
+    assert paragraphs().split("\n\n")[2] not in after
+    assert sorted(pk for _, pk in rag.manifest.get_chunks(str(path))) == sorted(after.values())
+
+
+def test_deleted_source_is_removed(tmp_path, pipeline):
+    rag, _, vector_store = pipeline
+    kept, deleted = tmp_path / "kept.txt", tmp_path / "deleted.txt"
+    write(kept, paragraphs())
+    write(deleted, paragraphs(0, 1, 2, 3, 4))
+    rag.process_document(str(kept))
+    rag.process_document(str(deleted))
+    assert len(vector_store.rows) == 10
+
+    deleted.unlink()
+    with pytest.raises(FileNotFoundError):
+        rag.process_document(str(deleted))
+
+    assert rag.remove_missing_sources() == [str(deleted)]
+    assert {row["source"] for row in vector_store.rows.values()} == {str(kept)}
+    assert len(vector_store.rows) == 5
+    assert rag.manifest.get(str(deleted)) is None
+    assert rag.manifest.sources() == [str(kept)]
+    assert rag.remove_missing_sources() == []
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from benchmarks.fakes import InMemoryVectorStore
+from rag.embedders import HashingEmbedder
+from rag.pipeline.rag_pipeline import RAGPipeline
+
+DIMENSION = 64
+
+
+def make_pipeline(tmp_path, name):
+    vector_store = InMemoryVectorStore(DIMENSION)
+    rag = RAGPipeline(embedder=HashingEmbedder(DIMENSION), vector_store=vector_store,
+                      manifest_path=str(tmp_path / f"{name}.sqlite"))
+    return rag, vector_store
+
+
+def stored_rows(vector_store):
+    return sorted((row["source"], row["chunk_index"], row["content"], np.asarray(row["embedding"]).tobytes())
+                  for row in vector_store.rows.values())
+
+
+@pytest.fixture
+def files(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.txt").write_text("Alpha paragraph. " * 200, encoding="utf-8")
+    (docs / "b.txt").write_text("Beta paragraph. " * 50, encoding="utf-8")
+    (docs / "table.csv").write_text("id,name\n" + "".join(f"{i},row {i}\n" for i in range(50)), encoding="utf-8")
+    (docs / "empty.txt").write_text("", encoding="utf-8")
+    (docs / "notes.xyz").write_text("unsupported", encoding="utf-8")
+    return [str(docs / name) for name in ("a.txt", "missing.txt", "table.csv", "notes.xyz", "b.txt", "empty.txt")]
+
+
+def test_process_documents(tmp_path, files):
+    rag, vector_store = make_pipeline(tmp_path, "parallel")
+
+    results = rag.process_documents(files, max_workers=2, store_workers=2)
+
+    assert [result.source for result in results] == files
+    assert [result.status for result in results] == ["processed", "failed", "processed", "failed",
+                                                     "processed", "processed"]
+    assert "not found" in results[1].error
+    assert "Unsupported file type" in results[3].error
+    assert results[5].num_chunks == 0
+    assert all(result.stats is not None for result in results)
+
+    # Cùng các row (nội dung, metadata, vector) như khi ingest tuần tự từng file
+    sequential, sequential_store = make_pipeline(tmp_path, "sequential")
+    for path in (files[0], files[2], files[4]):
+        sequential.process_document(path)
+    assert stored_rows(vector_store) == stored_rows(sequential_store)
+    assert sum(result.num_chunks for result in results) == len(vector_store.rows)
+
+    # Lần chạy lại bỏ qua các file đã xong (kể cả file rỗng), file lỗi vẫn lỗi
+    rows = dict(vector_store.rows)
+    rerun = rag.process_documents(files, max_workers=2)
+    assert [result.status for result in rerun] == ["skipped", "failed", "skipped", "failed", "skipped", "skipped"]
+    assert [result.document_id for result in rerun] == [result.document_id for result in results]
+    assert vector_store.rows == rows
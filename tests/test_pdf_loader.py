@@ -0,0 +1,99 @@
+import pytest
+
+from rag.loaders import pdf_loader
+from rag.loaders.pdf_loader import PdfPageCache, load_pdf, load_pdf_parallel
+
+NUM_PAGES = 7
+
+
+def make_pdf(texts):
+    """Minimal PDF with one line of Helvetica text per page"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{obj}\nendobj\n".encode()
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return data
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(make_pdf([f"Page {i}" for i in range(NUM_PAGES)]))
+    return str(path)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PdfPageCache(str(tmp_path / "pdf_pages.sqlite"))
+    yield cache
+    cache.close()
+
+
+def test_parallel_pages_keep_order_and_match_pypdfloader(pdf_path):
+    # 2 worker, 2 trang mỗi task: các task có thể xong không theo thứ tự
+    documents = load_pdf_parallel(pdf_path, max_workers=2, pages_per_task=2)
+
+    assert [doc.page_content for doc in documents] == [f"Page {i}" for i in range(NUM_PAGES)]
+    assert [doc.metadata["page"] for doc in documents] == list(range(NUM_PAGES))
+    assert documents == load_pdf(pdf_path)
+
+
+def test_page_cache_is_reused(pdf_path, cache, monkeypatch):
+    expected = load_pdf_parallel(pdf_path, max_workers=1, cache=cache)
+
+    def fail(*args):
+        raise AssertionError("cached pages must not be extracted again")
+
+    monkeypatch.setattr(pdf_loader, "_extract_pages", fail)
+    # Cache theo nội dung: file copy sang đường dẫn khác vẫn trúng cache
+    copy_path = pdf_path.replace("doc.pdf", "copy.pdf")
+    with open(pdf_path, "rb") as src, open(copy_path, "wb") as dst:
+        dst.write(src.read())
+
+    assert load_pdf_parallel(pdf_path, max_workers=1, cache=cache) == expected
+    copied = load_pdf_parallel(copy_path, max_workers=1, cache=cache)
+    assert [doc.page_content for doc in copied] == [doc.page_content for doc in expected]
+    assert {doc.metadata["source"] for doc in copied} == {copy_path}
+
+
+def test_page_cache_is_invalidated_when_the_file_changes(pdf_path, cache, monkeypatch):
+    load_pdf_parallel(pdf_path, max_workers=1, cache=cache)
+    with open(pdf_path, "wb") as f:
+        f.write(make_pdf(["Edited"] * 3))
+
+    extracted = []
+    extract_pages = pdf_loader._extract_pages
+    monkeypatch.setattr(pdf_loader, "_extract_pages",
+                        lambda *args: extracted.append(args[1:]) or extract_pages(*args))
+
+    documents = load_pdf_parallel(pdf_path, max_workers=1, cache=cache)
+    assert [doc.page_content for doc in documents] == ["Edited"] * 3
+    assert extracted == [(0, 3)]
+
+
+def test_metadata_is_normalized_like_pypdfloader():
+    metadata = pdf_loader._normalize_metadata({
+        "/Producer": " Writer ", "/CreationDate": "D:20240102030405+07'00'", "/ModDate": "not a date",
+        "/Page_Count": 3, "/Rotated": True
+    })
+
+    assert metadata == {
+        "producer": "Writer", "creationdate": "2024-01-02T03:04:05+07:00", "moddate": "not a date",
+        "total_pages": 3, "page_count": 3, "rotated": "True"
+    }
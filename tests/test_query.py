@@ -0,0 +1,113 @@
+import pytest
+
+import utils.ttl_cache
+from benchmarks.fakes import InMemoryVectorStore
+from rag.embedders import HashingEmbedder
+from rag.pipeline.rag_pipeline import QUERY_RESULT_TTL, RAGPipeline
+
+DIMENSION = 64
+
+
+class CountingEmbedder(HashingEmbedder):
+    """HashingEmbedder recording the queries it embeds"""
+
+    def __init__(self):
+        super().__init__(DIMENSION)
+        self.queries = []
+
+    def embed_queries(self, queries):
+        self.queries.extend(queries)
+        return super().embed_queries(queries)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Đồng hồ giả của TTLCache
+    now = [1000.0]
+    monkeypatch.setattr(utils.ttl_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    embedder = CountingEmbedder()
+    vector_store = InMemoryVectorStore(DIMENSION)
+    rag = RAGPipeline(embedder=embedder, vector_store=vector_store, manifest_path=str(tmp_path / "manifest.sqlite"))
+    for name in ("cats", "dogs"):
+        path = tmp_path / f"{name}.txt"
+        path.write_text(f"All about {name}. " * 20, encoding="utf-8")
+        rag.process_document(str(path))
+    return rag, embedder, vector_store
+
+
+def test_repeated_query_is_served_from_the_result_cache(pipeline):
+    rag, embedder, vector_store = pipeline
+
+    first = rag.query("about cats", top_k=2)
+    first[0]["content"] = "changed by the caller"
+    second = rag.query("about cats", top_k=2)
+
+    assert len(second) == 2 and second[0]["content"] != "changed by the caller"
+    assert vector_store.searches == 1
+    assert embedder.queries == ["about cats"]
+    assert rag.query_stats.counters["result_cache_hits"] == 1
+    # top_k khác là một key khác, nhưng embedding của query được dùng lại
+    assert len(rag.query("about cats", top_k=1)) == 1
+    assert vector_store.searches == 2
+    assert embedder.queries == ["about cats"]
+    assert rag.query_stats.counters["embedding_cache_hits"] == 1
+
+
+def test_cached_results_expire_after_the_ttl(pipeline, clock):
+    rag, embedder, vector_store = pipeline
+    rag.query("about dogs")
+
+    clock[0] += QUERY_RESULT_TTL - 1
+    rag.query("about dogs")
+    assert vector_store.searches == 1
+
+    clock[0] += 2
+    rag.query("about dogs")
+    assert vector_store.searches == 2
+    # Embedding của query sống lâu hơn kết quả
+    assert embedder.queries == ["about dogs"]
+
+
+def test_batch_embeds_and_searches_each_distinct_query_once(pipeline):
+    rag, embedder, vector_store = pipeline
+    rag.query("about cats", top_k=1)
+    searched = []
+    search = vector_store.search
+    vector_store.search = lambda embeddings, **kwargs: (searched.append(len(embeddings)), search(embeddings, **kwargs))[1]
+
+    results = rag.query(["about cats", "about dogs", "about dogs", "about cats"], top_k=1)
+
+    assert [hits[0]["source"].rsplit("/", 1)[-1] for hits in results] == ["cats.txt", "dogs.txt", "dogs.txt", "cats.txt"]
+    assert results[1] == results[2]
+    # Một request search cho cả batch, "about dogs" chỉ được tìm một lần
+    assert searched == [1]
+    assert vector_store.searches == 2
+    assert embedder.queries == ["about cats", "about dogs"]
+    assert rag.query_stats.counters["queries"] == 5
+    assert rag.query_stats.counters["result_cache_hits"] == 2
+    assert rag.query("about dogs", top_k=1) == results[1]
+    assert vector_store.searches == 2
+
+
+def test_writes_invalidate_cached_results(pipeline, tmp_path):
+    rag, embedder, vector_store = pipeline
+    before = rag.query("about birds", top_k=5)
+    assert {hit["source"] for hit in before} == {str(tmp_path / "cats.txt"), str(tmp_path / "dogs.txt")}
+
+    birds = tmp_path / "birds.txt"
+    birds.write_text("All about birds. " * 20, encoding="utf-8")
+    rag.process_document(str(birds))
+    after_insert = rag.query("about birds", top_k=5)
+    assert vector_store.searches == 2
+    assert str(birds) in {hit["source"] for hit in after_insert}
+
+    rag.remove_source(str(birds))
+    after_remove = rag.query("about birds", top_k=5)
+    assert vector_store.searches == 3
+    assert str(birds) not in {hit["source"] for hit in after_remove}
+    assert embedder.queries == ["about birds"]
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from rag.splitters import chunk_documents_by_rows, count_tokens, iter_pack_documents, pack_documents
+from rag.splitters.token_splitter import token_costs
+
+
+@pytest.mark.parametrize("text, tokens", [
+    ("", 0),
+    ("hello world", 3),  # 2 x 5 chữ cái x 0.25
+    ("a b c", 3),  # Mỗi từ ít nhất một token
+    ("a   b", 2),  # Khoảng trắng không tốn token
+    ("2024", 4),  # Mỗi chữ số một token
+    ("a, b.", 4),  # Mỗi dấu câu ASCII một token
+    ("Tiếng Việt", 3),  # Chữ có dấu tốn hơn chữ Latin: 1.5 + 1.25
+    ("日本語", 3),  # Mỗi ký tự CJK một token
+])
+def test_count_tokens(text, tokens):
+    assert count_tokens(text) == tokens
+
+
+@pytest.mark.parametrize("text", ["hello world, 2024!", "Tiếng Việt có dấu", "日本語のテキスト 和 English"])
+def test_token_costs_are_prefix_sums(text):
+    costs = token_costs(text)
+
+    assert len(costs) == len(text) + 1
+    assert costs[0] == 0 and np.all(np.diff(costs) >= 0)
+    assert count_tokens(text) == np.ceil(costs[-1])
+    # Chi phí của một span là hiệu hai prefix sum
+    middle = len(text) // 2
+    assert costs[middle] + (costs[-1] - costs[middle]) == pytest.approx(costs[-1])
+
+
+def test_vietnamese_and_cjk_cost_more_than_ascii():
+    assert count_tokens("Tiếng Việt " * 20) > count_tokens("Tieng Viet " * 20)
+    assert count_tokens("日本語" * 20) > count_tokens("Tiếng Việt " * 6)
+
+
+def _chunk(text, **metadata):
+    return Document(page_content=text, metadata={"chunk_size": 1, **metadata})
+
+
+def test_pack_never_merges_across_source_page_or_sheet():
+    chunks = [
+        _chunk("a1", source="a.csv"),
+        _chunk("a2", source="a.csv"),
+        _chunk("b1", source="b.csv"),
+        _chunk("b2", source="b.csv", sheet="Sheet2"),
+        _chunk("b3", source="b.csv", sheet="Sheet2"),
+        _chunk("p1", source="c.pdf", page=0),
+        _chunk("p2", source="c.pdf", page=1),
+        _chunk("a3", source="a.csv"),
+    ]
+
+    packed = list(iter_pack_documents(chunks, max_tokens=100))
+
+    assert [doc.page_content for doc in packed] == ["a1\n\na2", "b1", "b2\n\nb3", "p1", "p2", "a3"]
+    assert [doc.metadata.get("packed_chunks") for doc in packed] == [2, None, 2, None, None, None]
+    assert packed[0].metadata["chunk_size"] == 2
+
+
+def test_pack_respects_the_budget():
+    chunks = [_chunk(" ".join(["word"] * 10), source="a.txt") for _ in range(10)]
+
+    packed = pack_documents(chunks, max_tokens=35)
+
+    # 10 token mỗi chunk, separator "\n\n" không tốn token: 3 chunk mỗi nhóm
+    assert [doc.metadata.get("packed_chunks") for doc in packed] == [3, 3, 3, None]
+    assert all(count_tokens(doc.page_content) <= 35 for doc in packed)
+
+
+def test_oversized_chunks_are_split_keeping_their_metadata():
+    table = Document(
+        page_content="\n\n".join(f"id: {i}\nname: {'x' * 40}" for i in range(40)),
+        metadata={"source": "t.csv", "file_type": "csv"}
+    )
+    rows = chunk_documents_by_rows([table], chunk_size=20)
+    assert all(count_tokens(doc.page_content) > 50 for doc in rows)
+
+    pieces = pack_documents(rows, max_tokens=50)
+
+    assert len(pieces) > len(rows)
+    assert all(count_tokens(doc.page_content) <= 50 for doc in pieces)
+    for row_chunk in rows:
+        parts = [doc for doc in pieces if doc.metadata["chunk_index"] == row_chunk.metadata["chunk_index"]]
+        # Metadata của row chunk được giữ nguyên, chỉ thêm sub_chunk_index
+        for i, doc in enumerate(parts, start=1):
+            assert doc.metadata == {**row_chunk.metadata, "sub_chunk_index": i}
+        # Không overlap: các mảnh theo thứ tự, cắt ở ranh giới hàng
+        text = row_chunk.page_content
+        position = 0
+        for doc in parts:
+            position = text.index(doc.page_content, position) + len(doc.page_content)
+            assert doc.page_content.startswith("id: ")
+
+
+def test_oversized_chunks_are_kept_without_split_oversized():
+    chunk = _chunk(" ".join(["word"] * 100), source="a.txt")
+
+    assert pack_documents([chunk], max_tokens=10, split_oversized=False) == [chunk]
@@ -0,0 +1,69 @@
+import datetime
+
+import openpyxl
+import pytest
+
+from rag.loaders.xlsx_loader import load_xlsx, stream_xlsx_chunks
+from rag.splitters import chunk_documents_by_rows
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "mixed"
+    sheet.append(["id", "price", "day", "note", "flag"])
+    for i in range(45):
+        sheet.append([
+            i,
+            None if i % 7 == 3 else i * 1.5,
+            datetime.datetime(2020, 1, 1 + i % 28, 12 if i % 2 else 0),
+            "NA" if i % 5 == 0 else None if i % 5 == 1 else f"n{i}",
+            i % 3 == 0
+        ])
+    # Hàng trống ở cuối bị bỏ qua như pandas
+    sheet.append([None] * 5)
+    dates = workbook.create_sheet("dates")
+    dates.append(["when", "count"])
+    dates.append([datetime.date(2021, 5, 6), 2])
+    dates.append([datetime.datetime(2021, 5, 7, 8, 9, 10), 2.5])
+    path = tmp_path / "book.xlsx"
+    workbook.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("read_chunk_rows", [1, 2, 7, 100])
+def test_stream_matches_load_xlsx(workbook_path, read_chunk_rows):
+    expected = chunk_documents_by_rows(load_xlsx(workbook_path), chunk_size=20)
+    chunks = list(stream_xlsx_chunks(workbook_path, chunk_size=20, read_chunk_rows=read_chunk_rows))
+
+    assert chunks == expected
+    rows = expected[0].page_content.split("\n\n")
+    assert rows[0] == "id: 0\nprice: 0\nday: 2020-01-01 00:00:00\nnote: NA\nflag: True"
+    assert rows[1] == "id: 1\nprice: 1.5\nday: 2020-01-02 12:00:00\nnote: \nflag: False"
+    assert rows[3] == "id: 3\nprice: \nday: 2020-01-04 12:00:00\nnote: n3\nflag: True"
+    assert expected[-1].page_content == "when: 2021-05-06 00:00:00\ncount: 2\n\nwhen: 2021-05-07 08:09:10\ncount: 2.5"
+
+
+@pytest.mark.parametrize("read_chunk_rows", [1, 7, 100])
+def test_stream_without_count_matches_load_xlsx_without_totals(workbook_path, read_chunk_rows):
+    total_keys = ("total_rows", "total_chunks", "is_complete_document", "original_rows_count")
+    expected = chunk_documents_by_rows(load_xlsx(workbook_path), chunk_size=20)
+    chunks = list(stream_xlsx_chunks(workbook_path, chunk_size=20, read_chunk_rows=read_chunk_rows, count_rows=False))
+
+    # Hàng trống ở cuối sheet vẫn bị bỏ qua khi không đếm trước
+    assert [(chunk.page_content, {key: value for key, value in chunk.metadata.items() if key not in total_keys})
+            for chunk in chunks] == \
+        [(chunk.page_content, {key: value for key, value in chunk.metadata.items() if key not in total_keys})
+         for chunk in expected]
+
+
+@pytest.mark.parametrize("count_rows", [True, False])
+def test_header_only_sheet_has_no_chunks(tmp_path, count_rows):
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["id", "price"])
+    path = tmp_path / "header.xlsx"
+    workbook.save(path)
+
+    assert chunk_documents_by_rows(load_xlsx(str(path)), chunk_size=20) == []
+    assert list(stream_xlsx_chunks(str(path), chunk_size=20, count_rows=count_rows)) == []
@@ -1,5 +1,18 @@
-from .text_cleaner import clean_documents_spaces
+from .text_cleaner import clean_documents_spaces, clean_text, iter_clean_documents
+from .metrics import IngestStats, JsonLinesSink, PrometheusTextSink, QueryStats
+from .ttl_cache import TTLCache
+from .vectors import as_float32, encode_vectors, l2_normalize
 
 __all__ = [
-    'clean_documents_spaces'
-]
\ No newline at end of file
+    'clean_documents_spaces',
+    'clean_text',
+    'iter_clean_documents',
+    'IngestStats',
+    'JsonLinesSink',
+    'PrometheusTextSink',
+    'QueryStats',
+    'TTLCache',
+    'as_float32',
+    'encode_vectors',
+    'l2_normalize'
+]
@@ -0,0 +1,336 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Union
+
+# Bucket (giây) cho histogram latency của embedding request
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Bucket (giây) cho histogram latency của query
+QUERY_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        """Cumulative histogram with fixed upper bounds, Prometheus style"""
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Bucket cuối là +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram"):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative = []
+        total = 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return {
+            "buckets": {str(bound): cumulative[i] for i, bound in enumerate(self.buckets)} | {"+Inf": cumulative[-1]},
+            "count": self.count,
+            "sum": self.sum
+        }
+
+
+@dataclass
+class StageStats:
+    wall_time: float = 0.0  # Thời gian riêng của stage, không tính stage lồng bên trong
+    items: int = 0
+    bytes: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wall_time": self.wall_time,
+            "items": self.items,
+            "bytes": self.bytes,
+            "items_per_second": self.items / self.wall_time if self.wall_time > 0 else None
+        }
+
+
+class IngestStats:
+    def __init__(self, source: str):
+        """
+        Metrics collected while ingesting one source.
+
+        Stage timers are exclusive: while a nested stage runs (e.g. the
+        loader generator pulled by the splitter), the outer stage is paused.
+        """
+        self.source = source
+        self.started_at = time.time()
+        self.wall_time = 0.0
+        self.chunks = 0
+        self.stages: Dict[str, StageStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.embed_latency = Histogram()
+        self._lock = threading.Lock()
+        self._stack: List[str] = []
+        self._mark = 0.0
+        self._start = time.perf_counter()
+
+    def _get_stage(self, name: str) -> StageStats:
+        if name not in self.stages:
+            self.stages[name] = StageStats()
+        return self.stages[name]
+
+    def _enter(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            self._get_stage(self._stack[-1]).wall_time += now - self._mark
+        self._stack.append(name)
+        self._mark = now
+
+    def _exit(self):
+        now = time.perf_counter()
+        self._get_stage(self._stack.pop()).wall_time += now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        """Time a block of code as (part of) a stage"""
+        stage = self._get_stage(name)
+        self._enter(name)
+        try:
+            yield stage
+        finally:
+            self._exit()
+
+    def timed_iter(self, name: str, iterable: Iterable, size=None) -> Iterator:
+        """
+        Time the production of each item of a (lazy) iterable as a stage.
+
+        Args:
+            name: Stage name
+            iterable: Items to wrap
+            size: Optional function returning the byte size of an item
+        """
+        stage = self._get_stage(name)
+        iterator = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            stage.items += 1
+            if size is not None:
+                stage.bytes += size(item)
+            yield item
+
+    def add_stage(self, name: str, wall_time: float = 0.0, items: int = 0, size: int = 0):
+        """Add measurements taken elsewhere (e.g. in a worker process) to a stage"""
+        stage = self._get_stage(name)
+        stage.wall_time += wall_time
+        stage.items += items
+        stage.bytes += size
+
+    def count(self, name: str, value: int = 1):
+        """Increase a counter (cache hits, retries, ...). Thread-safe."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe_embed_request(self, seconds: float):
+        """Record the latency of one embedding request. Thread-safe."""
+        with self._lock:
+            self.embed_latency.observe(seconds)
+            self.counters["embed_requests"] = self.counters.get("embed_requests", 0) + 1
+
+    def merge(self, other: "IngestStats"):
+        """
+        Add the stages, counters, chunks and wall time of another IngestStats
+        (e.g. one task of a job) to these stats. Thread-safe.
+        """
+        with self._lock:
+            for name, stage in other.stages.items():
+                self.add_stage(name, stage.wall_time, stage.items, stage.bytes)
+            for name, value in other.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            self.embed_latency.merge(other.embed_latency)
+            self.chunks += other.chunks
+            self.wall_time += other.wall_time
+
+    def finish(self):
+        self.wall_time = time.perf_counter() - self._start
+
+    @property
+    def chunks_per_second(self) -> Optional[float]:
+        return self.chunks / self.wall_time if self.wall_time > 0 else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "started_at": self.started_at,
+            "wall_time": self.wall_time,
+            "chunks": self.chunks,
+            "chunks_per_second": self.chunks_per_second,
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+            "counters": dict(self.counters),
+            "embed_latency": self.embed_latency.to_dict()
+        }
+
+
+class QueryStats:
+    def __init__(self, buckets: Sequence[float] = QUERY_LATENCY_BUCKETS):
+        """
+        Cumulative metrics of the queries served by one pipeline: latency
+        histograms of the "embed", "search" and "total" phases plus counters
+        (queries, cache hits, ...). Thread-safe.
+        """
+        self.buckets = tuple(buckets)
+        self.latency: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            if phase not in self.latency:
+                self.latency[phase] = Histogram(self.buckets)
+            self.latency[phase].observe(seconds)
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "latency": {phase: histogram.to_dict() for phase, histogram in self.latency.items()}
+            }
+
+
+# Stats của source đang được xử lý; embedder/cache ghi vào đây nếu có
+_current_stats: ContextVar[Optional[IngestStats]] = ContextVar("current_ingest_stats", default=None)
+
+
+@contextmanager
+def collecting(stats: IngestStats) -> Iterator[IngestStats]:
+    """Make `stats` the target of count/observe_embed_request in this context"""
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def current_stats() -> Optional[IngestStats]:
+    return _current_stats.get()
+
+
+def count(name: str, value: int = 1):
+    """Increase a counter of the current stats, if any"""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count(name, value)
+
+
+def observe_embed_request(seconds: float):
+    """Record an embedding request latency in the current stats, if any"""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.observe_embed_request(seconds)
+
+
+class JsonLinesSink:
+    def __init__(self, target: Union[str, TextIO]):
+        """Append one JSON object per ingested source to a file path or stream"""
+        self.target = target
+        self._lock = threading.Lock()
+
+    def emit(self, stats: IngestStats):
+        line = json.dumps(stats.to_dict(), ensure_ascii=False)
+        with self._lock:
+            if isinstance(self.target, str):
+                with open(self.target, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            else:
+                self.target.write(line + "\n")
+                self.target.flush()
+
+
+class PrometheusTextSink:
+    def __init__(self, path: str, prefix: str = "file2rag"):
+        """
+        Keep cumulative metrics over all ingested sources and rewrite them to
+        `path` in the Prometheus text exposition format (e.g. for the
+        node_exporter textfile collector).
+        """
+        self.path = path
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._documents = 0
+        self._chunks = 0
+        self._wall_time = 0.0
+        self._stages: Dict[str, StageStats] = {}
+        self._counters: Dict[str, int] = {}
+        self._embed_latency = Histogram()
+
+    def emit(self, stats: IngestStats):
+        with self._lock:
+            self._documents += 1
+            self._chunks += stats.chunks
+            self._wall_time += stats.wall_time
+            for name, stage in stats.stages.items():
+                total = self._stages.setdefault(name, StageStats())
+                total.wall_time += stage.wall_time
+                total.items += stage.items
+                total.bytes += stage.bytes
+            for name, value in stats.counters.items():
+                self._counters[name] = self._counters.get(name, 0) + value
+            self._embed_latency.merge(stats.embed_latency)
+            text = self.render()
+
+        # Ghi file tạm rồi rename để collector không đọc file ghi dở
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+
+    def render(self) -> str:
+        p = self.prefix
+        lines = [
+            f"# TYPE {p}_documents_total counter",
+            f"{p}_documents_total {self._documents}",
+            f"# TYPE {p}_chunks_total counter",
+            f"{p}_chunks_total {self._chunks}",
+            f"# TYPE {p}_ingest_seconds_total counter",
+            f"{p}_ingest_seconds_total {self._wall_time}",
+            f"# TYPE {p}_stage_seconds_total counter",
+        ]
+        lines += [f'{p}_stage_seconds_total{{stage="{name}"}} {stage.wall_time}' for name, stage in self._stages.items()]
+        lines.append(f"# TYPE {p}_stage_items_total counter")
+        lines += [f'{p}_stage_items_total{{stage="{name}"}} {stage.items}' for name, stage in self._stages.items()]
+        lines.append(f"# TYPE {p}_stage_bytes_total counter")
+        lines += [f'{p}_stage_bytes_total{{stage="{name}"}} {stage.bytes}' for name, stage in self._stages.items()]
+        for name, value in self._counters.items():
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            lines.append(f"{p}_{name}_total {value}")
+
+        lines.append(f"# TYPE {p}_embed_request_seconds histogram")
+        cumulative = 0
+        for i, bound in enumerate(self._embed_latency.buckets + (float("inf"),)):
+            cumulative += self._embed_latency.counts[i]
+            le = "+Inf" if bound == float("inf") else str(bound)
+            lines.append(f'{p}_embed_request_seconds_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"{p}_embed_request_seconds_sum {self._embed_latency.sum}")
+        lines.append(f"{p}_embed_request_seconds_count {self._embed_latency.count}")
+        return "\n".join(lines) + "\n"
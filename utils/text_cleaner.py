@@ -1,31 +1,115 @@
 import re
 from langchain_core.documents import Document
-from typing import List
+from typing import Iterable, Iterator, List
 
-def clean_documents_spaces(documents: List[Document]) -> List[Document]:
+# Một khoảng trắng chứa từ 2 dấu xuống dòng trở lên = ngắt paragraph
+_PARAGRAPH_BREAK = re.compile(r'\n[^\S\n]*\n\s*')
+# Text dài hơn được clean theo từng đoạn để giới hạn số string tạm của str.split
+CLEAN_BLOCK_CHARS = 1024 * 1024
+
+
+def _collapse(text: str) -> str:
+    """Same as " ".join(text.split()), done in blocks cut at whitespace for long texts"""
+    if len(text) <= CLEAN_BLOCK_CHARS:
+        return " ".join(text.split())
+
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = start + CLEAN_BLOCK_CHARS
+        if end < len(text):
+            # Cắt tại khoảng trắng để không tách đôi một từ
+            cuts = [cut for cut in (text.find(" ", end), text.find("\n", end)) if cut != -1]
+            end = min(cuts) if cuts else len(text)
+        piece = " ".join(text[start:end].split())
+        if piece:
+            pieces.append(piece)
+        start = end
+    return " ".join(pieces)
+
+
+def clean_text(text: str, preserve_paragraphs: bool = False, preserve_newlines: bool = False) -> str:
+    """
+    Collapse whitespace runs in a text.
+
+    By default every run of whitespace becomes a single space and the text
+    is trimmed, exactly like `re.sub(r'\\s+', ' ', text).strip()` (str.split
+    and the regex use the same Unicode whitespace set) but about twice as fast.
+
+    Args:
+        text: Text to clean
+        preserve_paragraphs: Turn runs containing two or more line breaks
+            into a single blank line ("\\n\\n"), so splitters can still cut
+            on paragraphs
+        preserve_newlines: Turn the remaining runs containing a line break
+            into "\\n"
+
+    "\\r\\n" and "\\r" count as line breaks in both modes.
+    """
+    if not (preserve_paragraphs or preserve_newlines):
+        return _collapse(text)
+
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    blocks = _PARAGRAPH_BREAK.split(text) if preserve_paragraphs else [text]
+
+    cleaned_blocks = []
+    for block in blocks:
+        if preserve_newlines:
+            lines = (" ".join(line.split()) for line in block.split("\n"))
+            block = "\n".join(line for line in lines if line)
+        else:
+            block = _collapse(block)
+        if block:
+            cleaned_blocks.append(block)
+    return "\n\n".join(cleaned_blocks)
+
+
+def iter_clean_documents(documents: Iterable[Document],
+                         preserve_paragraphs: bool = False,
+                         preserve_newlines: bool = False,
+                         in_place: bool = False) -> Iterator[Document]:
+    """
+    Generator version of clean_documents_spaces, cleaning one document at a time.
+
+    With `in_place=True` the `page_content` of each Document is replaced and
+    the same object is yielded; only use it on Documents nobody else holds
+    (e.g. fresh from a loader).
+    """
+    for doc in documents:
+        cleaned_page_content = clean_text(doc.page_content, preserve_paragraphs, preserve_newlines)
+        if in_place:
+            doc.page_content = cleaned_page_content
+            yield doc
+        else:
+            # Metadata được dùng chung, không copy
+            yield Document(page_content=cleaned_page_content, metadata=doc.metadata)
+
+
+def clean_documents_spaces(documents: List[Document],
+                           preserve_paragraphs: bool = False,
+                           preserve_newlines: bool = False,
+                           in_place: bool = False) -> List[Document]:
     """
     Clean excessive whitespace from a list of LangChain Document objects.
-    
-    This function removes redundant spaces, tabs, and newlines in each document's 
-    `page_content`, replacing them with a single space. It also trims leading and 
+
+    This function removes redundant spaces, tabs, and newlines in each document's
+    `page_content`, replacing them with a single space. It also trims leading and
     trailing whitespace, preserving the document's original metadata.
-    
+
     Args:
-        docs (List[Document]): 
+        docs (List[Document]):
             List of Document objects to clean.
-        
+        preserve_paragraphs (bool):
+            Keep paragraph breaks as "\\n\\n" (see clean_text).
+        preserve_newlines (bool):
+            Keep single line breaks as "\\n" (see clean_text).
+        in_place (bool):
+            Update the given Documents instead of creating new ones.
+
     Returns:
-        List[Document]: 
-            A new list of Document objects with cleaned `page_content` and 
+        List[Document]:
+            A list of Document objects with cleaned `page_content` and
             original metadata intact.
     """
-
-    cleaned_docs = []
-    for doc in documents:
-        cleaned_page_content = re.sub(r'\s+', ' ', doc.page_content).strip()
-        cleaned_docs.append(Document(
-            page_content=cleaned_page_content,
-            metadata=doc.metadata
-        ))
-    
-    return cleaned_docs
\ No newline at end of file
+    return list(iter_clean_documents(documents, preserve_paragraphs, preserve_newlines, in_place))
@@ -0,0 +1,49 @@
+from typing import Any, Optional
+import numpy as np
+
+# Kiểu vector lưu trong Milvus và dtype numpy tương ứng
+VECTOR_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+INT8_SCALE = 127  # Vector đã chuẩn hóa L2 có giá trị trong [-1, 1] => [-127, 127]
+
+
+def as_float32(embeddings: Any, dimension: Optional[int] = None) -> np.ndarray:
+    """
+    Embeddings as a contiguous float32 array of shape (n, dimension).
+
+    A float32 array is returned as is (no copy); lists of vectors or of
+    1-D arrays are converted once.
+    """
+    vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if vectors.ndim == 1:
+        # List rỗng, hoặc một vector duy nhất
+        vectors = vectors.reshape(0, dimension or 0) if not vectors.size else vectors.reshape(1, -1)
+    return vectors
+
+
+def l2_normalize(vectors: np.ndarray, in_place: bool = False) -> np.ndarray:
+    """Scale every row to unit L2 norm; all-zero rows are left unchanged"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    out = vectors if in_place else vectors.copy()
+    np.divide(out, norms, out=out, where=norms > 0)
+    return out
+
+
+def encode_vectors(vectors: np.ndarray, vector_type: str = "float32") -> np.ndarray:
+    """
+    Convert float32 vectors to the storage type.
+
+    Args:
+        vectors: float32 array of shape (n, dimension)
+        vector_type: "float32", "float16" (half the memory) or "int8"
+            (symmetric quantization, a quarter of the memory; the vectors
+            must be L2-normalized)
+    """
+    match vector_type:
+        case "float32":
+            return vectors
+        case "float16":
+            return vectors.astype(np.float16)
+        case "int8":
+            return np.clip(np.rint(vectors * INT8_SCALE), -INT8_SCALE, INT8_SCALE).astype(np.int8)
+        case _:
+            raise ValueError(f"Unsupported vector type: {vector_type}")